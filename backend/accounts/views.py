@@ -5,6 +5,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from cv.authentication import current_token
 
 
 @api_view(['POST'])
@@ -32,8 +33,8 @@ def login(request):
             status=status.HTTP_401_UNAUTHORIZED
         )
 
-    # Get or create token for the user
-    token, created = Token.objects.get_or_create(user=user)
+    # Get or create token for the user, replacing it if it has expired
+    token = current_token(user)
     
     return Response({
         'token': token.key,
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import SQLITE_PRAGMAS, database_config  # noqa: F401 (SQLITE_PRAGMAS is a setting)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "cv.instrumentation.RequestTimingMiddleware",
+    "cv.metrics.MetricsMiddleware",
+    "cv.profiling.ProfilingMiddleware",
+    "cv.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -78,14 +85,47 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# PostgreSQL when DATABASE_URL is set, otherwise tuned SQLite (see config/database.py)
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(os.environ, BASE_DIR),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Formatted citations and per-user list payloads (cv.list_cache). Memory is
+# per process, so with several workers set CACHE_DIR to share a file cache and
+# let invalidations reach every worker.
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "cvbuilder",
+        }
+    }
+# Upper bound on a cached list's age, for writes that bypass invalidation. On a
+# per-process cache (LocMem, above) other workers don't see invalidations, so
+# lists are kept only LIST_CACHE_LOCAL_TIMEOUT seconds there (cv.list_cache).
+LIST_CACHE_TIMEOUT = int(os.environ.get('LIST_CACHE_TIMEOUT', '3600'))
+LIST_CACHE_LOCAL_TIMEOUT = int(os.environ.get('LIST_CACHE_LOCAL_TIMEOUT', '5'))
+# Token authentication (cv.authentication). Resolved tokens are kept in-process
+# for TOKEN_AUTH_LOCAL_TTL seconds (how long another process may take to see a
+# deactivation or token deletion) and, when CACHES is shared between workers
+# (not LocMem), there for TOKEN_AUTH_CACHE_TIMEOUT. Only ids and flags are cached.
+# TOKEN_EXPIRY_SECONDS > 0 refuses tokens older than that; login issues a new one.
+TOKEN_AUTH_LOCAL_TTL = float(os.environ.get('TOKEN_AUTH_LOCAL_TTL', '5'))
+TOKEN_AUTH_CACHE_TIMEOUT = int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', '300'))
+TOKEN_EXPIRY_SECONDS = int(os.environ.get('TOKEN_EXPIRY_SECONDS', '0'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,8 +169,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
+    # orjson-backed JSON when orjson is installed; DRF's json otherwise (cv/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'cv.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'cv.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # DRF tokens, answered from cache after the first request (cv/authentication.py)
+        'cv.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -139,6 +190,16 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Response compression (cv.compression): textual responses of at least
+# RESPONSE_COMPRESSION_MIN_BYTES are sent with gzip, or Brotli when the brotli
+# package (the `fast` extra) is installed and the client accepts it. Responses
+# to session-cookie requests are left uncompressed unless
+# RESPONSE_COMPRESSION_SESSION_REQUESTS=1, because of BREACH (see cv/compression.py)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_GZIP_LEVEL', '6'))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', '4'))
+RESPONSE_COMPRESSION_SESSION_REQUESTS = os.environ.get('RESPONSE_COMPRESSION_SESSION_REQUESTS', '0') == '1'
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -146,3 +207,78 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# External metadata APIs. Point CROSSREF_API_URL at `python manage.py crossref_stub`
+# to run enrichment against recorded fixtures instead of the live service.
+CROSSREF_API_URL = os.environ.get('CROSSREF_API_URL', 'https://api.crossref.org').rstrip('/')
+# The other metadata providers (cv.providers). DOIs are resolved by the
+# registration agencies in METADATA_PROVIDERS; providers in
+# METADATA_SUPPLEMENT_PROVIDERS (e.g. pubmed, to add PMIDs) fill in what they
+# left blank. METADATA_HEDGE_DELAY > 0 starts the next provider alongside one
+# that hasn't answered after that many seconds.
+DATACITE_API_URL = os.environ.get('DATACITE_API_URL', 'https://api.datacite.org').rstrip('/')
+NCBI_EUTILS_URL = os.environ.get('NCBI_EUTILS_URL', 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils').rstrip('/')
+NCBI_API_KEY = os.environ.get('NCBI_API_KEY', '')
+METADATA_PROVIDERS = [name for name in os.environ.get('METADATA_PROVIDERS', 'crossref,datacite,pubmed').split(',') if name]
+METADATA_SUPPLEMENT_PROVIDERS = [name for name in os.environ.get('METADATA_SUPPLEMENT_PROVIDERS', '').split(',') if name]
+METADATA_HEDGE_DELAY = float(os.environ.get('METADATA_HEDGE_DELAY', '0'))
+# ORCID public API, for importing a user's works (cv.orcid)
+ORCID_API_URL = os.environ.get('ORCID_API_URL', 'https://pub.orcid.org/v3.0').rstrip('/')
+# DOIs per /works?filter=doi:... query in bulk lookups (fetch_doi_metadata_batch)
+CROSSREF_BATCH_SIZE = int(os.environ.get('CROSSREF_BATCH_SIZE', '20'))
+
+# Upstream failure handling (cv.upstream). A DOI lookup gets DOI_LOOKUP_DEADLINE
+# seconds across all of its requests. A host's circuit opens after
+# UPSTREAM_BREAKER_FAILURES consecutive failures, failing lookups fast, and lets
+# a trial request through after UPSTREAM_BREAKER_RESET_SECONDS.
+DOI_LOOKUP_DEADLINE = float(os.environ.get('DOI_LOOKUP_DEADLINE', '5'))
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', '5'))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get('UPSTREAM_BREAKER_RESET_SECONDS', '30'))
+
+# Scheduled metadata refresh (cv.refresh). Each `refresh_stale_metadata` run,
+# e.g. hourly from cron, spreads METADATA_REFRESH_BUDGET upstream requests
+# (Crossref and the provider chain; a Work may take several) evenly over
+# METADATA_REFRESH_PERIOD seconds.
+METADATA_REFRESH_BUDGET = int(os.environ.get('METADATA_REFRESH_BUDGET', '100'))
+METADATA_REFRESH_PERIOD = float(os.environ.get('METADATA_REFRESH_PERIOD', '3600'))
+
+# Async views (cv.async_views) for publication enrichment and biosketch
+# compiles. config/asgi.py turns them on; WSGI keeps the sync DRF views.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+# Request timing (cv.instrumentation). Responses get a Server-Timing header
+# with REQUEST_TIMING_HEADER=1 (the default only under DEBUG); otherwise only
+# staff users do, as it reveals query counts and timings. Setting REQUEST_TIMING_SAMPLE_RATE (e.g. 0.1) aggregates that share of
+# requests per view and logs them to 'cv.timing'; it is off by default.
+REQUEST_TIMING_HEADER = os.environ.get('REQUEST_TIMING_HEADER', '1' if DEBUG else '0') == '1'
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0'))
+REQUEST_TIMING_LOG_INTERVAL = 60  # seconds
+REQUEST_TIMING_SLOW_MS = 5000
+
+# Metrics (cv.metrics), scraped from /metrics with `Authorization: Bearer
+# <METRICS_TOKEN>` (or by signed-in staff). Under gunicorn, set METRICS_DIR to a
+# directory shared by the workers (cleared on start) so a scrape reports all of
+# them, not just the worker that answers it.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0  # seconds
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Profiling (cv.profiling). Staff can profile a request with an `X-Profile: 1`
+# header and their API token; PROFILING_SAMPLE_RATE also profiles a random
+# fraction of requests.
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = 200
+PROFILING_INTERVAL = 0.005  # seconds between stack samples
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'cv.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'cv.upstream': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
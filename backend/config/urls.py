@@ -17,9 +17,11 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from cv.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/accounts/", include("accounts.urls")),
     path("api/cv/", include("cv.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
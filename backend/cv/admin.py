@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Education, ProfessionalExperience, Publication, Award, PersonalStatement, Biosketch
+from .models import Education, ProfessionalExperience, Work, Publication, PublicationAuthor, Award, PersonalStatement, Biosketch, OrcidSync
 
 
 @admin.register(Education)
@@ -18,12 +18,34 @@ class ProfessionalExperienceAdmin(admin.ModelAdmin):
     raw_id_fields = ('user',)
 
 
+@admin.register(Work)
+class WorkAdmin(admin.ModelAdmin):
+    list_display = ('doi', 'title', 'year', 'fetched_at')
+    search_fields = ('doi', 'title')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+class PublicationAuthorInline(admin.TabularInline):
+    model = PublicationAuthor
+    fields = ('position', 'family', 'given', 'orcid', 'is_last', 'normalized_name')
+    extra = 0
+
+
 @admin.register(Publication)
 class PublicationAdmin(admin.ModelAdmin):
     list_display = ('user', 'doi', 'citation')
     list_filter = ('user',)
     search_fields = ('user__username', 'doi', 'citation')
+    raw_id_fields = ('user', 'work')
+    inlines = [PublicationAuthorInline]
+
+
+@admin.register(OrcidSync)
+class OrcidSyncAdmin(admin.ModelAdmin):
+    list_display = ('user', 'orcid', 'synced_at')
+    search_fields = ('user__username', 'orcid')
     raw_id_fields = ('user',)
+    readonly_fields = ('etag', 'last_modified', 'synced_at', 'last_result')
 
 
 @admin.register(Award)
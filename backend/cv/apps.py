@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CvConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cv"
+
+    def ready(self):
+        from config.database import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='cv.apply_sqlite_pragmas')
+
+        from . import authentication, list_cache
+        list_cache.connect_signals()
+        authentication.connect_signals()
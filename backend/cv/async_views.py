@@ -0,0 +1,269 @@
+"""
+Async versions of the I/O-bound endpoints, for ASGI deployments.
+
+The sync DRF views hold a worker thread while Crossref answers or while
+pdflatex/pandoc run. These views await that work instead:
+  - metadata lookups go through httpx.AsyncClient
+  - compiles use asyncio.create_subprocess_exec
+  - only short ORM calls are handed to a thread via sync_to_async
+One ASGI process can then hold many slow requests at once.
+
+They keep the sync views' contracts:
+  - the same DRF authenticators run, including SessionAuthentication's CSRF
+    check
+  - the same serializers and shared helpers in cv.views
+  - the same JSON bodies and status codes
+
+publication_list and publication_detail only take over POST and PUT/PATCH.
+Other methods go to PublicationViewSet. cv.urls routes here when
+settings.ASYNC_VIEWS is on, which config/asgi.py enables.
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .dois import normalize_doi
+from .instrumentation import timed
+from .metrics import BIOSKETCH_DURATION, COMPILES_IN_PROGRESS, DOI_FETCHES
+from .models import Publication, Work
+from .profiling import profiled
+from .providers import aresolve
+from .upstream import deadline
+from .serializers import PublicationSerializer
+from .views import (
+    PublicationViewSet,
+    biosketch_error,
+    biosketch_metric_format,
+    biosketch_response,
+    collect_biosketch_inputs,
+    finish_publication_create,
+    finish_publication_update,
+    generate_biosketch_latex,
+    publication_update_values,
+    store_fetched_work,
+    work_link_values,
+    work_needs_fetch,
+)
+
+publication_list_view = PublicationViewSet.as_view({'get': 'list', 'post': 'create'})
+publication_detail_view = PublicationViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+})
+
+
+def csrf_exempt(view):
+    """
+    Mark an async view exempt from CsrfViewMiddleware; SessionAuthentication
+    enforces CSRF itself, as for DRF views. (Django 4.2's csrf_exempt wraps
+    the view in a sync function.)
+    """
+    view.csrf_exempt = True
+    return view
+
+
+async def afetch_doi_metadata(doi, client=None):
+    """Async fetch_doi_metadata; pass a shared httpx.AsyncClient to reuse connections"""
+    try:
+        with timed('http'), deadline(settings.DOI_LOOKUP_DEADLINE):
+            if client is None:
+                async with httpx.AsyncClient(timeout=10) as own_client:
+                    metadata, outcome = await aresolve(doi, own_client)
+            else:
+                metadata, outcome = await aresolve(doi, client)
+    except Exception as e:
+        metadata, outcome = None, 'error'
+    DOI_FETCHES.inc(outcome=outcome)
+    return metadata
+
+
+async def aget_or_fetch_work(doi):
+    """Async get_or_fetch_work"""
+    normalized = normalize_doi(doi)
+    if not normalized:
+        return None
+    work = await Work.objects.filter(doi=normalized).afirst()
+    if work_needs_fetch(work):
+        metadata = await afetch_doi_metadata(doi)
+        work = await sync_to_async(store_fetched_work)(normalized, work, metadata)
+    return work
+
+
+async def run_command(args, compile_format):
+    """Run a compiler without blocking the event loop; returns (returncode, stdout, stderr)"""
+    with timed('subprocess'), COMPILES_IN_PROGRESS.track_inprogress(format=compile_format):
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+
+async def agenerate_biosketch_html(**inputs):
+    """Async generate_biosketch_html"""
+    latex_content = generate_biosketch_latex(**inputs)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tex_file = Path(temp_dir) / 'biosketch.tex'
+        html_file = Path(temp_dir) / 'biosketch.html'
+        tex_file.write_text(latex_content, encoding='utf-8')
+
+        try:
+            returncode, stdout, stderr = await run_command(
+                ['pandoc', str(tex_file), '-f', 'latex', '-t', 'html', '-o', str(html_file)], 'html'
+            )
+        except FileNotFoundError:
+            raise Exception(
+                "pandoc not found. Please install pandoc to export HTML. "
+                "Visit https://pandoc.org/installing.html for installation instructions."
+            )
+        if returncode != 0:
+            raise Exception(f"HTML conversion failed: {stderr}")
+        if not html_file.exists():
+            raise Exception("HTML file was not generated")
+        return html_file.read_text(encoding='utf-8')
+
+
+async def agenerate_biosketch_pdf(**inputs):
+    """Async generate_biosketch_pdf"""
+    latex_content = generate_biosketch_latex(**inputs)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tex_file = Path(temp_dir) / 'biosketch.tex'
+        pdf_file = Path(temp_dir) / 'biosketch.pdf'
+        tex_file.write_text(latex_content, encoding='utf-8')
+
+        command = ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_dir, str(tex_file)]
+        _, stdout1, stderr1 = await run_command(command, 'pdf')
+        _, stdout2, stderr2 = await run_command(command, 'pdf')
+
+        if not pdf_file.exists():
+            error_output = stdout1 + stderr1 if stdout1 or stderr1 else "No output"
+            if stdout2 or stderr2:
+                error_output += "\n\nSecond run:\n" + stdout2 + stderr2
+            raise Exception(f"PDF generation failed: {error_output}")
+
+        pdf_content = pdf_file.read_bytes()
+        if len(pdf_content) == 0:
+            raise Exception("Generated PDF is empty")
+        return pdf_content
+
+
+async def authenticate(request):
+    """
+    Run the DRF authenticators and parse the body. Returns the DRF request, or
+    an error JsonResponse matching what the sync views return.
+    """
+    drf_request = Request(
+        request,
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+
+    def load():
+        user = drf_request.user
+        if user is None or not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        drf_request.data  # parse now, while in a thread
+        return drf_request
+
+    try:
+        return await sync_to_async(load)()
+    except exceptions.APIException as e:
+        code = e.status_code
+        if isinstance(e, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # Like DRF: 401 only when an authenticator can issue a challenge
+            authenticator = drf_request._authenticator or next(iter(drf_request.authenticators), None)
+            if authenticator is None or not authenticator.authenticate_header(drf_request):
+                code = status.HTTP_403_FORBIDDEN
+        return JsonResponse({'detail': str(e.detail)}, status=code)
+
+
+@csrf_exempt
+async def publication_list(request):
+    """POST creates a publication with async enrichment; GET lists via the viewset"""
+    if request.method != 'POST':
+        return await sync_to_async(publication_list_view)(request)
+
+    drf_request = await authenticate(request)
+    if isinstance(drf_request, JsonResponse):
+        return drf_request
+
+    serializer = PublicationSerializer(data=drf_request.data, context={'request': drf_request})
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    work = await aget_or_fetch_work(serializer.validated_data.get('doi'))
+    publication = await sync_to_async(serializer.save)(user=drf_request.user, **work_link_values(work))
+    await sync_to_async(finish_publication_create)(publication, work)
+    data = await sync_to_async(lambda: serializer.data)()
+    return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+async def publication_detail(request, pk):
+    """PUT/PATCH update a publication with async enrichment; GET/DELETE via the viewset"""
+    if request.method not in ('PUT', 'PATCH'):
+        return await sync_to_async(publication_detail_view)(request, pk=pk)
+
+    drf_request = await authenticate(request)
+    if isinstance(drf_request, JsonResponse):
+        return drf_request
+
+    try:
+        instance = await Publication.objects.select_related('work').aget(pk=pk, user=drf_request.user)
+    except Publication.DoesNotExist:
+        return JsonResponse({'detail': 'No Publication matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = PublicationSerializer(
+        instance, data=drf_request.data, partial=request.method == 'PATCH', context={'request': drf_request}
+    )
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    values, needs_work = publication_update_values(instance, serializer.validated_data)
+    work = None
+    if needs_work:
+        work = await aget_or_fetch_work(serializer.validated_data.get('doi', instance.doi))
+    publication = await sync_to_async(serializer.save)(**{**values, **work_link_values(work)})
+    await sync_to_async(finish_publication_update)(publication, work, serializer.validated_data)
+    data = await sync_to_async(lambda: serializer.data)()
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@profiled
+async def generate_biosketch(request):
+    """Async generate_biosketch: compiles run as subprocesses awaited on the event loop"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    drf_request = await authenticate(request)
+    if isinstance(drf_request, JsonResponse):
+        return drf_request
+
+    inputs, export_format, error = await sync_to_async(collect_biosketch_inputs)(drf_request.data, drf_request.user)
+    if error:
+        return JsonResponse(error[0], status=error[1])
+
+    outcome = 'error'
+    started = time.perf_counter()
+    try:
+        if export_format == 'latex':
+            content = generate_biosketch_latex(**inputs)
+        elif export_format == 'html':
+            content = await agenerate_biosketch_html(**inputs)
+        else:
+            content = await agenerate_biosketch_pdf(**inputs)
+        response = biosketch_response(export_format, content)
+        outcome = 'ok'
+        return response
+    except Exception as e:
+        return JsonResponse(biosketch_error(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    finally:
+        BIOSKETCH_DURATION.observe(
+            time.perf_counter() - started, format=biosketch_metric_format(export_format), outcome=outcome
+        )
@@ -0,0 +1,195 @@
+"""
+Token authentication without a database query per request.
+
+CachedTokenAuthentication resolves `Authorization: Token <key>` the way DRF's
+TokenAuthentication does, but remembers the result in two layers:
+  - a small in-process table, good for TOKEN_AUTH_LOCAL_TTL seconds, and
+  - the Django cache, good for TOKEN_AUTH_CACHE_TIMEOUT seconds, used only
+    when it is shared between workers (cv.list_cache.cache_is_shared). A
+    per-process LocMemCache would only repeat the first layer, with a
+    longer life than TOKEN_AUTH_LOCAL_TTL allows.
+Only a key neither layer knows costs the Token + User query. Entries are
+stored under a SHA-256 digest of the key, never the key itself.
+
+An entry holds the user's id, is_active and is_staff, and the token's
+creation time; never the User row, so no password hash reaches the cache.
+request.user is built from those with every other field deferred. Reading
+one of them (username, email, ...) costs a query on first access.
+
+Entries are dropped when they stop being true:
+  - Deleting a Token drops its entry. Rotating a token (rotate_token(), or
+    the login view replacing an expired one) deletes the old Token, so the
+    old key stops working at once. The new key is simply a miss.
+  - Saving a User drops the entries of their tokens, so deactivation (and
+    changes to staff status) take effect on the next request. A save of
+    last_login alone is ignored.
+Both drops happen at once and again at commit, as in cv.list_cache. Other
+processes' in-process tables aren't reached; they catch up within
+TOKEN_AUTH_LOCAL_TTL. Writes that send no signals, such as
+User.objects.update(), are bounded by TOKEN_AUTH_CACHE_TIMEOUT.
+
+With TOKEN_EXPIRY_SECONDS set, a token older than that is refused. Its
+creation time is part of the cached entry, so expiry is checked without a
+query. The default (0) keeps DRF's never-expiring tokens.
+
+Lookups are counted in cv_token_auth_cache_total by result (local, shared,
+miss).
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .list_cache import cache_is_shared
+from .metrics import TOKEN_AUTH_CACHE
+
+# Bound on the in-process table; it is cleared when full
+LOCAL_CACHE_SIZE = 4096
+
+# User fields kept in an entry, after the id; the rest are deferred
+CACHED_USER_FIELDS = ('is_active', 'is_staff')
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def token_cache_key(key):
+    return 'cv:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def clear_local_cache():
+    """Forget this process's cached tokens (for tests and settings changes)"""
+    with _local_lock:
+        _local.clear()
+
+
+def forget_local(cache_keys):
+    with _local_lock:
+        for cache_key in cache_keys:
+            _local.pop(cache_key, None)
+
+
+def invalidate_tokens(keys):
+    """Drop the cached entries of the given token keys, here and in the shared cache"""
+    cache_keys = [token_cache_key(key) for key in set(keys)]
+    if not cache_keys:
+        return
+
+    def drop():
+        forget_local(cache_keys)
+        if cache_is_shared():
+            cache.delete_many(cache_keys)
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def token_expired(created):
+    """Whether a token created at `created` (a UNIX timestamp) is past TOKEN_EXPIRY_SECONDS"""
+    expiry = settings.TOKEN_EXPIRY_SECONDS
+    return bool(expiry) and time.time() - created >= expiry
+
+
+def cached_user(user_id, flags):
+    """A User with the id and CACHED_USER_FIELDS set and every other field deferred"""
+    values = dict(zip(CACHED_USER_FIELDS, flags), id=user_id)
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db(None, fields, [values[name] for name in fields])
+
+
+def rotate_token(user):
+    """Replace the user's token with a new one; the old key stops working at once"""
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()
+        return Token.objects.create(user=user)
+
+
+def current_token(user):
+    """The user's token, replaced by a new one if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token.created.timestamp()):
+        token = rotate_token(user)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication answering repeat keys from the in-process and shared caches"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = self.cached_entry(cache_key)
+        if entry is None:
+            entry = self.load_entry(key, cache_key)
+        user_id, flags, created = entry
+
+        # A new instance per request, so one can't change another's user
+        user = cached_user(user_id, flags)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if token_expired(created):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        return user, Token(key=key, user=user, created=datetime.fromtimestamp(created, timezone.utc))
+
+    def cached_entry(self, cache_key):
+        now = time.monotonic()
+        with _local_lock:
+            hit = _local.get(cache_key)
+        if hit is not None and hit[0] > now:
+            TOKEN_AUTH_CACHE.inc(result='local')
+            return hit[1]
+
+        if not cache_is_shared():
+            return None
+        entry = cache.get(cache_key)
+        if entry is None:
+            return None
+        TOKEN_AUTH_CACHE.inc(result='shared')
+        self.remember(cache_key, entry)
+        return entry
+
+    def load_entry(self, key, cache_key):
+        TOKEN_AUTH_CACHE.inc(result='miss')
+        try:
+            token = self.get_model().objects.select_related('user').only(
+                'created', 'user__id', *('user__' + name for name in CACHED_USER_FIELDS)
+            ).get(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        flags = tuple(getattr(token.user, name) for name in CACHED_USER_FIELDS)
+        entry = (token.user_id, flags, token.created.timestamp())
+        if cache_is_shared():
+            cache.set(cache_key, entry, settings.TOKEN_AUTH_CACHE_TIMEOUT)
+        self.remember(cache_key, entry)
+        return entry
+
+    def remember(self, cache_key, entry):
+        expires = time.monotonic() + settings.TOKEN_AUTH_LOCAL_TTL
+        with _local_lock:
+            if len(_local) >= LOCAL_CACHE_SIZE:
+                _local.clear()
+            _local[cache_key] = (expires, entry)
+
+
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+
+
+def connect_signals():
+    post_delete.connect(token_deleted, sender=Token, dispatch_uid='cv.authentication.token_deleted')
+    post_save.connect(user_changed, sender=User, dispatch_uid='cv.authentication.user_changed')
@@ -0,0 +1,170 @@
+"""
+Structured author storage for publications.
+
+Publication.authors keeps the display string; PublicationAuthor rows hold one
+author per position so author-position queries can use an index.
+"""
+import re
+import unicodedata
+from django.db import transaction
+from .models import PublicationAuthor
+
+ORCID_PATTERN = re.compile(r'(\d{4}-\d{4}-\d{4}-\d{3}[\dX])')
+
+# Lowercase words that join the family name they precede ("Ludwig van Beethoven")
+NAME_PARTICLES = frozenset({
+    'al', 'bin', 'da', 'das', 'de', 'del', 'della', 'der', 'di', 'dos', 'du', 'la', 'le', 'st', 'ten', 'ter',
+    'van', 'von',
+})
+# Generational suffixes, compared lowercase without the trailing period
+NAME_SUFFIXES = frozenset({'jr', 'sr', 'ii', 'iii', 'iv'})
+
+
+def split_name(name):
+    """
+    Split "Given Family" into (family, given, suffix).
+    Particles stay with the family name ('Anna van der Berg' -> 'van der Berg'),
+    a trailing Jr/Sr/II/III/IV is returned as the suffix, and a single token is
+    treated as the family name.
+    """
+    parts = name.split()
+    suffix = ''
+    if len(parts) > 1 and parts[-1].rstrip('.').lower() in NAME_SUFFIXES:
+        suffix = parts.pop()
+    if not parts:
+        return '', '', suffix
+    start = len(parts) - 1
+    while start > 1 and parts[start - 1].lower() in NAME_PARTICLES:
+        start -= 1
+    return ' '.join(parts[start:]), ' '.join(parts[:start]), suffix
+
+
+def normalize_name(family, given=''):
+    """Lowercase ASCII 'family initial' key, e.g. ('Lessler', 'Justin') -> 'lessler j'"""
+    text = unicodedata.normalize('NFKD', f"{family} {given[:1]}")
+    text = text.encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(re.sub(r'[^a-z\s-]', '', text).split())
+
+
+def normalize_orcid(orcid):
+    """Extract the bare 0000-0000-0000-0000 identifier from an ORCID URL or string"""
+    match = ORCID_PATTERN.search(orcid or '')
+    return match.group(1) if match else ''
+
+
+def valid_orcid(orcid):
+    """Whether a bare ORCID iD has a correct ISO 7064 11,2 check digit"""
+    digits = orcid.replace('-', '')
+    if len(digits) != 16:
+        return False
+    total = 0
+    for digit in digits[:-1]:
+        total = (total + int(digit)) * 2
+    check = (12 - total % 11) % 11
+    return digits[-1] == ('X' if check == 10 else str(check))
+
+
+def clean_orcid(value):
+    """Bare ORCID iD from an iD or orcid.org URL; raises ValueError if it isn't valid"""
+    orcid = normalize_orcid(value)
+    if not orcid or not valid_orcid(orcid):
+        raise ValueError(f"Not a valid ORCID iD: {value}")
+    return orcid
+
+
+def parse_author_string(authors):
+    """Parse a comma-separated "Given Family" string into author dicts (see split_name)"""
+    result = []
+    for name in (authors or '').split(','):
+        family, given, _ = split_name(name)
+        if family:
+            result.append({'family': family, 'given': given})
+    return result
+
+
+def crossref_authors(message_authors):
+    """Convert a Crossref 'author' list into author dicts"""
+    result = []
+    for author in message_authors or []:
+        family = author.get('family') or author.get('name', '')
+        given = author.get('given', '')
+        if family or given:
+            result.append({
+                'family': family,
+                'given': given,
+                'orcid': normalize_orcid(author.get('ORCID', '')),
+            })
+    return result
+
+
+def datacite_authors(creators):
+    """Convert DataCite 'creators' into author dicts"""
+    result = []
+    for creator in creators or []:
+        family = creator.get('familyName', '')
+        given = creator.get('givenName', '')
+        if not (family or given):
+            name = creator.get('name', '')
+            if creator.get('nameType') != 'Organizational' and ',' in name:
+                family, given = (part.strip() for part in name.split(',', 1))
+            else:
+                family = name
+        orcid = next((
+            normalize_orcid(identifier.get('nameIdentifier', ''))
+            for identifier in creator.get('nameIdentifiers') or []
+            if identifier.get('nameIdentifierScheme') == 'ORCID'
+        ), '')
+        if family or given:
+            result.append({'family': family, 'given': given, 'orcid': orcid})
+    return result
+
+
+def pubmed_authors(authors):
+    """Convert NCBI esummary 'authors' ("Smith JA") into author dicts"""
+    result = []
+    for author in authors or []:
+        name = author.get('name', '').strip()
+        parts = name.split()
+        if author.get('authtype', 'Author') == 'Author' and len(parts) > 1 and parts[-1].isupper():
+            result.append({'family': ' '.join(parts[:-1]), 'given': ' '.join(parts[-1]), 'orcid': ''})
+        elif name:
+            result.append({'family': name, 'given': '', 'orcid': ''})
+    return result
+
+
+def build_publication_authors(publication, authors):
+    """Unsaved PublicationAuthor rows for a list of author dicts"""
+    last = len(authors) - 1
+    return [
+        PublicationAuthor(
+            publication=publication,
+            position=position,
+            is_last=position == last,
+            family=author.get('family', '')[:200],
+            given=author.get('given', '')[:200],
+            orcid=author.get('orcid', ''),
+            normalized_name=normalize_name(author.get('family', ''), author.get('given', ''))[:200],
+        )
+        for position, author in enumerate(authors)
+    ]
+
+
+def set_publication_authors(publication, authors):
+    """Replace a publication's structured authors with the given author dicts"""
+    with transaction.atomic():
+        PublicationAuthor.objects.filter(publication=publication).delete()
+        PublicationAuthor.objects.bulk_create(build_publication_authors(publication, authors))
+
+
+def author_position_filter(name, position='any'):
+    """
+    Q-style filter kwargs for publications by an author at a given position.
+    position is 'first', 'last' or 'any'; name is "Given Family".
+    """
+    family, given, _ = split_name(name)
+    lookup = {'author_list__normalized_name': normalize_name(family, given)}
+    if position == 'first':
+        lookup['author_list__position'] = 0
+    elif position == 'last':
+        lookup['author_list__is_last'] = True
+    return lookup
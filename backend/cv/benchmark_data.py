@@ -0,0 +1,117 @@
+"""
+Seeded synthetic data for benchmarks.
+
+generate_dataset creates users, each with a scalable number of publications,
+education, experience, award, personal statement and biosketch records. The
+same seed always produces the same data.
+"""
+import random
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from .authors import build_publication_authors, parse_author_string
+from .models import (
+    Education, ProfessionalExperience, Work, Publication, PublicationAuthor, Award, PersonalStatement, Biosketch
+)
+
+GIVEN_NAMES = ['Ada', 'Brook', 'Casey', 'Dana', 'Eli', 'Frankie', 'Gray', 'Harper', 'Indy', 'Jules', 'Kai', 'Lee']
+FAMILY_NAMES = ['Anders', 'Baptiste', 'Chen', 'Diallo', 'Eriksen', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen']
+DEGREES = ['BS', 'BA', 'MS', 'MPH', 'PhD', 'MD', 'ScD']
+FIELDS = ['Epidemiology', 'Biostatistics', 'Computer Science', 'Mathematics', 'Biology', 'Public Health']
+
+
+def _author_string(rng):
+    return ', '.join(
+        f"{rng.choice(GIVEN_NAMES)} {rng.choice(FAMILY_NAMES)}" for _ in range(rng.randint(1, 15))
+    )
+
+
+def generate_dataset(users=1, publications=100, educations=4, experiences=6, awards=5, seed=0,
+                     shared_fraction=0.3, batch_size=500):
+    """
+    Create `users` users with the given number of records each and return the
+    list of (user, token) pairs. About `shared_fraction` of each user's
+    publications cite DOIs from a pool shared by all users, as happens when
+    colleagues cite the same papers.
+    """
+    rng = random.Random(seed)
+    shared_pool = [f"10.5555/bench.shared.{i}" for i in range(max(publications, 1))]
+    created = []
+
+    for u in range(users):
+        user = User.objects.create_user(username=f'bench_user_{seed}_{u}', password='benchmark-password')
+        token = Token.objects.create(user=user)
+        created.append((user, token))
+
+        Education.objects.bulk_create([
+            Education(
+                user=user,
+                school_name=f"University of {rng.choice(FAMILY_NAMES)}",
+                location=f"City {rng.randint(1, 99)}",
+                grad_year=rng.randint(1990, 2024),
+                degree_type=rng.choice(DEGREES),
+                field_of_study=rng.choice(FIELDS),
+            )
+            for _ in range(educations)
+        ], batch_size=batch_size)
+
+        ProfessionalExperience.objects.bulk_create([
+            ProfessionalExperience(
+                user=user,
+                title=rng.choice(['Professor', 'Associate Professor', 'Research Scientist', 'Postdoctoral Fellow']),
+                institution=f"Institute of {rng.choice(FIELDS)}",
+                start_year=start,
+                end_year=rng.choice([None, start + rng.randint(1, 8)]),
+            )
+            for start in (rng.randint(1995, 2024) for _ in range(experiences))
+        ], batch_size=batch_size)
+
+        Award.objects.bulk_create([
+            Award(user=user, name=f"{rng.choice(FIELDS)} Award {i}", year=rng.randint(1995, 2024))
+            for i in range(awards)
+        ], batch_size=batch_size)
+
+        PersonalStatement.objects.create(
+            user=user,
+            title='Benchmark statement',
+            content=' '.join(rng.choice(FIELDS) for _ in range(200)),
+        )
+        Biosketch.objects.create(user=user, title='Benchmark biosketch', url='/biosketch/new?benchmark=1')
+
+        # Publications: shared DOIs reference a Work, the rest carry their own metadata
+        shared = set(rng.sample(shared_pool, int(publications * shared_fraction)))
+        rows = []
+        for i in range(publications):
+            if shared:
+                doi = shared.pop()
+                work, _ = Work.objects.get_or_create(doi=doi, defaults={
+                    'title': f"Shared work {doi}",
+                    'authors': _author_string(rng),
+                    'journal': f"Journal {rng.randint(1, 200)}",
+                    'year': rng.randint(1995, 2025),
+                })
+                rows.append(Publication(user=user, doi=doi, normalized_doi=doi, work=work))
+            else:
+                doi = f"10.5555/bench.{seed}.{u}.{i}"
+                rows.append(Publication(
+                    user=user,
+                    doi=doi,
+                    normalized_doi=doi,
+                    title=f"Benchmark publication {u}.{i} on {rng.choice(FIELDS)}",
+                    authors=_author_string(rng),
+                    journal=f"Journal {rng.randint(1, 200)}",
+                    year=rng.randint(1995, 2025),
+                    volume=str(rng.randint(1, 80)),
+                    issue=str(rng.randint(1, 12)),
+                    pages=f"{rng.randint(1, 500)}-{rng.randint(501, 900)}",
+                    citation=f"Benchmark citation {u}.{i} with 50% & special_chars #{i}",
+                ))
+        Publication.objects.bulk_create(rows, batch_size=batch_size)
+
+        author_rows = []
+        for publication in Publication.objects.filter(user=user).select_related('work'):
+            author_rows.extend(build_publication_authors(
+                publication, parse_author_string(publication.get_metadata_value('authors'))
+            ))
+        PublicationAuthor.objects.bulk_create(author_rows, batch_size=batch_size)
+
+    return created
@@ -0,0 +1,476 @@
+"""
+End-to-end API benchmarks.
+
+run_benchmarks drives every /api/cv/ list, detail and create endpoint and
+generate_biosketch (latex, html, pdf) through the full Django/DRF stack. For
+each case it records latency percentiles, SQL queries per request and Python
+allocations. List cases run with the per-user list cache cleared before each
+request (`<basename>-list`, comparable with runs before the cache) and warm
+(`<basename>-list-cached`). run_write_benchmark measures concurrent publication-create
+throughput against the configured database. run_serializer_benchmark
+compares list serialization rows/sec through the ModelSerializers and
+through their values_list() read path. run_compression_benchmark weighs JSON
+rendering time and gzip/Brotli CPU against bytes on the wire for real list
+payloads and biosketch downloads. Publication creates enrich against a
+synthesizing CrossrefStub, so no network access is needed. Run them with
+`python manage.py benchmark_api`, `benchmark_db_writes`,
+`benchmark_serializers` and `benchmark_compression`, which set up a
+throwaway database first (benchmark_database).
+"""
+import itertools
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from . import compression
+from .benchmark_data import generate_dataset
+from .crossref_stub import CrossrefStub
+from .list_cache import list_cache_key
+from .renderers import FastJSONRenderer, orjson
+from .models import Award, Biosketch, Education, PersonalStatement, ProfessionalExperience, Publication
+from .serializers import (
+    AwardSerializer,
+    BiosketchSerializer,
+    EducationSerializer,
+    PersonalStatementSerializer,
+    ProfessionalExperienceSerializer,
+    PublicationSerializer,
+    values_representation,
+)
+
+VIEWSET_BASENAMES = ['education', 'professional-experience', 'publication', 'award', 'personal-statement', 'biosketch']
+
+BIOSKETCH_FORMATS = ['latex', 'html', 'pdf']
+
+# List serializers and the querysets their viewsets read
+LIST_SERIALIZERS = [
+    (EducationSerializer, lambda user: Education.objects.filter(user=user)),
+    (ProfessionalExperienceSerializer, lambda user: ProfessionalExperience.objects.filter(user=user)),
+    (PublicationSerializer, lambda user: Publication.objects.filter(user=user).select_related('work').order_by('-id')),
+    (AwardSerializer, lambda user: Award.objects.filter(user=user)),
+    (PersonalStatementSerializer, lambda user: PersonalStatement.objects.filter(user=user)),
+    (BiosketchSerializer, lambda user: Biosketch.objects.filter(user=user)),
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def create_payloads():
+    """Infinite iterators of valid create payloads per viewset basename"""
+    counter = itertools.count()
+    return {
+        'education': ({
+            'school_name': f'Bench University {i}', 'location': 'Bench City', 'grad_year': 2000 + i % 25,
+            'degree_type': 'PhD', 'field_of_study': 'Benchmarking',
+        } for i in counter),
+        'professional-experience': ({
+            'title': f'Bench Role {i}', 'institution': 'Bench Institute', 'start_year': 2000 + i % 25,
+        } for i in counter),
+        'publication': ({'doi': f'10.5555/bench.create.{i}'} for i in counter),
+        'award': ({'name': f'Bench Award {i}', 'year': 2000 + i % 25} for i in counter),
+        'personal-statement': ({'title': f'Bench Statement {i}', 'content': 'Benchmark content. ' * 50} for i in counter),
+        'biosketch': ({'title': f'Bench Biosketch {i}', 'url': f'/biosketch/new?bench={i}'} for i in counter),
+    }
+
+
+def measure(name, request, iterations, warmup=2, setup=None):
+    """
+    Latency, query count and allocation statistics for a request callable.
+    `setup`, if given, runs before every request, outside the measurement.
+    """
+    setup = setup or (lambda: None)
+    for _ in range(warmup):
+        setup()
+        request()
+
+    latencies = []
+    queries = []
+    statuses = set()
+    for _ in range(iterations):
+        setup()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+
+    # Allocations are measured in a separate pass so tracing doesn't skew latency
+    tracemalloc.start()
+    try:
+        setup()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        response = request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'name': name,
+        'iterations': iterations,
+        'status_codes': sorted(statuses),
+        'bytes': len(response.content),
+        'latency_ms': {
+            'mean': statistics.fmean(latencies),
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        },
+        'queries': {
+            'mean': statistics.fmean(queries),
+            'max': max(queries),
+        },
+        'peak_alloc_kib': (peak - before) / 1024,
+    }
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Throwaway test database for a benchmark run. SQLite gets a temporary file
+    rather than the in-memory test database, so threads share it and the
+    journal pragmas apply as they would in production.
+    """
+    setup_test_environment()
+    temp_dir = None
+    if connection.vendor == 'sqlite':
+        temp_dir = tempfile.TemporaryDirectory()
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(temp_dir.name) / 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=False)
+        teardown_test_environment()
+        if temp_dir:
+            temp_dir.cleanup()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(users=1, publications=200, educations=4, experiences=6, awards=5, iterations=20, seed=0,
+                   formats=BIOSKETCH_FORMATS, only=None, log=None):
+    """
+    Generate a dataset and benchmark every endpoint as its first user.
+    `only` restricts cases to names containing one of the given substrings.
+    Returns a JSON-serializable results dict.
+    """
+    log = log or (lambda message: None)
+    start = time.perf_counter()
+    (user, token), *_ = generate_dataset(
+        users=users, publications=publications, educations=educations,
+        experiences=experiences, awards=awards, seed=seed,
+    )
+    log(f'Generated dataset in {time.perf_counter() - start:.1f}s')
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+    payloads = create_payloads()
+
+    cases = []
+    for basename in VIEWSET_BASENAMES:
+        listing = client.get(reverse(f'{basename}-list')).data
+        detail_id = listing[0]['id'] if listing else None
+        list_request = lambda b=basename: client.get(reverse(f'{b}-list'))
+        cases.append((f'{basename}-list', list_request, lambda b=basename: cache.delete(list_cache_key(b, user.pk))))
+        cases.append((f'{basename}-list-cached', list_request, None))
+        if detail_id is not None:
+            cases.append((f'{basename}-detail', lambda b=basename, pk=detail_id: client.get(
+                reverse(f'{b}-detail', kwargs={'pk': pk})
+            ), None))
+        cases.append((f'{basename}-create', lambda b=basename: client.post(
+            reverse(f'{b}-list'), next(payloads[b]), format='json'
+        ), None))
+
+    publication_ids = list(Publication.objects.filter(user=user).values_list('id', flat=True)[:10])
+    for export_format in formats:
+        body = {
+            'related_publication_ids': publication_ids[:5],
+            'other_publication_ids': publication_ids[5:10],
+            'summary': 'Benchmark summary with 100% special & characters_',
+            'first_name': 'Bench',
+            'last_name': 'Mark',
+            'format': export_format,
+        }
+        cases.append((f'biosketch-{export_format}', lambda body=body: client.post(
+            reverse('generate-biosketch'), body, format='json'
+        ), None))
+
+    if only:
+        cases = [case for case in cases if any(name in case[0] for name in only)]
+
+    results = []
+    with CrossrefStub(synthesize=True) as stub, override_settings(CROSSREF_API_URL=stub.url):
+        for name, request, setup in cases:
+            result = measure(name, request, iterations, setup=setup)
+            log(
+                f"{name:34s} p50 {result['latency_ms']['p50']:8.2f}ms  p99 {result['latency_ms']['p99']:8.2f}ms  "
+                f"queries {result['queries']['mean']:6.1f}  status {result['status_codes']}"
+            )
+            results.append(result)
+
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'parameters': {
+            'users': users, 'publications': publications, 'educations': educations,
+            'experiences': experiences, 'awards': awards, 'iterations': iterations, 'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current):
+    """Rows of (name, baseline p50, current p50, p50 change %, baseline queries, current queries)"""
+    previous = {result['name']: result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        old_p50 = old['latency_ms']['p50']
+        new_p50 = result['latency_ms']['p50']
+        change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        rows.append((result['name'], old_p50, new_p50, change, old['queries']['mean'], result['queries']['mean']))
+    return rows
+
+
+def run_write_benchmark(threads=8, creates=25, seed=0, log=None):
+    """
+    Create publications through the API from `threads` concurrent users,
+    `creates` each, and report throughput, latency and status codes. Errors
+    raised by the view (such as "database is locked") are counted by type.
+    """
+    log = log or (lambda message: None)
+    pairs = generate_dataset(users=threads, publications=0, educations=0, experiences=0, awards=0, seed=seed)
+    barrier = threading.Barrier(threads)
+    lock = threading.Lock()
+    latencies = []
+    outcomes = Counter()
+
+    def worker(index, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        try:
+            barrier.wait()
+            for i in range(creates):
+                start = time.perf_counter()
+                try:
+                    outcome = str(client.post(
+                        reverse('publication-list'), {'doi': f'10.5555/bench.write.{seed}.{index}.{i}'}, format='json'
+                    ).status_code)
+                except Exception as e:
+                    outcome = type(e).__name__
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    outcomes[outcome] += 1
+        finally:
+            connections.close_all()
+
+    with CrossrefStub(synthesize=True) as stub, override_settings(CROSSREF_API_URL=stub.url):
+        workers = [threading.Thread(target=worker, args=(i, token)) for i, (_, token) in enumerate(pairs)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+    created = outcomes.get('201', 0)
+    log(
+        f"{connection.vendor}: {created}/{threads * creates} created in {seconds:.2f}s "
+        f"({created / seconds:.1f}/s), p50 {percentile(latencies, 0.5):.1f}ms, "
+        f"p99 {percentile(latencies, 0.99):.1f}ms, outcomes {dict(outcomes)}"
+    )
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'sqlite_pragmas': dict(settings.SQLITE_PRAGMAS) if connection.vendor == 'sqlite' else None,
+        'threads': threads,
+        'creates_per_thread': creates,
+        'seconds': seconds,
+        'creates_per_second': created / seconds,
+        'latency_ms': {
+            'mean': statistics.fmean(latencies),
+            'p50': percentile(latencies, 0.50),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        },
+        'outcomes': dict(outcomes),
+    }
+
+
+def rows_per_second(serialize, rows, iterations):
+    """Best-of-iterations rows/sec for a callable serializing `rows` rows, query included"""
+    serialize()
+    best = min(timed_call(serialize) for _ in range(iterations))
+    return rows / best if best else float('inf')
+
+
+def timed_call(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def run_serializer_benchmark(rows=600, iterations=10, seed=0, log=None):
+    """
+    Serialize `rows` records of each list model both ways, through
+    ModelSerializer(many=True).data and through values_representation(),
+    and report rows/sec for each and whether the outputs are identical.
+    """
+    log = log or (lambda message: None)
+    (user, _), = generate_dataset(
+        users=1, publications=rows, educations=rows, experiences=rows, awards=rows, seed=seed,
+    )
+    PersonalStatement.objects.bulk_create([
+        PersonalStatement(user=user, title=f'Benchmark statement {i}', content='Benchmark content. ' * 50)
+        for i in range(rows - 1)
+    ])
+    Biosketch.objects.bulk_create([
+        Biosketch(user=user, title=f'Benchmark biosketch {i}', url=f'/biosketch/new?benchmark={i}')
+        for i in range(rows - 1)
+    ])
+
+    results = []
+    for serializer_class, queryset in LIST_SERIALIZERS:
+        count = queryset(user).count()
+        serializer = rows_per_second(lambda: serializer_class(queryset(user), many=True).data, count, iterations)
+        values = rows_per_second(lambda: values_representation(serializer_class, queryset(user)), count, iterations)
+        identical = serializer_class(queryset(user), many=True).data == values_representation(serializer_class, queryset(user))
+        log(
+            f"{serializer_class.__name__:34s} {count:5d} rows  serializer {serializer:10.0f} rows/s  "
+            f"values {values:10.0f} rows/s  x{values / serializer:5.1f}  identical {identical}"
+        )
+        results.append({
+            'serializer': serializer_class.__name__,
+            'rows': count,
+            'serializer_rows_per_second': serializer,
+            'values_rows_per_second': values,
+            'speedup': values / serializer,
+            'identical': identical,
+        })
+
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'parameters': {'rows': rows, 'iterations': iterations, 'seed': seed},
+        'results': results,
+    }
+
+
+# Levels compared per encoding; the first of each is the fastest
+COMPRESSION_LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 11)}
+
+
+def run_compression_benchmark(publications=600, iterations=5, seed=0, log=None):
+    """
+    For each list payload, time DRF's JSONRenderer against FastJSONRenderer.
+    Then compress every payload, including the LaTeX and HTML biosketch
+    downloads, at each gzip and Brotli level, and report milliseconds and
+    bytes. HTML is skipped when pandoc isn't installed; Brotli when the
+    brotli package isn't.
+    """
+    log = log or (lambda message: None)
+    (user, token), = generate_dataset(users=1, publications=publications, seed=seed)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    payloads = []
+    rendering = []
+    for basename, (serializer_class, queryset) in zip(VIEWSET_BASENAMES, LIST_SERIALIZERS):
+        data = values_representation(serializer_class, queryset(user))
+        standard = JSONRenderer().render(data)
+        fast = FastJSONRenderer().render(data)
+        standard_ms = best_ms(lambda: JSONRenderer().render(data), iterations)
+        fast_ms = best_ms(lambda: FastJSONRenderer().render(data), iterations)
+        log(
+            f"{basename + '-list':28s} {len(standard):9d} bytes  json {standard_ms:7.2f}ms  "
+            f"fast {fast_ms:7.2f}ms  identical {fast == standard}"
+        )
+        rendering.append({
+            'payload': f'{basename}-list', 'bytes': len(standard), 'json_ms': standard_ms,
+            'fast_ms': fast_ms, 'identical': fast == standard,
+        })
+        payloads.append((f'{basename}-list', standard))
+
+    publication_ids = list(Publication.objects.filter(user=user).values_list('id', flat=True)[:10])
+    for export_format in ('latex', 'html'):
+        if export_format == 'html' and not shutil.which('pandoc'):
+            log('biosketch-html: skipped (pandoc not installed)')
+            continue
+        response = client.post(reverse('generate-biosketch'), {
+            'related_publication_ids': publication_ids[:5],
+            'other_publication_ids': publication_ids[5:10],
+            'summary': 'Benchmark summary',
+            'first_name': 'Bench',
+            'last_name': 'Mark',
+            'format': export_format,
+        }, format='json')
+        if response.status_code == 200:
+            payloads.append((f'biosketch-{export_format}', response.content))
+        else:
+            log(f"biosketch-{export_format}: skipped (status {response.status_code})")
+
+    results = []
+    for name, content in payloads:
+        for encoding in compression.available_encodings():
+            for level in COMPRESSION_LEVELS[encoding]:
+                compressed = compression.compress(content, encoding, level)
+                milliseconds = best_ms(lambda: compression.compress(content, encoding, level), iterations)
+                log(
+                    f"{name:28s} {encoding:4s} {level:2d}  {len(content):9d} -> {len(compressed):8d} bytes "
+                    f"({len(compressed) / len(content):6.1%})  {milliseconds:7.2f}ms"
+                )
+                results.append({
+                    'payload': name, 'encoding': encoding, 'level': level, 'bytes': len(content),
+                    'compressed_bytes': len(compressed), 'ms': milliseconds,
+                })
+
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'orjson': orjson is not None,
+        'brotli': compression.brotli is not None,
+        'parameters': {'publications': publications, 'iterations': iterations, 'seed': seed},
+        'rendering': rendering,
+        'compression': results,
+    }
+
+
+def best_ms(function, iterations):
+    return min(timed_call(function) for _ in range(iterations)) * 1000
@@ -0,0 +1,188 @@
+"""
+Local citation formatting for publications.
+
+Renders APA, NIH (NLM) and AMA citations from the bibliographic fields stored on
+a Publication, so no round trip to citation.doi.org is needed.
+"""
+import hashlib
+from django.core.cache import cache
+from .authors import split_name
+from .metrics import CITATION_CACHE
+
+STYLES = ('apa', 'nih', 'ama')
+DEFAULT_STYLE = 'apa'
+
+CITATION_FIELDS = ('doi', 'title', 'authors', 'journal', 'year', 'volume', 'issue', 'pages', 'pmid')
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def initials(given, separator=' ', suffix='.'):
+    """Initials of the given names, including hyphenated parts (Jean-Paul -> J.-P.)"""
+    result = []
+    for part in given.split():
+        letters = [piece[0].upper() for piece in part.split('-') if piece]
+        if letters:
+            result.append((suffix + '-').join(letters) + suffix)
+    return separator.join(result).strip()
+
+
+def parse_authors(authors):
+    """Parse a comma-separated author string into (family, given, suffix) tuples (see cv.authors.split_name)"""
+    if not authors:
+        return []
+    return [split_name(name) for name in authors.split(',') if name.strip()]
+
+
+def _sentence(text):
+    """Terminate text with a period unless it already ends in punctuation"""
+    text = text.strip()
+    if text and text[-1] not in '.?!':
+        text += '.'
+    return text
+
+
+def _apa_authors(authors):
+    names = [
+        ', '.join(part for part in (family, initials(given), suffix) if part)
+        for family, given, suffix in authors
+    ]
+    if len(names) == 1:
+        return names[0]
+    if len(names) > 20:
+        return ', '.join(names[:19]) + ', ... ' + names[-1]
+    return ', '.join(names[:-1]) + ', & ' + names[-1]
+
+
+def _nlm_authors(authors, limit=None, keep=None):
+    names = [
+        ' '.join(part for part in (family, initials(given, separator='', suffix=''), suffix.rstrip('.')) if part)
+        for family, given, suffix in authors
+    ]
+    if limit and len(names) > limit:
+        return ', '.join(names[:keep]) + ', et al'
+    return ', '.join(names)
+
+
+def _nlm_source(fields):
+    """Journal. Year;Volume(Issue):Pages. as used by both NIH and AMA styles"""
+    source = _sentence(fields.get('journal') or '')
+    date = str(fields['year']) if fields.get('year') else ''
+    if fields.get('volume'):
+        date += f";{fields['volume']}"
+        if fields.get('issue'):
+            date += f"({fields['issue']})"
+    if fields.get('pages'):
+        date += f":{fields['pages']}"
+    return ' '.join(part for part in (source, _sentence(date)) if part)
+
+
+def format_apa(fields):
+    authors = parse_authors(fields.get('authors'))
+    parts = []
+    if authors:
+        parts.append(_sentence(_apa_authors(authors)))
+    parts.append(f"({fields['year']})." if fields.get('year') else '(n.d.).')
+    if fields.get('title'):
+        parts.append(_sentence(fields['title']))
+    if fields.get('journal'):
+        source = fields['journal']
+        if fields.get('volume'):
+            source += f", {fields['volume']}"
+            if fields.get('issue'):
+                source += f"({fields['issue']})"
+        if fields.get('pages'):
+            source += f", {fields['pages']}"
+        parts.append(_sentence(source))
+    if fields.get('doi'):
+        parts.append(f"https://doi.org/{fields['doi']}")
+    return ' '.join(parts)
+
+
+def format_nih(fields):
+    parts = []
+    authors = parse_authors(fields.get('authors'))
+    if authors:
+        parts.append(_sentence(_nlm_authors(authors)))
+    if fields.get('title'):
+        parts.append(_sentence(fields['title']))
+    source = _nlm_source(fields)
+    if source:
+        parts.append(source)
+    if fields.get('doi'):
+        parts.append(f"doi: {fields['doi']}" + ('.' if fields.get('pmid') else ''))
+    if fields.get('pmid'):
+        parts.append(f"PMID: {fields['pmid']}")
+    return ' '.join(parts)
+
+
+def format_ama(fields):
+    parts = []
+    authors = parse_authors(fields.get('authors'))
+    if authors:
+        parts.append(_sentence(_nlm_authors(authors, limit=6, keep=3)))
+    if fields.get('title'):
+        parts.append(_sentence(fields['title']))
+    source = _nlm_source(fields)
+    if source:
+        parts.append(source)
+    if fields.get('doi'):
+        parts.append(f"doi:{fields['doi']}")
+    return ' '.join(parts)
+
+
+FORMATTERS = {
+    'apa': format_apa,
+    'nih': format_nih,
+    'ama': format_ama,
+}
+
+
+def format_citation(fields, style=DEFAULT_STYLE):
+    """Render a citation string in the given style from a dict of publication fields"""
+    if style not in FORMATTERS:
+        raise ValueError(f"Unknown citation style: {style}")
+    return FORMATTERS[style](fields)
+
+
+def publication_fields(publication):
+    """Citation fields for a Publication, with its Work filling in blank values"""
+    metadata = publication.get_metadata()
+    metadata['doi'] = publication.doi
+    return {field: metadata[field] for field in CITATION_FIELDS}
+
+
+def citation_cache_key(publication, style):
+    """Cache key for a (publication, style) pair; any field edit produces a new key"""
+    fields = publication_fields(publication)
+    digest = hashlib.md5(repr(sorted(fields.items())).encode('utf-8')).hexdigest()
+    return f"cv:citation:{style}:{publication.pk}:{digest}"
+
+
+def get_citation(publication, style=DEFAULT_STYLE):
+    """Formatted citation for a Publication, cached per (publication, style)"""
+    key = citation_cache_key(publication, style)
+    citation = cache.get(key)
+    if citation is None:
+        CITATION_CACHE.inc(result='miss')
+        citation = format_citation(publication_fields(publication), style)
+        cache.set(key, citation, CACHE_TIMEOUT)
+    else:
+        CITATION_CACHE.inc(result='hit')
+    return citation
+
+
+def citation_for_biosketch(publication, style=None):
+    """
+    Citation text for a biosketch entry.
+    With a style, the citation is rendered from the stored fields (when there is a
+    title to render); otherwise the saved citation is used, falling back to the DOI.
+    """
+    if style and publication.get_metadata_value('title'):
+        return get_citation(publication, style)
+    citation = publication.get_metadata_value('citation')
+    if citation:
+        return citation
+    if publication.doi:
+        return f"DOI: {publication.doi}"
+    return ""
@@ -0,0 +1,144 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses textual responses of at least
+RESPONSE_COMPRESSION_MIN_BYTES: JSON API payloads and the LaTeX and HTML
+biosketch downloads. PDFs and other binary types are left alone.
+  - The encoding follows the request's Accept-Encoding q-values. On a tie,
+    Brotli is preferred over gzip. Brotli needs the `brotli` package from
+    the optional `fast` extra; without it only gzip is offered.
+  - Levels are set by RESPONSE_COMPRESSION_GZIP_LEVEL and
+    RESPONSE_COMPRESSION_BROTLI_QUALITY. The defaults favour CPU per request
+    over the last few percent of size (see `manage.py benchmark_compression`).
+  - Eligible responses get `Vary: Accept-Encoding`, compressed or not.
+    Strong ETags are weakened when the body is compressed.
+  - Streaming responses, responses that already have a Content-Encoding, and
+    bodies that wouldn't get smaller are sent as they are.
+
+Compressing a response that holds a secret next to text the client chose
+allows BREACH: an attacker who can make the victim's browser send requests
+and can watch response sizes learns the secret a byte at a time. A browser
+attaches the session cookie to such forged requests, but not the
+`Authorization: Token` header the frontend uses. So responses to requests
+carrying the session cookie are not compressed unless
+RESPONSE_COMPRESSION_SESSION_REQUESTS is set. Set
+RESPONSE_COMPRESSION_MIN_BYTES very high to turn compression off entirely.
+
+Compression time counts as serialize in the request timings. Counts and byte
+totals by encoding are exported as cv_response_compressed_total and
+cv_response_compression_bytes_total.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .instrumentation import timed
+from .metrics import COMPRESSED_RESPONSES, COMPRESSION_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+# Content types worth compressing (prefixes)
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-tex',
+    'application/x-latex',
+    'image/svg+xml',
+)
+
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = (piece.strip() for piece in part.split(';'))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(header, encodings=None):
+    """The best encoding both sides accept (highest q, then our preference), or None"""
+    accepted = accepted_encodings(header or '')
+    encodings = encodings or available_encodings()
+    ranked = [
+        (accepted.get(coding, accepted.get('*', 0.0)), -rank, coding)
+        for rank, coding in enumerate(encodings)
+    ]
+    q, _, coding = max(ranked)
+    return coding if q > 0 else None
+
+
+def compress(content, encoding, level=None):
+    """content compressed with 'gzip' or 'br', at the configured level unless one is given"""
+    if encoding == 'br':
+        quality = settings.RESPONSE_COMPRESSION_BROTLI_QUALITY if level is None else level
+        return brotli.compress(content, quality=quality, mode=brotli.MODE_TEXT)
+    level = settings.RESPONSE_COMPRESSION_GZIP_LEVEL if level is None else level
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def session_request(request):
+    """Whether the request carries the session cookie a cross-site request could forge"""
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith('+json')
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress large textual responses with the best encoding the client accepts"""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not is_compressible(response.get('Content-Type', '')):
+            return response
+        if session_request(request) and not settings.RESPONSE_COMPRESSION_SESSION_REQUESTS:
+            return response
+        content = response.content
+        if len(content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        with timed('serialize'):
+            compressed = compress(content, encoding)
+        if len(compressed) >= len(content):
+            return response
+
+        COMPRESSED_RESPONSES.inc(encoding=encoding)
+        COMPRESSION_BYTES.inc(len(content), encoding=encoding, stage='raw')
+        COMPRESSION_BYTES.inc(len(compressed), encoding=encoding, stage='sent')
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
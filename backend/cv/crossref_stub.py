@@ -0,0 +1,358 @@
+"""
+Offline stand-ins for the Crossref API and the other metadata providers.
+
+Serves /works/{doi}, multi-DOI /works?filter=doi:A,doi:B queries and /format
+from a corpus of recorded Crossref "work" messages, with configurable latency,
+error and 429 injection, so the DOI enrichment path can be tested and
+benchmarked without network access. /works/{doi} responses carry an ETag and
+answer a matching If-None-Match with 304. Point the backend at it with
+CROSSREF_API_URL (see config/settings.py).
+
+The corpus is a directory of JSON files, one Crossref message per file, named
+by the quoted normalized DOI (see fixture_path). Run it with
+`python manage.py crossref_stub`.
+
+DataCiteStub and PubMedStub serve the DataCite and NCBI E-utilities endpoints
+used by cv.providers from in-memory records, with the same fault injection.
+OrcidStub serves ORCID works summaries for cv.orcid the same way.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+import requests
+
+from .citations import format_citation
+from .dois import normalize_doi
+
+DEFAULT_FIXTURE_DIR = Path(__file__).parent / 'crossref_fixtures'
+
+
+def fixture_path(fixture_dir, doi):
+    return Path(fixture_dir) / f"{quote(normalize_doi(doi), safe='')}.json"
+
+
+def synthetic_message(doi):
+    """Deterministic fake Crossref message for a DOI that has no recorded fixture"""
+    rng = random.Random(doi)
+    year = rng.randint(1995, 2025)
+    first_page = rng.randint(1, 900)
+    return {
+        'DOI': doi,
+        'title': [f"Synthetic work {doi}"],
+        'author': [
+            {'given': f"Given{rng.randint(1, 500)}", 'family': f"Family{rng.randint(1, 500)}"}
+            for _ in range(rng.randint(1, 12))
+        ],
+        'container-title': [f"Journal {rng.randint(1, 200)}"],
+        'published-print': {'date-parts': [[year, rng.randint(1, 12)]]},
+        'volume': str(rng.randint(1, 80)),
+        'issue': str(rng.randint(1, 12)),
+        'page': f"{first_page}-{first_page + rng.randint(1, 30)}",
+    }
+
+
+def message_etag(message):
+    return '"' + hashlib.sha1(json.dumps(message, sort_keys=True).encode('utf-8')).hexdigest()[:16] + '"'
+
+
+def orcid_works_summary(works):
+    """
+    ORCID v3.0 works summary for simple work dicts with put_code, doi, title,
+    journal, year and modified (last-modified-date in ms, default 0)
+    """
+    groups = []
+    for work in works:
+        external_ids = {'external-id': [{
+            'external-id-type': 'doi',
+            'external-id-value': work['doi'],
+            'external-id-normalized': {'value': normalize_doi(work['doi'])},
+            'external-id-relationship': 'self',
+        }] if work.get('doi') else []}
+        modified = {'value': work.get('modified', 0)}
+        groups.append({'last-modified-date': modified, 'external-ids': external_ids, 'work-summary': [{
+            'put-code': work['put_code'],
+            'last-modified-date': modified,
+            'title': {'title': {'value': work.get('title', '')}},
+            'external-ids': external_ids,
+            'type': work.get('type', 'journal-article'),
+            'publication-date': {'year': {'value': str(work['year'])}} if work.get('year') else None,
+            'journal-title': {'value': work['journal']} if work.get('journal') else None,
+            'display-index': '1',
+        }]})
+    return {
+        'last-modified-date': {'value': max((work.get('modified', 0) for work in works), default=0)},
+        'group': groups,
+    }
+
+
+def message_fields(message):
+    """Publication-style fields from a Crossref message, for /format"""
+    date = message.get('published-print') or message.get('published-online') or {}
+    parts = (date.get('date-parts') or [[None]])[0]
+    return {
+        'doi': message.get('DOI', ''),
+        'title': (message.get('title') or [''])[0],
+        'authors': ', '.join(
+            f"{author.get('given', '')} {author.get('family', '')}".strip()
+            for author in message.get('author', [])
+        ),
+        'journal': (message.get('container-title') or [''])[0],
+        'year': parts[0] if parts else None,
+        'volume': message.get('volume', ''),
+        'issue': message.get('issue', ''),
+        'pages': message.get('page', ''),
+    }
+
+
+class CrossrefStub:
+    """
+    Fixture-backed Crossref server.
+
+    latency and jitter are in seconds; error_rate and throttle_rate are the
+    fractions of requests answered with a 500 or a 429. With synthesize, unknown
+    DOIs get a generated record instead of a 404. With record_from, unknown
+    DOIs are fetched from that upstream and written to the corpus.
+    """
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, synthesize=False, record_from=None, seed=None):
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.synthesize = synthesize
+        self.record_from = record_from.rstrip('/') if record_from else None
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread; returns self so it can be used inline"""
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def lookup(self, doi):
+        """Crossref message for a DOI, or None"""
+        path = fixture_path(self.fixture_dir, doi)
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        if self.record_from:
+            response = requests.get(f"{self.record_from}/works/{doi}", timeout=30)
+            if response.status_code == 200:
+                message = response.json().get('message', {})
+                self.fixture_dir.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(message, indent=2, sort_keys=True), encoding='utf-8')
+                return message
+            return None
+        if self.synthesize:
+            return synthetic_message(normalize_doi(doi))
+        return None
+
+    def _draw(self):
+        """Latency and injected outcome for one request"""
+        with self._lock:
+            self.request_count += 1
+            delay = max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0.0)
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, 500
+        return delay, None
+
+    def respond(self, handler, parsed):
+        """Answer one GET after fault injection"""
+        if parsed.path.startswith('/works/'):
+            message = self.lookup(unquote(parsed.path[len('/works/'):]))
+            if message is None:
+                return handler.send_body(404, 'Resource not found.', 'text/plain')
+            etag = message_etag(message)
+            if handler.headers.get('If-None-Match') == etag:
+                return handler.send_body(304, '', headers={'ETag': etag})
+            return handler.send_body(200, json.dumps({
+                'status': 'ok',
+                'message-type': 'work',
+                'message-version': '1.0.0',
+                'message': message,
+            }), headers={'ETag': etag})
+        if parsed.path.rstrip('/') == '/works':
+            params = parse_qs(parsed.query)
+            filters = ','.join(params.get('filter', [])).split(',')
+            dois = [value[len('doi:'):] for value in filters if value.startswith('doi:')]
+            if not dois:
+                return handler.send_body(400, 'Only doi: filters are supported', 'text/plain')
+            items = [message for message in map(self.lookup, dois) if message is not None]
+            rows = int(params.get('rows', ['20'])[0])
+            return handler.send_body(200, json.dumps({
+                'status': 'ok',
+                'message-type': 'work-list',
+                'message-version': '1.0.0',
+                'message': {'total-results': len(items), 'items': items[:rows]},
+            }))
+        if parsed.path.rstrip('/') == '/format':
+            params = parse_qs(parsed.query)
+            message = self.lookup(params.get('doi', [''])[0])
+            if message is None:
+                return handler.send_body(404, 'DOI not found', 'text/plain')
+            style = params.get('style', ['apa'])[0]
+            try:
+                citation = format_citation(message_fields(message), style)
+            except ValueError:
+                return handler.send_body(400, f'Unknown style: {style}', 'text/plain')
+            return handler.send_body(200, citation, 'text/plain; charset=utf-8')
+        return handler.send_body(404, 'Not found', 'text/plain')
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_body(self, status, body, content_type='application/json', headers=None):
+                payload = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up, e.g. its deadline passed
+
+            def do_GET(self):
+                delay, injected = stub._draw()
+                if delay:
+                    time.sleep(delay)
+                if injected == 429:
+                    return self.send_body(429, 'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+                if injected == 500:
+                    return self.send_body(500, 'Internal Server Error', 'text/plain')
+
+                return stub.respond(self, urlparse(self.path))
+
+        return Handler
+
+
+class DataCiteStub(CrossrefStub):
+    """
+    DataCite REST API stand-in serving /dois/{doi} from `records`, a dict of
+    normalized DOI to DataCite "attributes". Fault injection as for CrossrefStub.
+    """
+
+    def __init__(self, records=None, **kwargs):
+        super().__init__(**kwargs)
+        self.records = {normalize_doi(doi): attributes for doi, attributes in (records or {}).items()}
+
+    def lookup(self, doi):
+        return self.records.get(normalize_doi(doi))
+
+    def respond(self, handler, parsed):
+        if parsed.path.startswith('/dois/'):
+            doi = normalize_doi(unquote(parsed.path[len('/dois/'):]))
+            attributes = self.lookup(doi)
+            if attributes is None:
+                return handler.send_body(404, json.dumps({'errors': [{'status': '404', 'title': 'Not found'}]}))
+            return handler.send_body(200, json.dumps({'data': {'id': doi, 'type': 'dois', 'attributes': attributes}}))
+        return handler.send_body(404, 'Not found', 'text/plain')
+
+
+class PubMedStub(CrossrefStub):
+    """
+    NCBI E-utilities stand-in serving esearch (by [doi] term) and esummary for
+    PubMed from `records`, a dict of PMID to esummary document.
+    """
+
+    def __init__(self, records=None, **kwargs):
+        super().__init__(**kwargs)
+        self.records = {str(pmid): summary for pmid, summary in (records or {}).items()}
+
+    def lookup(self, pmid):
+        return self.records.get(str(pmid))
+
+    def respond(self, handler, parsed):
+        params = parse_qs(parsed.query)
+        if parsed.path.endswith('/esearch.fcgi'):
+            term = params.get('term', [''])[0]
+            doi = normalize_doi(term[:-len('[doi]')]) if term.endswith('[doi]') else ''
+            ids = [
+                pmid for pmid, summary in self.records.items()
+                if doi and any(
+                    article_id.get('idtype') == 'doi' and normalize_doi(article_id.get('value')) == doi
+                    for article_id in summary.get('articleids', [])
+                )
+            ]
+            return handler.send_body(200, json.dumps({
+                'header': {'type': 'esearch', 'version': '0.3'},
+                'esearchresult': {'count': str(len(ids)), 'retmax': str(len(ids)), 'retstart': '0', 'idlist': ids},
+            }))
+        if parsed.path.endswith('/esummary.fcgi'):
+            ids = [pmid for pmid in ','.join(params.get('id', [])).split(',') if pmid]
+            result = {'uids': ids}
+            for pmid in ids:
+                summary = self.lookup(pmid)
+                result[pmid] = {'uid': pmid, **summary} if summary else {'uid': pmid, 'error': 'cannot get document summary'}
+            return handler.send_body(200, json.dumps({'header': {'type': 'esummary', 'version': '0.3'}, 'result': result}))
+        return handler.send_body(404, 'Not found', 'text/plain')
+
+
+class OrcidStub(CrossrefStub):
+    """
+    ORCID public API stand-in serving /{orcid}/works from `records`, a dict of
+    ORCID iD to works summary (see orcid_works_summary). Responses carry an
+    ETag and answer a matching If-None-Match with 304, as for /works/{doi}.
+    """
+
+    def __init__(self, records=None, **kwargs):
+        super().__init__(**kwargs)
+        self.records = dict(records or {})
+
+    def lookup(self, orcid):
+        return self.records.get(orcid)
+
+    def respond(self, handler, parsed):
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) == 2 and parts[1] == 'works':
+            summary = self.lookup(parts[0])
+            if summary is None:
+                return handler.send_body(404, json.dumps({
+                    'response-code': 404, 'developer-message': f'ORCID iD {parts[0]} not found',
+                }))
+            etag = message_etag(summary)
+            if handler.headers.get('If-None-Match') == etag:
+                return handler.send_body(304, '', headers={'ETag': etag})
+            return handler.send_body(200, json.dumps(summary), headers={'ETag': etag})
+        return handler.send_body(404, 'Not found', 'text/plain')
@@ -0,0 +1,22 @@
+"""
+DOI normalization.
+
+DOIs are case-insensitive and are often entered as URLs or with a "doi:" prefix;
+normalize_doi reduces all of these to the bare lowercase "10.x/y" form.
+"""
+import re
+from urllib.parse import unquote
+
+DOI_PREFIX_PATTERN = re.compile(
+    r'^(?:https?://)?(?:(?:dx|www)\.)?doi\.org/|^doi:\s*',
+    re.IGNORECASE
+)
+
+
+def normalize_doi(doi):
+    """Canonical form of a DOI: no resolver URL or doi: prefix, stripped and lowercased"""
+    if not doi:
+        return ''
+    doi = unquote(doi.strip())
+    doi = DOI_PREFIX_PATTERN.sub('', doi)
+    return doi.strip().lower()
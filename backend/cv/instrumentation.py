@@ -0,0 +1,234 @@
+"""
+Per-request time attribution.
+
+RequestTimingMiddleware splits each request's wall time into buckets:
+  db         SQL execution (via an execute wrapper), with a query count
+  http       outbound HTTP such as Crossref lookups
+  subprocess pdflatex and pandoc runs
+  serialize  template and response rendering
+  app        everything else
+
+Code outside the ORM marks its own work with `timed('http')` and similar. The
+timers are exclusive, so a query run while a template renders is counted as
+db, not serialize. Responses carry a Server-Timing header when
+REQUEST_TIMING_HEADER is on (it follows DEBUG by default); otherwise only
+staff users get it, since it discloses query counts and timings per view.
+With REQUEST_TIMING_SAMPLE_RATE set (it is 0 by default), that share of requests
+is aggregated per view and logged to the 'cv.timing' logger every
+REQUEST_TIMING_LOG_INTERVAL seconds. Outside a request, timed() does nothing.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('cv.timing')
+
+BUCKETS = ('db', 'http', 'subprocess', 'serialize')
+
+_current = contextvars.ContextVar('cv_request_timings', default=None)
+
+
+class RequestTimings:
+    """Accumulated exclusive time per bucket for one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(BUCKETS, 0.0)
+        self.queries = 0
+        # Inner-timer time per open timer, subtracted from the enclosing one
+        self._nested = []
+
+    def begin(self):
+        self._nested.append(0.0)
+        return time.perf_counter()
+
+    def end(self, bucket, started):
+        elapsed = time.perf_counter() - started
+        inner = self._nested.pop()
+        self.durations[bucket] += elapsed - inner
+        if self._nested:
+            self._nested[-1] += elapsed
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def breakdown(self):
+        """Bucket durations in seconds, including the 'app' remainder and 'total'"""
+        total = self.total()
+        durations = dict(self.durations)
+        durations['app'] = max(total - sum(self.durations.values()), 0.0)
+        durations['total'] = total
+        return durations
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def timed(bucket):
+    """Attribute the enclosed block to a timing bucket for the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = timings.begin()
+    try:
+        yield
+    finally:
+        timings.end(bucket, started)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    timings.queries += 1
+    started = timings.begin()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.end('db', started)
+
+
+def install_db_wrapper(sender=None, connection=None, **kwargs):
+    """
+    Add the timing wrapper to a connection once. It stays installed, doing
+    nothing outside a timed request. It goes first in the list so that
+    connection.execute_wrapper() blocks, which pop from the end, leave it be.
+    """
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _db_wrapper)
+
+
+connection_created.connect(install_db_wrapper)
+
+
+def server_timing_header(timings):
+    parts = []
+    for name, seconds in timings.breakdown().items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == 'db':
+            entry += f';desc="{timings.queries} queries"'
+        parts.append(entry)
+    return ', '.join(parts)
+
+
+class TimingAggregator:
+    """Per-view totals of sampled requests, flushed to the log periodically"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, view, timings):
+        breakdown = timings.breakdown()
+        with self._lock:
+            stats = self._views.setdefault(view, {'count': 0, 'queries': 0, 'max': 0.0, **dict.fromkeys(breakdown, 0.0)})
+            stats['count'] += 1
+            stats['queries'] += timings.queries
+            stats['max'] = max(stats['max'], breakdown['total'])
+            for name, seconds in breakdown.items():
+                stats[name] += seconds
+
+    def flush_due(self, interval):
+        return time.monotonic() - self._last_flush >= interval
+
+    def flush(self):
+        with self._lock:
+            views, self._views = self._views, {}
+            self._last_flush = time.monotonic()
+        for view, stats in sorted(views.items()):
+            count = stats['count']
+            logger.info(
+                '%s n=%d mean=%.1fms max=%.1fms queries=%.1f %s',
+                view, count, stats['total'] / count * 1000, stats['max'] * 1000, stats['queries'] / count,
+                ' '.join(f"{name}={stats[name] / count * 1000:.1f}ms" for name in (*BUCKETS, 'app')),
+            )
+        return views
+
+
+aggregator = TimingAggregator()
+
+
+def timing_header_allowed(request):
+    """Whether the response may carry Server-Timing: always with REQUEST_TIMING_HEADER, else for staff"""
+    if getattr(settings, 'REQUEST_TIMING_HEADER', False):
+        return True
+    # DRF sets the authenticated user back on the Django request
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class RequestTimingMiddleware:
+    """Attribute request time to db/http/subprocess/serialize and report it"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_db_wrapper(connection=connection)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        # ORM calls run in sync_to_async threads, which inherit this context;
+        # their connections get the wrapper from connection_created
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        if timing_header_allowed(request):
+            response['Server-Timing'] = server_timing_header(timings)
+
+        match = getattr(request, 'resolver_match', None)
+        view = f"{request.method} {match.view_name if match else request.path}"
+        total_ms = timings.total() * 1000
+        slow_ms = getattr(settings, 'REQUEST_TIMING_SLOW_MS', None)
+        if slow_ms is not None and total_ms >= slow_ms:
+            logger.warning('Slow request %s %.1fms: %s', view, total_ms, server_timing_header(timings))
+
+        if random.random() < getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 0.0):
+            aggregator.record(view, timings)
+        if aggregator.flush_due(getattr(settings, 'REQUEST_TIMING_LOG_INTERVAL', 60)):
+            aggregator.flush()
+        return response
+
+    def process_template_response(self, request, response):
+        """Time DRF/template rendering, which happens after the view returns"""
+        timings = _current.get()
+        if timings is None:
+            return response
+        render = response.render
+
+        def timed_render():
+            with timed('serialize'):
+                return render()
+
+        response.render = timed_render
+        return response
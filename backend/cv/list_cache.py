@@ -0,0 +1,122 @@
+"""
+Per-user cache of list endpoint payloads.
+
+CV data is read far more often than it changes. CachedListMixin keeps each
+user's serialized list (e.g. GET /api/cv/publications/) in the Django cache,
+so a repeat read is one cache lookup, with no query and no serializer pass.
+
+Entries are dropped when the data behind them changes:
+  - post_save/post_delete on a cached model drop its owner's entry for that
+    resource. The drop happens at once and again at commit, so a read racing
+    the write can't put the old rows back.
+  - Saves and deletes of a Work drop the publication lists of every user
+    linked to it. A save that touched none of the fields the list shows is
+    ignored.
+  - Bulk writes send no signals, so they call invalidate_list() themselves.
+
+Only unfiltered lists are cached. Requests with a query string, such as
+?search=, always go to the database. LIST_CACHE_TIMEOUT limits how long an
+entry can outlive a write that bypassed all of the above, such as a
+queryset.update().
+
+Invalidation only reaches other workers through a cache they share (CACHE_DIR,
+or Redis/Memcached in CACHES). On a per-process cache (the LocMemCache
+default) a write in one worker can't drop another worker's copy, so entries
+there live only LIST_CACHE_LOCAL_TIMEOUT seconds. That is how long another
+worker may serve the list from before a write.
+
+Lookups are counted in cv_list_cache_total by resource and result.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from rest_framework.response import Response
+
+from .metrics import LIST_CACHE, LIST_CACHE_INVALIDATIONS
+from .models import Award, Biosketch, Education, PersonalStatement, ProfessionalExperience, Publication, Work
+
+# Cached user-owned models, by the basename of the viewset listing them
+MODEL_RESOURCES = {
+    Education: 'education',
+    ProfessionalExperience: 'professional-experience',
+    Publication: 'publication',
+    Award: 'award',
+    PersonalStatement: 'personal-statement',
+    Biosketch: 'biosketch',
+}
+
+
+def cache_is_shared():
+    """Whether the default cache is one store for every worker, rather than per-process memory"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def list_cache_timeout():
+    return settings.LIST_CACHE_TIMEOUT if cache_is_shared() else settings.LIST_CACHE_LOCAL_TIMEOUT
+
+
+def list_cache_key(resource, user_id):
+    return f"cv:list:{resource}:{user_id}"
+
+
+def invalidate_list(resource, user_ids):
+    """Drop the cached `resource` list of each user in user_ids"""
+    keys = [list_cache_key(resource, user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+    LIST_CACHE_INVALIDATIONS.inc(len(keys), resource=resource)
+
+
+class CachedListMixin:
+    """Viewset mixin serving unfiltered list() responses from the per-user list cache"""
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            LIST_CACHE.inc(resource=self.basename, result='bypass')
+            return super().list(request, *args, **kwargs)
+
+        key = list_cache_key(self.basename, request.user.pk)
+        data = cache.get(key)
+        if data is not None:
+            LIST_CACHE.inc(resource=self.basename, result='hit')
+            return Response(data)
+
+        LIST_CACHE.inc(resource=self.basename, result='miss')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            # Plain containers: DRF's ReturnList keeps a reference to its serializer
+            data = dict(response.data) if isinstance(response.data, dict) else list(response.data)
+            cache.set(key, data, list_cache_timeout())
+        return response
+
+
+def owner_changed(sender, instance, **kwargs):
+    invalidate_list(MODEL_RESOURCES[sender], [instance.user_id])
+
+
+def work_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(Publication.METADATA_FIELDS):
+        return
+    invalidate_list('publication', Publication.objects.filter(work_id=instance.pk).values_list('user_id', flat=True))
+
+
+def user_created(sender, instance, created, **kwargs):
+    # A new account must not see lists cached under a reused id, e.g. after a rollback
+    if created:
+        cache.delete_many([list_cache_key(resource, instance.pk) for resource in MODEL_RESOURCES.values()])
+
+
+def connect_signals():
+    for model in MODEL_RESOURCES:
+        post_save.connect(owner_changed, sender=model, dispatch_uid=f'cv.list_cache.save.{model.__name__}')
+        post_delete.connect(owner_changed, sender=model, dispatch_uid=f'cv.list_cache.delete.{model.__name__}')
+    post_save.connect(work_changed, sender=Work, dispatch_uid='cv.list_cache.save.Work')
+    # Before the delete, while publications still point at the Work
+    pre_delete.connect(work_changed, sender=Work, dispatch_uid='cv.list_cache.delete.Work')
+    post_save.connect(user_created, sender=User, dispatch_uid='cv.list_cache.user_created')
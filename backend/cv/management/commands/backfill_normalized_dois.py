@@ -0,0 +1,119 @@
+"""
+Django management command to fill Publication.normalized_doi for existing rows.
+Usage: python manage.py backfill_normalized_dois [--batch-size N] [--rebuild] [--merge]
+
+A row whose normalized DOI duplicates another publication of the same user is
+reported and left with a null normalized_doi; it will fail the unique
+constraint on its next full save until resolved. With --merge it is folded
+into the older publication instead: blank fields of the kept row are filled
+from the duplicate, its structured authors move over if the kept row has
+none, and the duplicate is deleted. Merging is destructive: saved biosketch
+URLs that name a merged publication's id silently lose that entry.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from cv.dois import normalize_doi
+from cv.list_cache import invalidate_list
+from cv.models import Publication, PublicationAuthor
+
+# Fields copied from a duplicate when the kept publication's value is blank
+MERGE_FIELDS = (*Publication.METADATA_FIELDS, 'work_id')
+
+
+def merge_publication(duplicate, kept):
+    """Fold `duplicate` into `kept` (same user and DOI) and delete it"""
+    with transaction.atomic():
+        # The ORCID link moves as a pair
+        if kept.orcid_put_code is None:
+            kept.orcid_put_code, kept.orcid_modified = duplicate.orcid_put_code, duplicate.orcid_modified
+        for field in MERGE_FIELDS:
+            if getattr(kept, field) in ('', None):
+                setattr(kept, field, getattr(duplicate, field))
+        if not kept.author_list.exists():
+            PublicationAuthor.objects.filter(publication=duplicate).update(publication=kept)
+        duplicate.delete()
+        kept.save_changed()
+
+
+class Command(BaseCommand):
+    help = 'Backfill normalized DOIs on publications and report per-user duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of publications to update per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute normalized DOIs that are already set',
+        )
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help='Merge duplicate publications into the oldest copy and delete them (default: report only)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        queryset = Publication.objects.exclude(doi='')
+        if options['rebuild']:
+            queryset.update(normalized_doi=None)
+        queryset = queryset.filter(normalized_doi__isnull=True)
+
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Normalizing DOIs for {len(ids)} publications...')
+
+        updated_count = 0
+        duplicates = []
+        for start in range(0, len(ids), batch_size):
+            # Oldest first, so the earliest copy of a DOI is the one kept
+            batch = list(
+                Publication.objects.filter(id__in=ids[start:start + batch_size]).order_by('id').only('id', 'user_id', 'doi')
+            )
+            for publication in batch:
+                publication.normalized_doi = normalize_doi(publication.doi) or None
+
+            # Values already taken, in the database or earlier in this batch
+            taken = dict(
+                ((user_id, doi), pub_id) for pub_id, user_id, doi in Publication.objects.filter(
+                    user_id__in={p.user_id for p in batch},
+                    normalized_doi__in={p.normalized_doi for p in batch if p.normalized_doi},
+                ).values_list('id', 'user_id', 'normalized_doi')
+            )
+            to_update = []
+            for publication in batch:
+                if publication.normalized_doi is None:
+                    continue
+                key = (publication.user_id, publication.normalized_doi)
+                if key in taken:
+                    duplicates.append((publication.id, taken[key], publication.doi))
+                    continue
+                taken[key] = publication.id
+                to_update.append(publication)
+
+            with transaction.atomic():
+                Publication.objects.bulk_update(to_update, ['normalized_doi'])
+            # bulk_update sends no signals
+            invalidate_list('publication', {p.user_id for p in to_update})
+            updated_count += len(to_update)
+            self.stdout.write(f'  Processed {min(start + batch_size, len(ids))}/{len(ids)} publications')
+
+        for pub_id, original_id, doi in duplicates:
+            if not options['merge']:
+                self.stdout.write(self.style.WARNING(
+                    f'  Publication {pub_id} ({doi}) duplicates publication {original_id}; left unset'
+                ))
+                continue
+            merge_publication(Publication.objects.get(pk=pub_id), Publication.objects.get(pk=original_id))
+            self.stdout.write(f'  Merged publication {pub_id} ({doi}) into publication {original_id}')
+
+        outcome = 'merged' if options['merge'] else 'skipped'
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {updated_count} DOIs, {len(duplicates)} duplicates {outcome}'
+        ))
@@ -0,0 +1,87 @@
+"""
+Django management command to build structured PublicationAuthor rows from the
+comma-separated Publication.authors strings. Publications linked to a Work use
+the Work's structured author_data, or its author string, unless the user
+entered their own authors.
+Usage: python manage.py backfill_publication_authors [--user USERNAME] [--batch-size N] [--rebuild]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from cv.authors import build_publication_authors, parse_author_string
+from cv.models import Publication, PublicationAuthor
+
+
+def publication_authors(publication):
+    """Author dicts for a publication: the user's own string, else the Work's authors"""
+    if not publication.authors and publication.work_id and publication.work.author_data:
+        return publication.work.author_data
+    return parse_author_string(publication.get_metadata_value('authors'))
+
+
+class Command(BaseCommand):
+    help = 'Backfill structured publication authors from the comma-separated authors field'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to backfill publications for (default: all users)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of publications to process per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild authors for publications that already have structured authors',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        # Blank per-user authors fall back to the Work (see Publication.get_metadata_value)
+        queryset = Publication.objects.filter(
+            Q(authors__gt='') | Q(work__authors__gt='') | Q(work__author_data__0__isnull=False)
+        )
+
+        username = options.get('user')
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist.')
+            queryset = queryset.filter(user=user)
+
+        if not options['rebuild']:
+            queryset = queryset.filter(author_list__isnull=True)
+
+        ids = list(queryset.order_by('id').values_list('id', flat=True).distinct())
+        self.stdout.write(f'Backfilling authors for {len(ids)} publications...')
+
+        publication_count = 0
+        author_count = 0
+        for start in range(0, len(ids), batch_size):
+            batch = Publication.objects.filter(id__in=ids[start:start + batch_size]).select_related('work').only(
+                'id', 'authors', 'work', 'work__authors', 'work__author_data'
+            )
+            rows = []
+            for publication in batch:
+                rows.extend(build_publication_authors(publication, publication_authors(publication)))
+                publication_count += 1
+
+            with transaction.atomic():
+                PublicationAuthor.objects.filter(publication_id__in=ids[start:start + batch_size]).delete()
+                PublicationAuthor.objects.bulk_create(rows, batch_size=batch_size)
+            author_count += len(rows)
+            self.stdout.write(f'  Processed {publication_count}/{len(ids)} publications')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {author_count} author rows for {publication_count} publications'
+        ))
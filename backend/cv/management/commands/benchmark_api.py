@@ -0,0 +1,75 @@
+"""
+Django management command to benchmark the CV API end to end.
+Usage: python manage.py benchmark_api [--publications N] [--iterations N] [--formats latex,html,pdf] [--output FILE] [--compare BASELINE]
+
+Runs against a throwaway test database populated with seeded synthetic data,
+so it never touches real records.
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from cv.benchmarks import BIOSKETCH_FORMATS, benchmark_database, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every /api/cv/ endpoint and biosketch format on synthetic data and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Number of synthetic users (default: 1)')
+        parser.add_argument('--publications', type=int, default=200, help='Publications per user (default: 200)')
+        parser.add_argument('--educations', type=int, default=4, help='Education entries per user (default: 4)')
+        parser.add_argument('--experiences', type=int, default=6, help='Experience entries per user (default: 6)')
+        parser.add_argument('--awards', type=int, default=5, help='Awards per user (default: 5)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint (default: 20)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument(
+            '--formats',
+            type=str,
+            default=','.join(BIOSKETCH_FORMATS),
+            help='Comma-separated biosketch formats to benchmark (default: latex,html,pdf)',
+        )
+        parser.add_argument('--only', type=str, help='Comma-separated substrings of benchmark names to run')
+        parser.add_argument('--output', type=str, help='Write results to this JSON file')
+        parser.add_argument('--compare', type=str, help='Baseline results JSON to compare against')
+
+    def handle(self, *args, **options):
+        formats = [f.strip() for f in options['formats'].split(',') if f.strip()]
+        unknown = set(formats) - set(BIOSKETCH_FORMATS)
+        if unknown:
+            raise CommandError(f'Unknown format(s): {", ".join(sorted(unknown))}')
+        if options['publications'] < 10:
+            raise CommandError('--publications must be at least 10 (a biosketch cites 10 publications)')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        with benchmark_database():
+            results = run_benchmarks(
+                users=options['users'],
+                publications=options['publications'],
+                educations=options['educations'],
+                experiences=options['experiences'],
+                awards=options['awards'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+                formats=formats,
+                only=[o.strip() for o in options['only'].split(',')] if options['only'] else None,
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        if baseline:
+            self.stdout.write(f'\nComparison with {options["compare"]} (commit {baseline.get("commit")}):')
+            for name, old_p50, new_p50, change, old_queries, new_queries in compare_results(baseline, results):
+                line = (
+                    f'  {name:34s} p50 {old_p50:8.2f} -> {new_p50:8.2f}ms ({change:+6.1f}%)  '
+                    f'queries {old_queries:6.1f} -> {new_queries:6.1f}'
+                )
+                self.stdout.write(self.style.WARNING(line) if change > 10 else line)
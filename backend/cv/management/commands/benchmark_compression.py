@@ -0,0 +1,40 @@
+"""
+Django management command to benchmark JSON rendering and response compression.
+Usage: python manage.py benchmark_compression [--publications N] [--iterations N] [--output FILE]
+
+Renders real list payloads with DRF's JSONRenderer and FastJSONRenderer, then
+compresses them and the biosketch downloads at each gzip and Brotli level, on
+a throwaway database, to weigh CPU time against bytes on the wire.
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from cv.benchmarks import benchmark_database, run_compression_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON renderers and gzip/Brotli levels on real payload sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--publications', type=int, default=600, help='Publications in the dataset (default: 600)')
+        parser.add_argument('--iterations', type=int, default=5, help='Timed passes per measurement; the best counts (default: 5)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument('--output', type=str, help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['publications'] < 10:
+            raise CommandError('--publications must be at least 10 (a biosketch cites 10 publications)')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        with benchmark_database():
+            results = run_compression_benchmark(
+                publications=options['publications'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
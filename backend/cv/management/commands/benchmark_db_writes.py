@@ -0,0 +1,48 @@
+"""
+Django management command to benchmark concurrent publication writes.
+Usage: python manage.py benchmark_db_writes [--threads N] [--creates N] [--sqlite-pragmas tuned|default] [--output FILE]
+
+Runs against a throwaway copy of the configured database. Compare backends by
+running it with and without DATABASE_URL, and SQLite tunings with
+--sqlite-pragmas default (SQLite's own rollback journal and synchronous=FULL).
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from cv.benchmarks import benchmark_database, run_write_benchmark
+
+SQLITE_DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = 'Measure publication-create throughput from concurrent API clients against the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--creates', type=int, default=25, help='Publications created per client (default: 25)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic users (default: 0)')
+        parser.add_argument(
+            '--sqlite-pragmas',
+            choices=['tuned', 'default'],
+            default='tuned',
+            help='SQLite only: the configured SQLITE_PRAGMAS or SQLite defaults (default: tuned)',
+        )
+        parser.add_argument('--output', type=str, help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['creates'] < 1:
+            raise CommandError('--threads and --creates must be at least 1')
+
+        overrides = {'SQLITE_PRAGMAS': SQLITE_DEFAULT_PRAGMAS} if options['sqlite_pragmas'] == 'default' else {}
+        with override_settings(**overrides), benchmark_database():
+            results = run_write_benchmark(
+                threads=options['threads'],
+                creates=options['creates'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
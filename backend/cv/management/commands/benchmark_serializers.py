@@ -0,0 +1,40 @@
+"""
+Django management command to benchmark list serialization.
+Usage: python manage.py benchmark_serializers [--rows N] [--iterations N] [--output FILE]
+
+Compares rows/sec through each list ModelSerializer against its values_list()
+read path (cv.serializers.ValuesReader) on a throwaway database, and checks
+that both produce identical output.
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from cv.benchmarks import benchmark_database, run_serializer_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare list serialization rows/sec through ModelSerializers and the values_list() read path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=600, help='Records per model (default: 600)')
+        parser.add_argument('--iterations', type=int, default=10, help='Timed passes per path; the best counts (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument('--output', type=str, help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError('--rows and --iterations must be at least 1')
+
+        with benchmark_database():
+            results = run_serializer_benchmark(
+                rows=options['rows'],
+                iterations=options['iterations'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        if not all(result['identical'] for result in results['results']):
+            raise CommandError('The values_list() read path differs from the serializer output')
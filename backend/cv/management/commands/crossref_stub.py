@@ -0,0 +1,63 @@
+"""
+Django management command to run the offline Crossref stand-in server.
+Usage: python manage.py crossref_stub [--port PORT] [--fixtures DIR] [--latency SECONDS] [--error-rate RATE] [--throttle-rate RATE]
+
+Then run the backend with CROSSREF_API_URL=http://127.0.0.1:PORT
+"""
+from django.core.management.base import BaseCommand, CommandError
+from cv.crossref_stub import DEFAULT_FIXTURE_DIR, CrossrefStub
+
+
+class Command(BaseCommand):
+    help = 'Serve Crossref /works and /format responses from recorded fixtures for offline testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+        parser.add_argument(
+            '--fixtures',
+            type=str,
+            default=str(DEFAULT_FIXTURE_DIR),
+            help='Directory of recorded Crossref messages (default: cv/crossref_fixtures)',
+        )
+        parser.add_argument('--latency', type=float, default=0.0, help='Mean response latency in seconds (default: 0)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- latency jitter in seconds (default: 0)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500 (default: 0)')
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429 (default: 0)')
+        parser.add_argument(
+            '--synthesize',
+            action='store_true',
+            help='Generate deterministic records for DOIs with no fixture instead of returning 404',
+        )
+        parser.add_argument(
+            '--record-from',
+            type=str,
+            help='Upstream API URL (e.g. https://api.crossref.org) to fetch and save DOIs missing from the corpus',
+        )
+        parser.add_argument('--seed', type=int, help='Random seed for latency and fault injection')
+
+    def handle(self, *args, **options):
+        for option in ('error_rate', 'throttle_rate'):
+            if not 0 <= options[option] <= 1:
+                raise CommandError(f'--{option.replace("_", "-")} must be between 0 and 1')
+
+        stub = CrossrefStub(
+            fixture_dir=options['fixtures'],
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            throttle_rate=options['throttle_rate'],
+            synthesize=options['synthesize'],
+            record_from=options['record_from'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Crossref stub listening on {stub.url}'))
+        self.stdout.write(f'  Fixtures: {options["fixtures"]}')
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.server.server_close()
@@ -1,12 +1,14 @@
 """
 Temporary script to load data from legacy YAML files into Django models.
-Usage: python manage.py load_legacy_data [--username USERNAME] [--email EMAIL]
+Usage: python manage.py load_legacy_data [--username USERNAME] [--email EMAIL] [--fetch-metadata]
 """
 import re
 import yaml
 from pathlib import Path
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from cv.dois import normalize_doi
 from cv.models import Education, ProfessionalExperience, Publication, Award
 
 
@@ -98,6 +100,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data for this user before loading',
         )
+        parser.add_argument(
+            '--fetch-metadata',
+            action='store_true',
+            help='Fill in the imported publications from Crossref afterwards, in batched lookups',
+        )
 
     def handle(self, *args, **options):
         # Get or create user
@@ -223,14 +230,22 @@ class Command(BaseCommand):
             for paper in refs_data['papers']:
                 doi = paper.get('doi', '')
                 if doi:
-                    # Strip any whitespace and ensure it's a valid DOI format
+                    # Strip any whitespace and match existing rows on the normalized DOI,
+                    # so URL/prefix/case variants of the same DOI aren't imported twice
                     doi = doi.strip()
-                    Publication.objects.get_or_create(
-                        user=user,
-                        doi=doi,
-                    )
+                    normalized_doi = normalize_doi(doi)
+                    if normalized_doi:
+                        Publication.objects.get_or_create(
+                            user=user,
+                            normalized_doi=normalized_doi,
+                            defaults={'doi': doi},
+                        )
             self.stdout.write(self.style.SUCCESS(f'  Loaded {Publication.objects.filter(user=user).count()} publication records'))
 
+        if options['fetch_metadata']:
+            self.stdout.write('Fetching publication metadata...')
+            call_command('populate_publication_metadata', user=username, stdout=self.stdout, stderr=self.stderr)
+
         self.stdout.write(self.style.SUCCESS('\nData loading complete!'))
         self.stdout.write(f'\nSummary for user {username}:')
         self.stdout.write(f'  Education: {Education.objects.filter(user=user).count()}')
@@ -3,11 +3,15 @@ Django management command to populate publication metadata from DOI.
 Usage: python manage.py populate_publication_metadata [--user USERNAME] [--limit LIMIT] [--dry-run]
 """
 import time
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
 from django.db import models
-from cv.models import Publication
-from cv.views import fetch_doi_metadata
+from django.utils import timezone
+from cv.authors import parse_author_string, set_publication_authors
+from cv.dois import normalize_doi
+from cv.models import Publication, Work
+from cv.views import fetch_doi_metadata_batch, work_metadata_values
 
 
 class Command(BaseCommand):
@@ -33,7 +37,7 @@ class Command(BaseCommand):
             '--delay',
             type=float,
             default=0.5,
-            help='Delay between API calls in seconds (default: 0.5)',
+            help='Delay between batched API calls in seconds (default: 0.5)',
         )
 
     def handle(self, *args, **options):
@@ -53,12 +57,16 @@ class Command(BaseCommand):
             except User.DoesNotExist:
                 raise CommandError(f'User "{username}" does not exist.')
 
-        # Filter to publications that need updating (missing title or other fields)
+        # Filter to publications that need updating (missing title or other fields,
+        # both on the publication and on its shared Work)
+        def missing(field):
+            return (models.Q(**{field: ''}) | models.Q(**{f'{field}__isnull': True})) & (
+                models.Q(work__isnull=True) | models.Q(**{f'work__{field}': ''})
+            )
+
         queryset = queryset.filter(
-            models.Q(title='') | models.Q(title__isnull=True) |
-            models.Q(authors='') | models.Q(authors__isnull=True) |
-            models.Q(journal='') | models.Q(journal__isnull=True)
-        )
+            missing('title') | missing('authors') | missing('journal')
+        ).select_related('work')
 
         total_count = queryset.count()
         
@@ -74,8 +82,23 @@ class Command(BaseCommand):
         updated_count = 0
         error_count = 0
         skipped_count = 0
+        publications = list(queryset)
+
+        # Resolve every distinct DOI up front, many per Crossref request, so each
+        # DOI is looked up once however many users have a copy of it
+        dois = list(dict.fromkeys(
+            publication.doi for publication in publications if normalize_doi(publication.doi)
+        ))
+        batch_size = max(settings.CROSSREF_BATCH_SIZE, 1)
+        fetched = {}
+        for start in range(0, len(dois), batch_size):
+            if start and delay > 0:
+                # Rate limiting - be nice to the API
+                time.sleep(delay)
+            self.stdout.write(f'Fetching metadata for DOIs {start + 1}-{min(start + batch_size, len(dois))} of {len(dois)}...')
+            fetched.update(fetch_doi_metadata_batch(dois[start:start + batch_size]))
 
-        for publication in queryset:
+        for publication in publications:
             if not publication.doi:
                 skipped_count += 1
                 continue
@@ -83,8 +106,12 @@ class Command(BaseCommand):
             self.stdout.write(f'\nProcessing publication ID {publication.id}: {publication.doi}')
 
             try:
-                metadata = fetch_doi_metadata(publication.doi)
-                
+                doi = normalize_doi(publication.doi)
+                if not doi:
+                    skipped_count += 1
+                    continue
+                metadata = fetched.get(doi)
+
                 if metadata:
                     updated_count += 1
                     if dry_run:
@@ -94,34 +121,35 @@ class Command(BaseCommand):
                         self.stdout.write(f'    Journal: {metadata.get("journal", "")[:50]}...')
                         self.stdout.write(f'    Year: {metadata.get("year")}')
                     else:
-                        # Update fields only if they're empty or missing
-                        if metadata.get('title') and not publication.title:
-                            publication.title = metadata.get('title', '')
-                        if metadata.get('authors') and not publication.authors:
-                            publication.authors = metadata.get('authors', '')
-                        if metadata.get('journal') and not publication.journal:
-                            publication.journal = metadata.get('journal', '')
-                        if metadata.get('year') and not publication.year:
-                            publication.year = metadata.get('year')
-                        if metadata.get('volume') and not publication.volume:
-                            publication.volume = metadata.get('volume', '')
-                        if metadata.get('issue') and not publication.issue:
-                            publication.issue = metadata.get('issue', '')
-                        if metadata.get('pages') and not publication.pages:
-                            publication.pages = metadata.get('pages', '')
-                        if metadata.get('citation') and not publication.citation:
-                            publication.citation = metadata.get('citation', '')
-                        
-                        publication.save()
+                        work = Work.objects.filter(doi=doi).first()
+                        if work is None:
+                            # A new Work is inserted with its metadata in one write
+                            work, _ = Work.objects.get_or_create(doi=doi, defaults=work_metadata_values(metadata))
+                            work_changed = ['author_data']
+                        else:
+                            # Fill the shared Work's fields only if they're empty or missing;
+                            # the publication's own blank fields then fall back to it
+                            for field in Publication.METADATA_FIELDS:
+                                if metadata.get(field) and not getattr(work, field):
+                                    setattr(work, field, metadata.get(field))
+                            if metadata.get('author_list') and not work.author_data:
+                                work.author_data = metadata['author_list']
+                            work.fetched_at = timezone.now()
+                            work_changed = work.save_changed()
+
+                        publication.work = work
+                        publication_changed = publication.save_changed()
+                        # Authors are indexed when the link is made; re-index only if it or the Work's authors changed
+                        if 'work' in publication_changed or 'author_data' in work_changed:
+                            set_publication_authors(
+                                publication,
+                                work.author_data or parse_author_string(publication.get_metadata_value('authors'))
+                            )
                         self.stdout.write(self.style.SUCCESS(f'  ✓ Updated publication {publication.id}'))
                 else:
                     error_count += 1
                     self.stdout.write(self.style.WARNING(f'  ✗ Could not fetch metadata for {publication.doi}'))
 
-                # Rate limiting - be nice to the API
-                if delay > 0:
-                    time.sleep(delay)
-
             except Exception as e:
                 error_count += 1
                 self.stdout.write(self.style.ERROR(f'  ✗ Error processing {publication.doi}: {str(e)}'))
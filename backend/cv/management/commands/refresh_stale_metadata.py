@@ -0,0 +1,50 @@
+"""
+Django management command to revalidate stale or incomplete Work metadata.
+Usage: python manage.py refresh_stale_metadata [--budget N] [--period SECONDS] [--dry-run]
+
+Meant to run from cron once per period, e.g. hourly with the default period;
+see cv/refresh.py for how Works are prioritized.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from cv.refresh import due_works, missing_fields, refresh_priority, run_refresh
+
+
+class Command(BaseCommand):
+    help = 'Revalidate the most overdue shared Work metadata within a budget of upstream requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget',
+            type=int,
+            help='Upstream requests after which no new Work is started this run (default: METADATA_REFRESH_BUDGET)',
+        )
+        parser.add_argument(
+            '--period',
+            type=float,
+            help='Seconds to spread the requests over (default: METADATA_REFRESH_PERIOD)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the Works that would be refreshed, in order, without fetching',
+        )
+
+    def handle(self, *args, **options):
+        budget = options['budget']
+        if budget is not None and budget < 0:
+            raise CommandError('--budget must not be negative')
+
+        if options['dry_run']:
+            now = timezone.now()
+            works = due_works(now, limit=budget)
+            self.stdout.write(f'{len(works)} Works due for refresh:')
+            for work in works:
+                missing = ', '.join(missing_fields(work)) or 'complete'
+                self.stdout.write(f'  {work.doi} (priority {refresh_priority(work, now):.1f}; {missing})')
+            return
+
+        summary = run_refresh(budget=budget, period=options['period'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            'Refresh complete: ' + (', '.join(f'{result}={count}' for result, count in sorted(summary.items())) or 'nothing due')
+        ))
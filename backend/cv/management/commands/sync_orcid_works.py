@@ -0,0 +1,66 @@
+"""
+Django management command to import publications from users' ORCID records.
+Usage: python manage.py sync_orcid_works [--user USERNAME [--orcid ORCID]] [--force]
+
+Without --user, every user with a linked ORCID iD is synced. Repeat runs only
+fetch and write what changed in ORCID since the last sync; see cv/orcid.py.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from cv.models import OrcidSync
+from cv.orcid import OrcidSyncError, sync_orcid_works
+from cv.upstream import CircuitOpen
+
+
+class Command(BaseCommand):
+    help = "Import new and changed works from users' ORCID records as publications"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to sync (default: all users with a linked ORCID iD)',
+        )
+        parser.add_argument(
+            '--orcid',
+            type=str,
+            help='ORCID iD to link to --user before syncing',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Diff every work even if ORCID reports no change since the last sync',
+        )
+
+    def handle(self, *args, **options):
+        username = options['user']
+        if options['orcid'] and not username:
+            raise CommandError('--orcid needs --user')
+
+        if username:
+            try:
+                users = [User.objects.get(username=username)]
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist.')
+        else:
+            users = [state.user for state in OrcidSync.objects.select_related('user').order_by('user__username')]
+
+        failed = 0
+        for user in users:
+            try:
+                state = sync_orcid_works(user, orcid=options['orcid'], force=options['force'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            except CircuitOpen:
+                self.stdout.write(self.style.ERROR('ORCID circuit is open; stopping this run'))
+                failed += len(users) - users.index(user)
+                break
+            except OrcidSyncError as e:
+                self.stdout.write(self.style.ERROR(f'{user.username}: {e}'))
+                failed += 1
+                continue
+            counts = ', '.join(f'{result}={count}' for result, count in sorted(state.last_result.items()))
+            self.stdout.write(f'{user.username} ({state.orcid}): {counts}')
+
+        message = f'ORCID sync complete: {len(users) - failed} synced, {failed} failed'
+        self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(message))
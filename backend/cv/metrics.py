@@ -0,0 +1,426 @@
+"""
+In-process metrics registry with a Prometheus text endpoint.
+
+Counters, gauges and histograms are kept in process memory and are cheap to
+update. Under gunicorn each worker has its own registry. When METRICS_DIR is
+set, each process writes a snapshot to METRICS_DIR/metrics_<pid>_<start>.json:
+  - changes are written at most every METRICS_FLUSH_INTERVAL seconds, after
+    a request or from a background timer, so an idle worker's last counts
+    still reach the directory
+  - a gauge change starts that timer if it isn't running yet, so a scrape
+    answered by another worker sees e.g. a compile in progress within the
+    interval. Updates themselves never touch the disk, since gauges are set
+    under other locks and on the event loop
+<start> is the process start time (from /proc where available), so a process
+that reuses a dead worker's pid writes a new file rather than replacing it.
+A scrape of /metrics merges all snapshots:
+  - counters and histograms are summed across every file, including files left
+    by workers that have exited, so totals stay monotonic
+  - gauges are summed over live processes only
+Without METRICS_DIR the endpoint reports only the serving process.
+
+Clear METRICS_DIR when the server (re)starts, as with prometheus_client's
+multiprocess mode. /metrics answers requests carrying
+`Authorization: Bearer <METRICS_TOKEN>` and signed-in staff.
+"""
+import copy
+import hmac
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMPILE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+            self.registry.dirty = True
+        # Gauges are read by other workers' scrapes while they are raised
+        self.registry.schedule_flush()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+            self.registry.dirty = True
+        self.registry.schedule_flush()
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+            self.registry.dirty = True
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._timer_pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        """JSON-serializable copy of every metric's values"""
+        with self.lock:
+            return {
+                name: [[list(key), copy.deepcopy(value)] for key, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+            self.dirty = True
+
+    # Multiprocess support
+
+    def snapshot_path(self, directory, pid=None, start=None):
+        if pid is None:
+            pid, start = os.getpid(), process_start(os.getpid())
+        return Path(directory) / f"metrics_{pid}_{start or 0}.json"
+
+    def flush(self, directory=None):
+        """Write this process's snapshot to the metrics directory"""
+        configured = directory is None
+        directory = directory or getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self._flush_lock:
+            self.dirty = False
+            self._last_flush = time.monotonic()
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(temp_path, self.snapshot_path(directory))
+        if configured:
+            self.start_timer()
+
+    def maybe_flush(self):
+        if self.dirty and time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            self.flush()
+
+    def schedule_flush(self):
+        """Leave pending changes to the background timer, starting it if METRICS_DIR is set"""
+        if getattr(settings, 'METRICS_DIR', None):
+            self.start_timer()
+
+    def start_timer(self):
+        """Flush changes in the background from now on, once per process (forks included)"""
+        if self._timer_pid == os.getpid():
+            return
+        self._timer_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='cv-metrics-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0))
+            if self.dirty:
+                self.flush()
+
+    def collect(self, directory=None):
+        """Merged {name: {label key: value}} over this process and, with a directory, all snapshots"""
+        directory = directory or getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return {name: {tuple(key): value for key, value in values} for name, values in self.snapshot().items()}
+
+        self.flush(directory)
+        merged = {name: {} for name in self.metrics}
+        for path in Path(directory).glob('metrics_*.json'):
+            try:
+                _, pid, start = path.stem.split('_')
+                pid, start = int(pid), int(start)
+                data = json.loads(path.read_text())
+            except (ValueError, OSError):
+                continue
+            alive = pid_alive(pid) and (not start or process_start(pid) == start)
+            for name, values in data.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                for key, value in values:
+                    key = tuple(key)
+                    merged[name][key] = merge_values(metric, merged[name].get(key), value)
+        return merged
+
+    def render(self, directory=None):
+        """Prometheus text exposition format"""
+        lines = []
+        for name, values in self.collect(directory).items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(values.items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value['buckets']):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {cumulative}")
+                    lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {format_value(value['sum'])}")
+                    lines.append(f"{name}_count{format_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def merge_values(metric, current, value):
+    if current is None:
+        return value
+    if metric.kind == 'histogram':
+        return {
+            'buckets': [a + b for a, b in zip(current['buckets'], value['buckets'])],
+            'sum': current['sum'] + value['sum'],
+            'count': current['count'] + value['count'],
+        }
+    return current + value
+
+
+def pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start(pid):
+    """Start time of a process in clock ticks since boot, or None where /proc isn't available"""
+    try:
+        stat = Path(f'/proc/{pid}/stat').read_text()
+        # Fields after the parenthesized command name; starttime is field 22
+        return int(stat.rsplit(')', 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'cv_http_request_duration_seconds', 'Request latency by view', ['method', 'view', 'status']
+)
+BIOSKETCH_DURATION = registry.histogram(
+    'cv_biosketch_generation_seconds', 'generate_biosketch duration by export format', ['format', 'outcome'],
+    buckets=COMPILE_BUCKETS,
+)
+COMPILES_IN_PROGRESS = registry.gauge(
+    'cv_biosketch_compiles_in_progress', 'pdflatex/pandoc runs currently in flight', ['format']
+)
+DOI_FETCHES = registry.counter(
+    'cv_doi_fetch_total', 'fetch_doi_metadata calls by outcome of the provider chain', ['outcome']
+)
+CROSSREF_BATCHES = registry.counter(
+    'cv_crossref_batch_total', 'Multi-DOI Crossref filter queries by outcome', ['outcome']
+)
+CROSSREF_BATCH_DOIS = registry.counter(
+    'cv_crossref_batch_doi_total', 'DOIs requested in batches, by whether the batch returned them', ['result']
+)
+CIRCUIT_STATE = registry.gauge(
+    'cv_upstream_circuit_state', 'Upstream circuit breakers by host, 1 for the current state', ['host', 'state']
+)
+CIRCUIT_REJECTIONS = registry.counter(
+    'cv_upstream_circuit_rejected_total', 'Upstream calls failed fast by an open circuit', ['host']
+)
+METADATA_REFRESHES = registry.counter(
+    'cv_metadata_refresh_total', 'Scheduled Work metadata revalidations by result', ['result']
+)
+PROVIDER_LOOKUPS = registry.counter(
+    'cv_metadata_provider_lookup_total', 'Metadata provider lookups by provider and outcome', ['provider', 'outcome']
+)
+METADATA_HEDGES = registry.counter(
+    'cv_metadata_hedge_total', 'Hedged lookups started because an earlier provider was slow', ['provider']
+)
+ORCID_SYNCS = registry.counter(
+    'cv_orcid_sync_total', 'ORCID works syncs by outcome', ['outcome']
+)
+ORCID_SYNC_WORKS = registry.counter(
+    'cv_orcid_sync_work_total', 'ORCID works seen by syncs, by what the sync did with them', ['result']
+)
+CITATION_CACHE = registry.counter(
+    'cv_citation_cache_total', 'Formatted citation cache lookups', ['result']
+)
+COMPRESSED_RESPONSES = registry.counter(
+    'cv_response_compressed_total', 'Responses compressed by CompressionMiddleware, by encoding', ['encoding']
+)
+COMPRESSION_BYTES = registry.counter(
+    'cv_response_compression_bytes_total', 'Compressed response bytes before (raw) and after (sent) compression',
+    ['encoding', 'stage']
+)
+LIST_CACHE = registry.counter(
+    'cv_list_cache_total', 'Per-user list payload cache lookups by resource and result (hit, miss, bypass)',
+    ['resource', 'result']
+)
+LIST_CACHE_INVALIDATIONS = registry.counter(
+    'cv_list_cache_invalidation_total', 'Cached list payloads dropped because their data changed', ['resource']
+)
+TOKEN_AUTH_CACHE = registry.counter(
+    'cv_token_auth_cache_total', 'Token authentication lookups by where the token was found (local, shared, miss)',
+    ['result']
+)
+
+
+class MetricsMiddleware:
+    """Record per-view request latency and flush snapshots for other workers"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    def record(self, request, response, start):
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            # Unresolved paths share one label so 404 scans can't blow up cardinality
+            view=match.view_name if match else 'unmatched',
+            status=response.status_code,
+        )
+        registry.maybe_flush()
+
+
+def scrape_allowed(request):
+    """Whether the request carries the METRICS_TOKEN bearer token or comes from signed-in staff"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if token and scheme.lower() == 'bearer':
+        return hmac.compare_digest(credentials.strip().encode(), token.encode())
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for the METRICS_TOKEN bearer token and staff"""
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
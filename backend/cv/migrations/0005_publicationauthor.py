@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0004_personalstatement_biosketch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicationAuthor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "position",
+                    models.PositiveIntegerField(
+                        help_text="Zero-based position in the author list"
+                    ),
+                ),
+                (
+                    "is_last",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Whether this is the last (senior) author",
+                    ),
+                ),
+                ("family", models.CharField(blank=True, max_length=200)),
+                ("given", models.CharField(blank=True, max_length=200)),
+                ("orcid", models.CharField(blank=True, max_length=19)),
+                (
+                    "normalized_name",
+                    models.CharField(
+                        help_text="Lowercase ASCII 'family initial' used for matching",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "publication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="author_list",
+                        to="cv.publication",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["publication", "position"],
+                "indexes": [
+                    models.Index(
+                        fields=["normalized_name", "position"],
+                        name="cv_publicat_normali_d99b48_idx",
+                    ),
+                    models.Index(
+                        fields=["normalized_name", "is_last"],
+                        name="cv_publicat_normali_77be81_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="publicationauthor",
+            constraint=models.UniqueConstraint(
+                fields=("publication", "position"),
+                name="unique_publication_author_position",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0005_publicationauthor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Work",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "doi",
+                    models.CharField(
+                        help_text="Normalized DOI", max_length=200, unique=True
+                    ),
+                ),
+                ("citation", models.TextField(blank=True)),
+                ("title", models.CharField(blank=True, max_length=500)),
+                (
+                    "authors",
+                    models.TextField(
+                        blank=True, help_text="Comma-separated list of authors"
+                    ),
+                ),
+                ("journal", models.CharField(blank=True, max_length=300)),
+                ("year", models.IntegerField(blank=True, null=True)),
+                ("volume", models.CharField(blank=True, max_length=50)),
+                ("issue", models.CharField(blank=True, max_length=50)),
+                ("pages", models.CharField(blank=True, max_length=50)),
+                (
+                    "author_data",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="Structured author list from the metadata provider",
+                    ),
+                ),
+                (
+                    "fetched_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When metadata was last fetched for this DOI",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="work",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="publications",
+                to="cv.work",
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+from django.db import migrations
+
+from cv.dois import normalize_doi
+
+BATCH_SIZE = 500
+
+METADATA_FIELDS = ("citation", "title", "authors", "journal", "year", "volume", "issue", "pages")
+
+
+def completeness(values):
+    return sum(1 for field in METADATA_FIELDS if values[field] not in ("", None))
+
+
+def deduplicate_works(apps, schema_editor):
+    """
+    Create one Work per normalized DOI from the most complete user copy, link
+    every publication to it, and blank the per-user fields that match the Work.
+    """
+    Publication = apps.get_model("cv", "Publication")
+    Work = apps.get_model("cv", "Work")
+
+    # Pick the most complete copy of each DOI's metadata
+    best = {}
+    rows = Publication.objects.exclude(doi="").order_by("id").values("id", "doi", *METADATA_FIELDS)
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        doi = normalize_doi(row["doi"])
+        if doi and (doi not in best or completeness(row) > completeness(best[doi])):
+            best[doi] = row
+
+    existing = set(Work.objects.values_list("doi", flat=True))
+    Work.objects.bulk_create(
+        [
+            Work(doi=doi, **{field: row[field] for field in METADATA_FIELDS})
+            for doi, row in best.items()
+            if doi not in existing
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    works = {work.doi: work for work in Work.objects.all()}
+
+    # Link publications and drop values now held by the Work
+    batch = []
+    for publication in Publication.objects.exclude(doi="").order_by("id").iterator(chunk_size=BATCH_SIZE):
+        work = works.get(normalize_doi(publication.doi))
+        if work is None:
+            continue
+        publication.work = work
+        for field in METADATA_FIELDS:
+            if getattr(publication, field) == getattr(work, field):
+                setattr(publication, field, None if field == "year" else "")
+        batch.append(publication)
+        if len(batch) >= BATCH_SIZE:
+            Publication.objects.bulk_update(batch, ["work", *METADATA_FIELDS])
+            batch = []
+    if batch:
+        Publication.objects.bulk_update(batch, ["work", *METADATA_FIELDS])
+
+
+def restore_publication_fields(apps, schema_editor):
+    """Copy Work metadata back into blank per-user fields"""
+    Publication = apps.get_model("cv", "Publication")
+
+    batch = []
+    for publication in Publication.objects.filter(work__isnull=False).select_related("work").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        for field in METADATA_FIELDS:
+            if getattr(publication, field) in ("", None):
+                setattr(publication, field, getattr(publication.work, field))
+        publication.work = None
+        batch.append(publication)
+        if len(batch) >= BATCH_SIZE:
+            Publication.objects.bulk_update(batch, ["work", *METADATA_FIELDS])
+            batch = []
+    if batch:
+        Publication.objects.bulk_update(batch, ["work", *METADATA_FIELDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0006_work"),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_works, restore_publication_fields),
+    ]
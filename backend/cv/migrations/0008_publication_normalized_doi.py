@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0007_deduplicate_works"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="publication",
+            name="normalized_doi",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Canonical form of the DOI, maintained on save; null when there is no DOI",
+                max_length=200,
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="publication",
+            constraint=models.UniqueConstraint(
+                fields=("user", "normalized_doi"), name="unique_user_normalized_doi"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0008_publication_normalized_doi"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="work",
+            name="etag",
+            field=models.CharField(
+                blank=True,
+                help_text="Validator from the last metadata response",
+                max_length=200,
+            ),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="last_modified",
+            field=models.CharField(
+                blank=True,
+                help_text="Last-Modified from the last metadata response",
+                max_length=64,
+            ),
+        ),
+    ]
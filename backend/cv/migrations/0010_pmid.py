@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0009_work_revalidation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="publication",
+            name="pmid",
+            field=models.CharField(blank=True, help_text="PubMed ID", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="pmid",
+            field=models.CharField(blank=True, help_text="PubMed ID", max_length=20),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("cv", "0010_pmid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrcidSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "orcid",
+                    models.CharField(
+                        help_text="ORCID iD, e.g. 0000-0002-1825-0097", max_length=19
+                    ),
+                ),
+                (
+                    "etag",
+                    models.CharField(
+                        blank=True,
+                        help_text="ETag of the last works summary response",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "last_modified",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="last-modified-date (ms) of the works summary at the last sync",
+                        null=True,
+                    ),
+                ),
+                ("synced_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "last_result",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Counts from the last sync, by result",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="orcid_modified",
+            field=models.BigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="ORCID last-modified-date (ms) of that work when last synced",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="orcid_put_code",
+            field=models.BigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Put-code of the ORCID work this was synced from",
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="publication",
+            constraint=models.UniqueConstraint(
+                fields=("user", "orcid_put_code"), name="unique_user_orcid_put_code"
+            ),
+        ),
+        migrations.AddField(
+            model_name="orcidsync",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="orcid_sync",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0011_orcid_sync"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="work",
+            name="fetched_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="When metadata was last fetched for this DOI",
+                null=True,
+            ),
+        ),
+    ]
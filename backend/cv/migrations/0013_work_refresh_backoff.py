@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cv", "0012_work_fetched_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="work",
+            name="refresh_failures",
+            field=models.PositiveSmallIntegerField(
+                default=0, help_text="Failed refresh attempts in a row"
+            ),
+        ),
+        migrations.AddField(
+            model_name="work",
+            name="retry_after",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="After a failed refresh, no new attempt is made before this",
+                null=True,
+            ),
+        ),
+    ]
@@ -1,5 +1,67 @@
+import copy
 from django.db import models
 from django.contrib.auth.models import User
+from .dois import normalize_doi
+
+
+class ChangedFieldsMixin(models.Model):
+    """
+    Remembers field values as loaded or last saved, so save_changed() can
+    write only the columns that differ, or skip the write altogether.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _snapshot_fields(self, names=None):
+        # Only JSON values can be changed in place; everything else is
+        # replaced on assignment, so a reference is enough
+        deferred = self.get_deferred_fields()
+        saved = {} if names is None else getattr(self, '_saved_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if names is not None and field.name not in names and field.attname not in names:
+                continue
+            value = getattr(self, field.attname)
+            saved[field.attname] = copy.deepcopy(value) if isinstance(field, models.JSONField) else value
+        self._saved_values = saved
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # A partial save leaves the other fields' unsaved edits pending
+        update_fields = kwargs.get('update_fields')
+        self._snapshot_fields(None if update_fields is None else set(update_fields))
+
+    def changed_fields(self):
+        """Names of fields changed since load or the last save; None for an unsaved instance"""
+        saved = getattr(self, '_saved_values', None)
+        if saved is None or self._state.adding:
+            return None
+        return [
+            field.name for field in self._meta.concrete_fields
+            if (
+                getattr(self, field.attname) != saved[field.attname] if field.attname in saved
+                # Deferred at load, then assigned
+                else field.attname in self.__dict__
+            )
+        ]
+
+    def save_changed(self):
+        """Save only the changed fields (and auto_now timestamps); no query when nothing changed"""
+        changed = self.changed_fields()
+        if changed is None:
+            self.save()
+        elif changed:
+            auto_now = [field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)]
+            self.save(update_fields=[*changed, *auto_now])
+        return changed
+
+    class Meta:
+        abstract = True
 
 
 class Education(models.Model):
@@ -33,9 +95,49 @@ class ProfessionalExperience(models.Model):
         ordering = ['-start_year']
 
 
-class Publication(models.Model):
+class Work(ChangedFieldsMixin, models.Model):
+    doi = models.CharField(max_length=200, unique=True, help_text="Normalized DOI")
+    citation = models.TextField(blank=True)
+    title = models.CharField(max_length=500, blank=True)
+    authors = models.TextField(blank=True, help_text="Comma-separated list of authors")
+    journal = models.CharField(max_length=300, blank=True)
+    year = models.IntegerField(null=True, blank=True)
+    volume = models.CharField(max_length=50, blank=True)
+    issue = models.CharField(max_length=50, blank=True)
+    pages = models.CharField(max_length=50, blank=True)
+    pmid = models.CharField(max_length=20, blank=True, help_text="PubMed ID")
+    author_data = models.JSONField(default=list, blank=True, help_text="Structured author list from the metadata provider")
+    fetched_at = models.DateTimeField(
+        null=True, blank=True, db_index=True, help_text="When metadata was last fetched for this DOI"
+    )
+    etag = models.CharField(max_length=200, blank=True, help_text="Validator from the last metadata response")
+    last_modified = models.CharField(max_length=64, blank=True, help_text="Last-Modified from the last metadata response")
+    refresh_failures = models.PositiveSmallIntegerField(default=0, help_text="Failed refresh attempts in a row")
+    retry_after = models.DateTimeField(
+        null=True, blank=True, help_text="After a failed refresh, no new attempt is made before this"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title if self.title else self.doi
+
+    class Meta:
+        ordering = ['-id']
+
+
+class Publication(ChangedFieldsMixin, models.Model):
+    # Bibliographic fields shared with Work; on a Publication they are per-user
+    # overrides, and a blank value falls back to the linked Work's value
+    METADATA_FIELDS = ('citation', 'title', 'authors', 'journal', 'year', 'volume', 'issue', 'pages', 'pmid')
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='publications')
     doi = models.CharField(max_length=200)
+    normalized_doi = models.CharField(
+        max_length=200, null=True, blank=True, editable=False,
+        help_text="Canonical form of the DOI, maintained on save; null when there is no DOI"
+    )
+    work = models.ForeignKey(Work, on_delete=models.SET_NULL, null=True, blank=True, related_name='publications')
     citation = models.TextField(blank=True)
     title = models.CharField(max_length=500, blank=True)
     authors = models.TextField(blank=True, help_text="Comma-separated list of authors")
@@ -44,9 +146,35 @@ class Publication(models.Model):
     volume = models.CharField(max_length=50, blank=True)
     issue = models.CharField(max_length=50, blank=True)
     pages = models.CharField(max_length=50, blank=True)
+    pmid = models.CharField(max_length=20, blank=True, help_text="PubMed ID")
+    orcid_put_code = models.BigIntegerField(
+        null=True, blank=True, editable=False, help_text="Put-code of the ORCID work this was synced from"
+    )
+    orcid_modified = models.BigIntegerField(
+        null=True, blank=True, editable=False, help_text="ORCID last-modified-date (ms) of that work when last synced"
+    )
 
     def __str__(self):
-        return self.title if self.title else self.doi
+        title = self.get_metadata_value('title')
+        return title if title else self.doi
+
+    def save(self, *args, **kwargs):
+        self.normalized_doi = normalize_doi(self.doi) or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'doi' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_doi'}
+        super().save(*args, **kwargs)
+
+    def get_metadata_value(self, field):
+        """This publication's value for a metadata field, falling back to its Work"""
+        value = getattr(self, field)
+        if value in ('', None) and self.work_id:
+            return getattr(self.work, field)
+        return value
+
+    def get_metadata(self):
+        """All metadata fields with the user's overrides applied over the Work"""
+        return {field: self.get_metadata_value(field) for field in self.METADATA_FIELDS}
 
     class Meta:
         ordering = ['-id']
@@ -54,6 +182,48 @@ class Publication(models.Model):
             models.Index(fields=['title']),
             models.Index(fields=['doi']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'normalized_doi'], name='unique_user_normalized_doi'),
+            models.UniqueConstraint(fields=['user', 'orcid_put_code'], name='unique_user_orcid_put_code'),
+        ]
+
+
+class PublicationAuthor(models.Model):
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE, related_name='author_list')
+    position = models.PositiveIntegerField(help_text="Zero-based position in the author list")
+    is_last = models.BooleanField(default=False, help_text="Whether this is the last (senior) author")
+    family = models.CharField(max_length=200, blank=True)
+    given = models.CharField(max_length=200, blank=True)
+    orcid = models.CharField(max_length=19, blank=True)
+    normalized_name = models.CharField(max_length=200, help_text="Lowercase ASCII 'family initial' used for matching")
+
+    def __str__(self):
+        return f"{self.given} {self.family}".strip()
+
+    class Meta:
+        ordering = ['publication', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['publication', 'position'], name='unique_publication_author_position'),
+        ]
+        indexes = [
+            models.Index(fields=['normalized_name', 'position']),
+            models.Index(fields=['normalized_name', 'is_last']),
+        ]
+
+
+class OrcidSync(models.Model):
+    """A user's linked ORCID record and what was seen at the last works sync"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='orcid_sync')
+    orcid = models.CharField(max_length=19, help_text="ORCID iD, e.g. 0000-0002-1825-0097")
+    etag = models.CharField(max_length=200, blank=True, help_text="ETag of the last works summary response")
+    last_modified = models.BigIntegerField(
+        null=True, blank=True, help_text="last-modified-date (ms) of the works summary at the last sync"
+    )
+    synced_at = models.DateTimeField(null=True, blank=True)
+    last_result = models.JSONField(default=dict, blank=True, help_text="Counts from the last sync, by result")
+
+    def __str__(self):
+        return f"{self.orcid} ({self.user.username})"
 
 
 class Award(models.Model):
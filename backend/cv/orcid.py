@@ -0,0 +1,259 @@
+"""
+Import a user's publications from their ORCID record.
+
+sync_orcid_works() pulls the works summary from the ORCID public API
+(/{orcid}/works) and diffs it against the user's Publications:
+  - A work matches a Publication by put-code (the ORCID work's id) or,
+    failing that, by normalized DOI, so DOIs the user entered by hand are
+    linked rather than duplicated.
+  - A matched work whose last-modified-date hasn't moved is skipped. A moved
+    one updates the Publication's DOI and, unless a resolved Work supplies
+    them, its title, journal and year.
+  - New works are inserted with one bulk_create. Their DOIs are resolved in
+    Crossref batches first, and only where no one has resolved them yet.
+  - Works without a DOI are skipped, since Publications are keyed by DOI.
+    Works removed from ORCID are left alone.
+
+The OrcidSync row keeps the ETag and last-modified-date of the last summary.
+A repeat sync sends If-None-Match and stops at a 304, or stops once the
+summary's last-modified-date shows nothing changed.
+"""
+from collections import namedtuple
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .authors import build_publication_authors, clean_orcid, set_publication_authors
+from .dois import normalize_doi
+from .list_cache import invalidate_list
+from .metrics import ORCID_SYNC_WORKS, ORCID_SYNCS
+from .models import OrcidSync, Publication, PublicationAuthor, Work
+from .upstream import CircuitOpen, deadline, upstream_get
+from .views import fetch_doi_metadata_batch, store_fetched_work, work_link_values, work_needs_fetch
+
+WorkSummary = namedtuple('WorkSummary', 'put_code doi title journal year modified')
+
+# Publication fields an ORCID work summary carries
+SUMMARY_FIELDS = ('title', 'journal', 'year')
+
+
+class OrcidSyncError(Exception):
+    """The ORCID record couldn't be fetched or read"""
+
+
+def value_of(data, *keys):
+    """data[k1][k2]...['value'] where ORCID uses null for missing parts"""
+    for key in keys + ('value',):
+        data = (data or {}).get(key)
+    return data
+
+
+def summary_doi(summary, group):
+    """The work's own DOI (relationship 'self'), from the summary or its group"""
+    for external_ids in (summary.get('external-ids'), group.get('external-ids')):
+        for external_id in (external_ids or {}).get('external-id') or []:
+            if external_id.get('external-id-type') == 'doi' and external_id.get('external-id-relationship', 'self') == 'self':
+                doi = normalize_doi(value_of(external_id, 'external-id-normalized') or external_id.get('external-id-value'))
+                if doi:
+                    return doi
+    return ''
+
+
+def work_summaries(data):
+    """
+    One WorkSummary per work group, from the preferred (highest display-index)
+    source's summary. Later works repeating a DOI are dropped.
+    """
+    summaries = []
+    seen = set()
+    for group in data.get('group') or []:
+        candidates = group.get('work-summary') or []
+        if not candidates:
+            continue
+        summary = max(candidates, key=lambda candidate: int(candidate.get('display-index') or 0))
+        doi = summary_doi(summary, group)
+        if doi and doi in seen:
+            continue
+        seen.add(doi)
+        year = value_of(summary, 'publication-date', 'year')
+        summaries.append(WorkSummary(
+            put_code=summary['put-code'],
+            doi=doi,
+            title=(value_of(summary, 'title', 'title') or '')[:500],
+            journal=(value_of(summary, 'journal-title') or '')[:300],
+            year=int(year) if year and str(year).isdigit() else None,
+            modified=value_of(summary, 'last-modified-date'),
+        ))
+    return summaries
+
+
+def fetch_works_summary(state, force=False):
+    """The works summary JSON, or None when it is unchanged since the last sync (304)"""
+    headers = {'Accept': 'application/json'}
+    if state.etag and not force:
+        headers['If-None-Match'] = state.etag
+    try:
+        with deadline(30):
+            response = upstream_get(f"{settings.ORCID_API_URL}/{state.orcid}/works", timeout=30, headers=headers)
+    except CircuitOpen:
+        raise
+    except Exception as e:
+        raise OrcidSyncError(f"ORCID request failed: {e}") from e
+    if response.status_code == 304:
+        return None
+    if response.status_code == 404:
+        raise OrcidSyncError(f"ORCID iD {state.orcid} not found")
+    if response.status_code != 200:
+        raise OrcidSyncError(f"ORCID returned HTTP {response.status_code}")
+    state.etag = response.headers.get('ETag', '')
+    try:
+        return response.json()
+    except ValueError as e:
+        raise OrcidSyncError('ORCID returned invalid JSON') from e
+
+
+def diff_works(user, summaries):
+    """
+    Split summaries against the user's Publications into (new, changed,
+    counts): new summaries, (publication, summary) pairs to update, and
+    counts of the unchanged and skipped ones.
+    """
+    # Fields left out here and assigned by update_publication (the overrides
+    # work_link_values clears) are still written by save_changed()
+    publications = Publication.objects.filter(user=user).select_related('work').only(
+        'id', 'user_id', 'doi', 'normalized_doi', 'orcid_put_code', 'orcid_modified', *SUMMARY_FIELDS,
+        'work', 'work__title',
+    )
+    by_put_code = {}
+    by_doi = {}
+    for publication in publications:
+        if publication.orcid_put_code is not None:
+            by_put_code[publication.orcid_put_code] = publication
+        if publication.normalized_doi:
+            by_doi[publication.normalized_doi] = publication
+
+    new, changed = [], []
+    counts = {'unchanged': 0, 'skipped': 0}
+    for summary in summaries:
+        publication = by_put_code.get(summary.put_code) or by_doi.get(summary.doi)
+        if publication is None:
+            if summary.doi:
+                new.append(summary)
+            else:
+                counts['skipped'] += 1
+        elif publication.orcid_put_code == summary.put_code and publication.orcid_modified == summary.modified:
+            counts['unchanged'] += 1
+        else:
+            changed.append((publication, summary))
+    return new, changed, counts
+
+
+def resolve_works(dois):
+    """Works for DOIs, fetching metadata in batches for those no one has resolved"""
+    works = {work.doi: work for work in Work.objects.filter(doi__in=dois)}
+    missing = [doi for doi in dois if work_needs_fetch(works.get(doi))]
+    if missing:
+        for doi, metadata in fetch_doi_metadata_batch(missing).items():
+            works[doi] = store_fetched_work(doi, works.get(doi), metadata)
+    return works
+
+
+def create_publications(user, summaries, works):
+    """Insert Publications for new work summaries, and their authors, in bulk"""
+    publications = []
+    for summary in summaries:
+        work = works.get(summary.doi)
+        values = {field: getattr(summary, field) for field in SUMMARY_FIELDS}
+        values.update(work_link_values(work))
+        # bulk_create skips Publication.save, which maintains normalized_doi
+        publications.append(Publication(
+            user=user, doi=summary.doi, normalized_doi=summary.doi,
+            orcid_put_code=summary.put_code, orcid_modified=summary.modified, **values
+        ))
+    with transaction.atomic():
+        created = Publication.objects.bulk_create(publications)
+        PublicationAuthor.objects.bulk_create(chain.from_iterable(
+            build_publication_authors(publication, publication.work.author_data)
+            for publication in created if publication.work and publication.work.author_data
+        ))
+    invalidate_list('publication', [user.pk])
+    return created
+
+
+def update_publication(publication, summary, works, taken_dois):
+    """
+    Apply a changed work summary: adopt its put-code, move to its DOI unless
+    another of the user's publications has it, and refresh the summary fields
+    unless a resolved Work provides them. A publication matched by DOI only
+    gets the put-code. Returns 'updated' or 'linked'.
+    """
+    linked = publication.orcid_put_code != summary.put_code
+    publication.orcid_put_code = summary.put_code
+    publication.orcid_modified = summary.modified
+    work = None
+    if summary.doi and summary.doi != publication.normalized_doi and summary.doi not in taken_dois:
+        taken_dois.discard(publication.normalized_doi)
+        taken_dois.add(summary.doi)
+        work = works.get(summary.doi)
+        publication.doi = summary.doi
+        publication.work = work
+    if work is not None and work.title:
+        for field, value in work_link_values(work).items():
+            setattr(publication, field, value)
+    elif not linked and not (publication.work and publication.work.title):
+        for field in SUMMARY_FIELDS:
+            setattr(publication, field, getattr(summary, field))
+    publication.save_changed()
+    if work is not None and work.author_data:
+        set_publication_authors(publication, work.author_data)
+    return 'linked' if linked else 'updated'
+
+
+def sync_orcid_works(user, orcid=None, force=False):
+    """
+    Sync a user's Publications with their ORCID works. `orcid` links (or
+    relinks) the user's ORCID iD; without it the linked iD is used. `force`
+    diffs the full summary even when ORCID reports no change. Returns the
+    OrcidSync row, whose last_result has the counts by result.
+    """
+    state = OrcidSync.objects.filter(user=user).first() or OrcidSync(user=user)
+    if orcid:
+        orcid = clean_orcid(orcid)
+        if orcid != state.orcid:
+            state.orcid, state.etag, state.last_modified = orcid, '', None
+    if not state.orcid:
+        raise ValueError('No ORCID iD is linked to this user')
+
+    try:
+        data = fetch_works_summary(state, force=force)
+    except (CircuitOpen, OrcidSyncError) as e:
+        ORCID_SYNCS.inc(outcome='circuit_open' if isinstance(e, CircuitOpen) else 'error')
+        raise
+
+    modified = value_of(data, 'last-modified-date') if data is not None else state.last_modified
+    if data is None or (not force and modified is not None and modified == state.last_modified):
+        result = {'not_modified': 1}
+        outcome = 'not_modified'
+    else:
+        summaries = work_summaries(data)
+        new, changed, result = diff_works(user, summaries)
+        works = resolve_works(sorted({summary.doi for summary in new} | {
+            summary.doi for publication, summary in changed if summary.doi != publication.normalized_doi
+        } - {''}))
+        result['created'] = len(create_publications(user, new, works))
+        taken_dois = set(Publication.objects.filter(user=user, normalized_doi__isnull=False).values_list('normalized_doi', flat=True))
+        for publication, summary in changed:
+            key = update_publication(publication, summary, works, taken_dois)
+            result[key] = result.get(key, 0) + 1
+        for key, count in result.items():
+            ORCID_SYNC_WORKS.inc(count, result=key)
+        outcome = 'success'
+
+    ORCID_SYNCS.inc(outcome=outcome)
+    state.last_modified = modified
+    state.synced_at = timezone.now()
+    state.last_result = result
+    state.save()
+    return state
@@ -0,0 +1,244 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware profiles a request when either:
+  - a staff user sends an `X-Profile: 1` header with their API token, or
+  - the request is picked at PROFILING_SAMPLE_RATE.
+The token is checked before the sampler starts, so X-Profile from anyone else
+costs nothing beyond the (cached) token lookup. The middleware runs ahead of
+the session middleware, so session logins can't request profiles. Every
+other request only pays for one random() call.
+
+While a request is profiled, a background thread samples its Python stack
+every PROFILING_INTERVAL seconds. Functions wrapped with @profiled (and
+viewset list calls via ProfiledListMixin) also record exact call counts and
+wall time. Each profile writes two files to PROFILING_DIR:
+  <id>.folded  collapsed stacks, for flamegraph.pl, speedscope or inferno
+  <id>.json    request details and the @profiled section timings
+Only the newest PROFILING_MAX_FILES profiles are kept. Staff requests get the
+profile id back in an X-Profile-Id header.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+
+_current = contextvars.ContextVar('cv_profile', default=None)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    def __init__(self, interval):
+        self.started = time.perf_counter()
+        self.sections = {}
+        self.sampler = StackSampler(threading.get_ident(), interval)
+
+    def record(self, name, seconds):
+        section = self.sections.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        section['calls'] += 1
+        section['seconds'] += seconds
+
+
+@contextmanager
+def profile_section(name):
+    """Record the enclosed block's wall time under `name` when the request is profiled"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, time.perf_counter() - start)
+
+
+def profiled(func=None, name=None):
+    """Decorator form of profile_section, named after the function by default"""
+    if func is None:
+        return functools.partial(profiled, name=name)
+    section = name or func.__qualname__
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await func(*args, **kwargs)
+            with profile_section(section):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return func(*args, **kwargs)
+        with profile_section(section):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledListMixin:
+    """Viewset mixin recording list() calls as a profile section"""
+
+    def list(self, request, *args, **kwargs):
+        with profile_section(f"{type(self).__name__}.list"):
+            return super().list(request, *args, **kwargs)
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def rotate_profiles(directory, keep):
+    """Delete all but the newest `keep` profiles"""
+    stems = sorted({path.stem for path in directory.glob('*.folded')})
+    for stem in stems[:max(len(stems) - keep, 0)]:
+        for suffix in ('.folded', '.json'):
+            (directory / f"{stem}{suffix}").unlink(missing_ok=True)
+
+
+def save_profile(profile, request, response, reason):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unmatched'
+    # Sortable by time, so rotation can keep the newest by name
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{view}"
+    user = getattr(request, 'user', None)
+    (directory / f"{profile_id}.folded").write_text(profile.sampler.folded())
+    (directory / f"{profile_id}.json").write_text(json.dumps({
+        'id': profile_id,
+        'reason': reason,
+        'method': request.method,
+        'path': request.path,
+        'view': view,
+        'status': response.status_code,
+        'user': user.get_username() if user is not None and user.is_authenticated else None,
+        'duration_ms': (time.perf_counter() - profile.started) * 1000,
+        'interval_ms': profile.sampler.interval * 1000,
+        'samples': sum(profile.sampler.stacks.values()),
+        'sections': profile.sections,
+    }, indent=2))
+    rotate_profiles(directory, getattr(settings, 'PROFILING_MAX_FILES', 200))
+    return profile_id
+
+
+def staff_requested(request):
+    """Whether the request has `X-Profile: 1` and a valid API token of an active staff user"""
+    if request.headers.get('X-Profile') != '1':
+        return False
+    try:
+        authenticated = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Profile staff-requested or sampled requests and write the result to disk"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = self.start(request, staff_requested(request))
+        if profile is None:
+            return self.get_response(request)
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.sampler.stop()
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        # Under ASGI the sampler watches the event loop thread, so stacks from
+        # concurrent requests on the loop are mixed in; the sections are exact
+        # Only a request asking for a profile needs the thread hop for the token lookup
+        staff = await sync_to_async(staff_requested)(request) if request.headers.get('X-Profile') == '1' else False
+        profile = self.start(request, staff)
+        if profile is None:
+            return await self.get_response(request)
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.sampler.stop()
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def start(self, request, staff):
+        request.profile_requested = staff
+        request.profile_sampled = random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if not (request.profile_requested or request.profile_sampled):
+            return None
+        profile = Profile(getattr(settings, 'PROFILING_INTERVAL', 0.005))
+        profile.sampler.start()
+        return profile
+
+    def finish(self, request, response, profile):
+        staff = request.profile_requested
+        profile_id = save_profile(profile, request, response, 'staff' if staff else 'sampled')
+        if staff:
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,453 @@
+"""
+Bibliographic metadata providers and the lookup chain over them.
+
+Three providers are built in:
+  crossref  Crossref REST API (/works/{doi})
+  datacite  DataCite REST API (/dois/{doi}), which registers most dataset and
+            software DOIs (Zenodo, figshare, Dryad, ...)
+  pubmed    NCBI E-utilities: esummary by PMID, or esearch then esummary for a DOI
+
+resolve() turns a DOI or a PMID ("pmid:123" or bare digits) into one
+normalized record:
+  - DOIs go to the registration agencies in METADATA_PROVIDERS order. A
+    provider that claims the DOI's prefix goes first, so a Zenodo DOI asks
+    DataCite before Crossref. A miss moves on to the next provider.
+  - With METADATA_HEDGE_DELAY set, a provider that hasn't answered within
+    that many seconds gets the next one started alongside it. The first
+    record to come back wins.
+  - Providers listed in METADATA_SUPPLEMENT_PROVIDERS (e.g. pubmed, for
+    PMIDs) are then asked too. A PMID record with a DOI is supplemented from
+    the DOI chain. Supplements only fill fields the first record left blank.
+
+Providers are written as generators. They yield Requests and get Responses
+back, so the same parsing serves the sync driver (requests, with threads for
+hedging) and the async one (httpx, with tasks). All requests go through
+cv.upstream's per-host breakers and the caller's deadline.
+"""
+import asyncio
+import contextvars
+import re
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .authors import crossref_authors, datacite_authors, pubmed_authors
+from .citations import format_citation
+from .dois import normalize_doi
+from .metrics import METADATA_HEDGES, PROVIDER_LOOKUPS
+from .upstream import CircuitOpen, DeadlineExceeded, aupstream_get, upstream_get
+
+Request = namedtuple('Request', 'url params')
+Response = namedtuple('Response', 'status data')
+
+PMID_PATTERN = re.compile(r'^(?:pmid:\s*)?(\d{1,9})$', re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'\b(\d{4})\b')
+
+# Fields of a normalized record, besides author_list and citation
+RECORD_FIELDS = ('doi', 'pmid', 'title', 'authors', 'journal', 'year', 'volume', 'issue', 'pages')
+
+
+class UpstreamStatus(Exception):
+    """A provider answered with an unexpected HTTP status"""
+
+
+def parse_identifier(value):
+    """('pmid', digits), ('doi', normalized DOI) or (None, '')"""
+    value = (value or '').strip()
+    match = PMID_PATTERN.match(value)
+    if match:
+        return 'pmid', match.group(1)
+    doi = normalize_doi(value)
+    if doi.startswith('10.'):
+        return 'doi', doi
+    return None, ''
+
+
+def expect_json(response):
+    """The body of a 200, None for a 404; anything else is an error"""
+    if response.status == 404:
+        return None
+    if response.status != 200:
+        raise UpstreamStatus(response.status)
+    return response.data
+
+
+def display_authors(author_list):
+    return ', '.join(f"{author.get('given', '')} {author.get('family', '')}".strip() for author in author_list)
+
+
+def crossref_metadata(message, doi):
+    """Publication metadata from a Crossref work message"""
+    title = message.get('title', [''])[0] if message.get('title') else ''
+
+    authors_list = message.get('author', [])
+    authors = ', '.join([
+        f"{author.get('given', '')} {author.get('family', '')}".strip()
+        for author in authors_list
+    ])
+
+    journal = message.get('container-title', [''])[0] if message.get('container-title') else ''
+
+    year = None
+    published_date = message.get('published-print') or message.get('published-online')
+    if published_date and published_date.get('date-parts'):
+        year = published_date['date-parts'][0][0] if published_date['date-parts'][0] else None
+
+    volume = message.get('volume', '')
+    issue = message.get('issue', '')
+    pages = message.get('page', '')
+
+    metadata = {
+        'title': title,
+        'authors': authors,
+        'journal': journal,
+        'year': year,
+        'volume': volume,
+        'issue': issue,
+        'pages': pages,
+        'author_list': crossref_authors(authors_list),
+    }
+    # Render the APA citation locally rather than asking citation.doi.org
+    metadata['citation'] = format_citation({**metadata, 'doi': doi}, 'apa')
+    return metadata
+
+
+def datacite_metadata(attributes, doi):
+    """Publication metadata from DataCite DOI attributes"""
+    titles = attributes.get('titles') or []
+    container = attributes.get('container') or {}
+    first_page, last_page = container.get('firstPage', ''), container.get('lastPage', '')
+    author_list = datacite_authors(attributes.get('creators'))
+    year = attributes.get('publicationYear')
+    return {
+        'doi': doi,
+        'title': titles[0].get('title', '') if titles else '',
+        'authors': display_authors(author_list),
+        'journal': container.get('title') or attributes.get('publisher') or '',
+        'year': int(year) if str(year or '').isdigit() else None,
+        'volume': container.get('volume', ''),
+        'issue': container.get('issue', ''),
+        'pages': f"{first_page}-{last_page}" if first_page and last_page else first_page,
+        'author_list': author_list,
+    }
+
+
+def pubmed_metadata(summary):
+    """Publication metadata from an NCBI esummary document"""
+    article_ids = {article_id.get('idtype'): article_id.get('value', '') for article_id in summary.get('articleids', [])}
+    year = YEAR_PATTERN.search(summary.get('pubdate') or summary.get('epubdate') or '')
+    author_list = pubmed_authors(summary.get('authors'))
+    return {
+        'doi': normalize_doi(article_ids.get('doi', '')),
+        'pmid': str(summary.get('uid', '')),
+        'title': (summary.get('title') or '').rstrip('.'),
+        'authors': display_authors(author_list),
+        'journal': summary.get('fulljournalname') or summary.get('source') or '',
+        'year': int(year.group(1)) if year else None,
+        'volume': summary.get('volume', ''),
+        'issue': summary.get('issue', ''),
+        'pages': summary.get('pages', ''),
+        'author_list': author_list,
+    }
+
+
+class Provider:
+    name = None
+    # Identifier kinds the provider is an authority for, and can look up at all
+    registers = ()
+    kinds = ()
+    # DOI prefixes the provider should be asked about first
+    prefixes = ()
+    url_setting = None
+
+    @property
+    def base_url(self):
+        return getattr(settings, self.url_setting).rstrip('/')
+
+    def claims(self, doi):
+        return doi.split('/', 1)[0] in self.prefixes
+
+    def lookup(self, kind, identifier):
+        """Generator yielding Requests, sent Responses, returning a record or None"""
+        raise NotImplementedError
+
+
+class CrossrefProvider(Provider):
+    name = 'crossref'
+    registers = kinds = ('doi',)
+    url_setting = 'CROSSREF_API_URL'
+
+    def lookup(self, kind, identifier):
+        data = expect_json((yield Request(f"{self.base_url}/works/{identifier}", None)))
+        if data is None:
+            return None
+        return {'doi': identifier, **crossref_metadata(data.get('message', {}), identifier)}
+
+
+class DataCiteProvider(Provider):
+    name = 'datacite'
+    registers = kinds = ('doi',)
+    url_setting = 'DATACITE_API_URL'
+    prefixes = (
+        '10.5281',   # Zenodo
+        '10.6084',   # figshare
+        '10.5061',   # Dryad
+        '10.17605',  # OSF
+        '10.7910',   # Dataverse
+        '10.48550',  # arXiv
+        '10.25384',  # SAGE figshare
+        '10.15468',  # GBIF
+    )
+
+    def lookup(self, kind, identifier):
+        data = expect_json((yield Request(f"{self.base_url}/dois/{identifier}", None)))
+        if data is None:
+            return None
+        return datacite_metadata(data.get('data', {}).get('attributes', {}), identifier)
+
+
+class PubMedProvider(Provider):
+    name = 'pubmed'
+    registers = ('pmid',)
+    kinds = ('pmid', 'doi')
+    url_setting = 'NCBI_EUTILS_URL'
+
+    def params(self, **params):
+        params.update(db='pubmed', retmode='json', tool='cvbuilder')
+        if getattr(settings, 'NCBI_API_KEY', ''):
+            params['api_key'] = settings.NCBI_API_KEY
+        return params
+
+    def lookup(self, kind, identifier):
+        pmid = identifier
+        if kind == 'doi':
+            found = expect_json((yield Request(f"{self.base_url}/esearch.fcgi", self.params(term=f"{identifier}[doi]"))))
+            ids = (found or {}).get('esearchresult', {}).get('idlist', [])
+            if not ids:
+                return None
+            pmid = ids[0]
+        data = expect_json((yield Request(f"{self.base_url}/esummary.fcgi", self.params(id=pmid))))
+        summary = (data or {}).get('result', {}).get(str(pmid))
+        if not summary or 'error' in summary:
+            return None
+        return pubmed_metadata(summary)
+
+
+PROVIDERS = {provider.name: provider for provider in (CrossrefProvider(), DataCiteProvider(), PubMedProvider())}
+
+
+def enabled_providers(setting):
+    return [PROVIDERS[name] for name in getattr(settings, setting, ()) if name in PROVIDERS]
+
+
+def route(kind, identifier):
+    """Providers to ask for an identifier, most likely first"""
+    providers = [provider for provider in enabled_providers('METADATA_PROVIDERS') if kind in provider.registers]
+    if kind == 'doi':
+        # Stable sort: prefix claimants first, otherwise configured order
+        providers.sort(key=lambda provider: not provider.claims(identifier))
+    return providers
+
+
+def failure_outcome(error):
+    if isinstance(error, CircuitOpen):
+        return 'circuit_open'
+    if isinstance(error, DeadlineExceeded):
+        return 'deadline'
+    if isinstance(error, UpstreamStatus):
+        return 'http_error'
+    return 'error'
+
+
+def run_lookup(provider, kind, identifier):
+    """Drive a provider's lookup with blocking requests"""
+    lookup = provider.lookup(kind, identifier)
+    try:
+        request = next(lookup)
+        while True:
+            response = upstream_get(request.url, timeout=10, params=request.params)
+            request = lookup.send(Response(response.status_code, response.json() if response.status_code == 200 else None))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def arun_lookup(provider, kind, identifier, client):
+    """Drive a provider's lookup with an httpx.AsyncClient"""
+    lookup = provider.lookup(kind, identifier)
+    try:
+        request = next(lookup)
+        while True:
+            response = await aupstream_get(client, request.url, timeout=10, params=request.params)
+            request = lookup.send(Response(response.status_code, response.json() if response.status_code == 200 else None))
+    except StopIteration as stop:
+        return stop.value
+
+
+def record_attempt(provider, record=None, error=None):
+    outcome = failure_outcome(error) if error is not None else ('success' if record else 'not_found')
+    PROVIDER_LOOKUPS.inc(provider=provider.name, outcome=outcome)
+    return record, outcome
+
+
+def attempt(provider, kind, identifier):
+    try:
+        return record_attempt(provider, run_lookup(provider, kind, identifier))
+    except Exception as e:
+        return record_attempt(provider, error=e)
+
+
+async def aattempt(provider, kind, identifier, client):
+    try:
+        return record_attempt(provider, await arun_lookup(provider, kind, identifier, client))
+    except Exception as e:
+        return record_attempt(provider, error=e)
+
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='cv-metadata')
+    return _executor
+
+
+def first_record(providers, kind, identifier):
+    """
+    (record, outcome) from the first provider with a record, hedging slow
+    providers per METADATA_HEDGE_DELAY. Without a record, the outcome is the
+    first provider's.
+    """
+    if not providers:
+        return None, 'not_found'
+    hedge_delay = getattr(settings, 'METADATA_HEDGE_DELAY', 0)
+    if not hedge_delay or len(providers) == 1:
+        outcomes = []
+        for provider in providers:
+            record, outcome = attempt(provider, kind, identifier)
+            if record:
+                return record, outcome
+            outcomes.append(outcome)
+        return None, outcomes[0]
+
+    pending = list(providers)
+    running = {}
+    outcomes = {}
+
+    def start_next():
+        provider = pending.pop(0)
+        # Each thread gets the caller's context, so the deadline applies there too
+        future = executor().submit(contextvars.copy_context().run, attempt, provider, kind, identifier)
+        running[future] = provider
+
+    start_next()
+    while running:
+        done, _ = wait(running, timeout=hedge_delay if pending else None, return_when=FIRST_COMPLETED)
+        if not done:
+            METADATA_HEDGES.inc(provider=pending[0].name)
+            start_next()
+            continue
+        for future in done:
+            provider = running.pop(future)
+            record, outcomes[provider.name] = future.result()
+            if record:
+                return record, outcomes[provider.name]
+            if pending:
+                start_next()
+    return None, outcomes[providers[0].name]
+
+
+async def afirst_record(providers, kind, identifier, client):
+    """Async first_record; hedged providers run as tasks on the event loop"""
+    if not providers:
+        return None, 'not_found'
+    hedge_delay = getattr(settings, 'METADATA_HEDGE_DELAY', 0) or None
+    pending = list(providers)
+    running = {}
+    outcomes = {}
+
+    def start_next():
+        provider = pending.pop(0)
+        running[asyncio.ensure_future(aattempt(provider, kind, identifier, client))] = provider
+
+    start_next()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running, timeout=hedge_delay if pending else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                METADATA_HEDGES.inc(provider=pending[0].name)
+                start_next()
+                continue
+            for task in done:
+                provider = running.pop(task)
+                record, outcomes[provider.name] = task.result()
+                if record:
+                    return record, outcomes[provider.name]
+                if pending:
+                    start_next()
+        return None, outcomes[providers[0].name]
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def supplement_plan(kind, record):
+    """(providers, kind, identifier) lookups that may fill blanks in a record"""
+    plans = []
+    supplements = [p for p in enabled_providers('METADATA_SUPPLEMENT_PROVIDERS') if kind in p.kinds]
+    if kind == 'doi':
+        plans.extend(([provider], 'doi', record['doi']) for provider in supplements if not record.get('pmid'))
+    elif record.get('doi'):
+        plans.append((route('doi', record['doi']), 'doi', record['doi']))
+    return plans
+
+
+def merge_records(records):
+    """One record from several, earlier records winning; the citation is rendered from the result"""
+    merged = {}
+    for field in RECORD_FIELDS:
+        values = (record.get(field) for record in records)
+        merged[field] = next((value for value in values if value not in ('', None)), None if field == 'year' else '')
+    merged['author_list'] = next((record['author_list'] for record in records if record.get('author_list')), [])
+    merged['citation'] = format_citation(merged, 'apa')
+    return merged
+
+
+def resolve(identifier, providers=None):
+    """
+    (record, outcome) for a DOI or PMID; outcome is 'success' when a record
+    was found. `providers` replaces the routed chain for the first record.
+    """
+    kind, identifier = parse_identifier(identifier)
+    if kind is None:
+        return None, 'not_found'
+    providers = route(kind, identifier) if providers is None else providers
+    record, outcome = first_record(providers, kind, identifier)
+    if record is None:
+        return None, outcome
+    records = [{**record, kind: identifier}]
+    for providers, supplement_kind, supplement_id in supplement_plan(kind, records[0]):
+        supplement, _ = first_record(providers, supplement_kind, supplement_id)
+        if supplement:
+            records.append(supplement)
+    return merge_records(records), outcome
+
+
+async def aresolve(identifier, client):
+    """Async resolve over a shared httpx.AsyncClient"""
+    kind, identifier = parse_identifier(identifier)
+    if kind is None:
+        return None, 'not_found'
+    record, outcome = await afirst_record(route(kind, identifier), kind, identifier, client)
+    if record is None:
+        return None, outcome
+    records = [{**record, kind: identifier}]
+    for providers, supplement_kind, supplement_id in supplement_plan(kind, records[0]):
+        supplement, _ = await afirst_record(providers, supplement_kind, supplement_id, client)
+        if supplement:
+            records.append(supplement)
+    return merge_records(records), outcome
@@ -0,0 +1,275 @@
+"""
+Scheduled revalidation of shared Work metadata.
+
+Metadata saved for an online-first paper usually has the online year and no
+volume, issue or pages, and nothing refetches it once it has a title. The
+refresh_stale_metadata command, run from cron, revisits Works instead:
+
+  - Each Work is due after an interval set by how complete and how recent it
+    is (REFRESH_INTERVALS). Incomplete papers from the last couple of years
+    are rechecked daily; complete older ones twice a year.
+  - Due Works are ranked by how overdue they are (age / interval), so recent
+    and incomplete records come first. The database does the ranking within
+    each interval class, so a run reads only a few rows per class.
+  - Works whose identifier routes to Crossref first get a conditional
+    request (If-None-Match / If-Modified-Since) when the last response
+    carried a validator. A 304 only moves fetched_at. DOIs Crossref doesn't
+    know, DataCite-prefixed DOIs and PMIDs go through the provider chain
+    (cv.providers) instead.
+  - Only fields whose value changed are written, with update_fields.
+  - A failed attempt (a network error, a 4xx other than 404, an exhausted
+    deadline) is recorded on the Work, which then sits out an exponential
+    backoff (retry_delay) before it is due again. Without that, Works that
+    never fetched or that always fail would lead every run.
+  - A run counts upstream requests, not Works: one Work can cost several
+    (Crossref, then the provider chain, PubMed and supplement lookups). It
+    stops taking new Works once METADATA_REFRESH_BUDGET requests have gone
+    out, so the Work in progress may take it a few over, and it spaces the
+    requests evenly over METADATA_REFRESH_PERIOD seconds. It stops early if
+    Crossref's circuit opens.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .authors import set_publication_authors
+from .metrics import METADATA_REFRESHES
+from .models import Publication, Work
+from .providers import crossref_metadata, parse_identifier, resolve, route
+from .upstream import CircuitOpen, counting_requests, deadline, upstream_get
+
+# Fields whose absence makes a record incomplete
+COMPLETENESS_FIELDS = ('title', 'authors', 'journal', 'year', 'volume', 'issue', 'pages')
+# Published this many years ago or later counts as recent
+RECENT_YEARS = 2
+# Days between checks by (incomplete, recent)
+REFRESH_INTERVALS = {
+    (True, True): 1,
+    (True, False): 14,
+    (False, True): 30,
+    (False, False): 180,
+}
+# Wait after the first failed attempt; it doubles with each further failure
+RETRY_BASE = timedelta(hours=1)
+RETRY_MAX = timedelta(days=30)
+
+
+def missing_fields(work):
+    return [field for field in COMPLETENESS_FIELDS if getattr(work, field) in ('', None)]
+
+
+def refresh_interval(work, now):
+    incomplete = bool(missing_fields(work))
+    recent = work.year is None or work.year >= now.year - RECENT_YEARS
+    return timedelta(days=REFRESH_INTERVALS[(incomplete, recent)])
+
+
+def refresh_priority(work, now):
+    """How overdue a Work is, as a multiple of its interval; due at 1.0, never fetched is infinite"""
+    if work.fetched_at is None:
+        return float('inf')
+    return (now - work.fetched_at) / refresh_interval(work, now)
+
+
+def retry_delay(failures):
+    """How long a Work sits out after `failures` failed attempts in a row"""
+    return min(RETRY_BASE * 2 ** min(failures - 1, 16), RETRY_MAX)
+
+
+def incomplete_filter():
+    """Q matching Works with any COMPLETENESS_FIELDS value missing"""
+    q = Q()
+    for field in COMPLETENESS_FIELDS:
+        q |= Q(**{f'{field}__isnull': True}) if field == 'year' else Q(**{field: ''})
+    return q
+
+
+def due_works(now=None, limit=None):
+    """
+    Works due for a refresh, most overdue first. Within one interval class,
+    overdue order is fetched_at order, so each class is one ordered, limited
+    query. Only those rows are merged by priority. Works backing off after a
+    failed attempt are left out until their retry_after.
+    """
+    now = now or timezone.now()
+    linked = Work.objects.filter(
+        Exists(Publication.objects.filter(work=OuterRef('pk'))),
+        Q(retry_after__isnull=True) | Q(retry_after__lte=now),
+    )
+    never = list(linked.filter(fetched_at__isnull=True).order_by('refresh_failures', 'id')[:limit])
+    remaining = None if limit is None else limit - len(never)
+    if remaining == 0:
+        return never
+
+    incomplete = incomplete_filter()
+    recent = Q(year__isnull=True) | Q(year__gte=now.year - RECENT_YEARS)
+    due = []
+    for (is_incomplete, is_recent), days in REFRESH_INTERVALS.items():
+        queryset = (
+            linked
+            .filter(incomplete if is_incomplete else ~incomplete)
+            .filter(recent if is_recent else ~recent)
+            .filter(fetched_at__lte=now - timedelta(days=days))
+            .order_by('fetched_at', 'id')
+        )
+        due.extend(queryset[:remaining])
+    due.sort(key=lambda work: refresh_priority(work, now), reverse=True)
+    return never + due[:remaining]
+
+
+def conditional_headers(work):
+    headers = {}
+    if work.etag:
+        headers['If-None-Match'] = work.etag
+    if work.last_modified:
+        headers['If-Modified-Since'] = work.last_modified
+    return headers
+
+
+def apply_refreshed_metadata(work, metadata):
+    """Set the fields whose fetched value differs; returns their names (does not save)"""
+    changed = []
+    for field in COMPLETENESS_FIELDS + ('citation', 'pmid'):
+        value = metadata.get(field)
+        # A field the upstream record has dropped keeps its old value
+        if value in ('', None) or value == getattr(work, field):
+            continue
+        setattr(work, field, value)
+        changed.append(field)
+    if metadata.get('author_list') and metadata['author_list'] != work.author_data:
+        work.author_data = metadata['author_list']
+        changed.append('author_data')
+    return changed
+
+
+def refresh_work(work, now=None):
+    """
+    Revalidate one Work against its metadata providers. Returns 'changed',
+    'unchanged', 'not_modified', 'not_found' or 'error'; raises CircuitOpen
+    when Crossref's circuit is open for a Crossref-routed Work.
+    """
+    now = now or timezone.now()
+    kind, identifier = parse_identifier(work.doi)
+    providers = route(kind, identifier) if kind else []
+    if providers and providers[0].name == 'crossref':
+        result = revalidate_from_crossref(work, now)
+        if result != 'not_found' or len(providers) == 1:
+            return record_refresh(result)
+        # Crossref doesn't know the DOI; ask the rest of the chain
+        providers = providers[1:]
+    return record_refresh(refresh_from_chain(work, providers, now))
+
+
+def revalidate_from_crossref(work, now):
+    """Conditional Crossref request for a Work; see refresh_work for the results"""
+    url = f"{settings.CROSSREF_API_URL}/works/{work.doi}"
+    try:
+        with deadline(settings.DOI_LOOKUP_DEADLINE):
+            response = upstream_get(url, timeout=10, headers=conditional_headers(work))
+    except CircuitOpen:
+        raise
+    except Exception:
+        return record_failed_attempt(work, now)
+
+    if response.status_code == 304:
+        work.save(update_fields=mark_fetched(work, now))
+        return 'not_modified'
+    if response.status_code == 404:
+        # Back off like any other check rather than retrying the DOI every run
+        work.save(update_fields=mark_fetched(work, now))
+        return 'not_found'
+    if response.status_code != 200:
+        return record_failed_attempt(work, now)
+
+    work.etag = response.headers.get('ETag', '')
+    work.last_modified = response.headers.get('Last-Modified', '')
+    metadata = crossref_metadata(response.json().get('message', {}), work.doi)
+    return save_refreshed_work(work, metadata, [*mark_fetched(work, now), 'etag', 'last_modified'])
+
+
+def refresh_from_chain(work, providers, now):
+    """Refresh a Work through the provider chain (DataCite, PubMed, ...)"""
+    try:
+        with deadline(settings.DOI_LOOKUP_DEADLINE):
+            metadata, outcome = resolve(work.doi, providers=providers)
+    except Exception:
+        return record_failed_attempt(work, now)
+    if metadata is None and outcome == 'circuit_open':
+        # Nothing was asked, so there is nothing to back off from
+        return 'error'
+    if metadata is None and outcome != 'not_found':
+        return record_failed_attempt(work, now)
+
+    if metadata is None:
+        work.save(update_fields=mark_fetched(work, now))
+        return 'not_found'
+    return save_refreshed_work(work, metadata, mark_fetched(work, now))
+
+
+def mark_fetched(work, now):
+    """Record a completed check on the Work; returns the fields to save"""
+    work.fetched_at = now
+    work.refresh_failures = 0
+    work.retry_after = None
+    return ['fetched_at', 'refresh_failures', 'retry_after']
+
+
+def record_failed_attempt(work, now):
+    """Count a failed attempt and put the Work in backoff; returns 'error'"""
+    work.refresh_failures += 1
+    work.retry_after = now + retry_delay(work.refresh_failures)
+    work.save(update_fields=['refresh_failures', 'retry_after'])
+    return 'error'
+
+
+def save_refreshed_work(work, metadata, update_fields):
+    """Apply fetched metadata and save the changed fields; returns 'changed' or 'unchanged'"""
+    changed = apply_refreshed_metadata(work, metadata)
+    if changed:
+        update_fields = [*update_fields, *changed, 'updated_at']
+    work.save(update_fields=update_fields)
+    if 'author_data' in changed:
+        for publication in work.publications.all():
+            set_publication_authors(publication, work.author_data)
+    return 'changed' if changed else 'unchanged'
+
+
+def record_refresh(result):
+    METADATA_REFRESHES.inc(result=result)
+    return result
+
+
+def run_refresh(budget=None, period=None, sleep=time.sleep, log=None):
+    """
+    Refresh the most overdue Works until `budget` upstream requests have gone
+    out, spread over `period` seconds. Returns a {result: count} summary.
+    """
+    budget = settings.METADATA_REFRESH_BUDGET if budget is None else budget
+    period = settings.METADATA_REFRESH_PERIOD if period is None else period
+    log = log or (lambda message: None)
+    # Every Work costs at least one request
+    works = due_works(limit=budget)
+    spacing = period / budget if budget else 0
+    summary = {}
+    with counting_requests() as requests_made:
+        spaced = 0
+        for i, work in enumerate(works):
+            if requests_made.value >= budget:
+                log(f'Request budget of {budget} spent; stopping this run')
+                summary['skipped'] = len(works) - i
+                break
+            if spacing and requests_made.value > spaced:
+                sleep(spacing * (requests_made.value - spaced))
+            spaced = requests_made.value
+            try:
+                result = refresh_work(work)
+            except CircuitOpen:
+                log('Crossref circuit is open; stopping this run')
+                summary['skipped'] = len(works) - i
+                break
+            summary[result] = summary.get(result, 0) + 1
+            log(f"{work.doi}: {result}")
+    return summary
@@ -0,0 +1,65 @@
+"""
+Faster JSON rendering and parsing for the API.
+
+FastJSONRenderer and FastJSONParser use orjson when it is installed (it is
+in the optional `fast` extra: `poetry install --extras fast`) and otherwise
+behave exactly like DRF's JSONRenderer and JSONParser. Output matches DRF's
+compact JSON byte for byte: non-ASCII is left unescaped, U+2028/U+2029 are
+escaped, and values orjson doesn't handle natively (datetimes, Decimals,
+lazy strings, ...) go through DRF's JSONEncoder. The stdlib path still
+handles indented output (`Accept: application/json; indent=4`), non-compact
+or ASCII-only settings, and anything orjson rejects, such as integers wider
+than 64 bits. One difference remains: with orjson, NaN and Infinity render
+as null rather than raising.
+
+Select them in REST_FRAMEWORK's DEFAULT_RENDERER_CLASSES and
+DEFAULT_PARSER_CLASSES (config/settings.py).
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib json path is used instead
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for the compact case"""
+
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or not self.compact or self.ensure_ascii or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer: keep the output a strict JavaScript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser using orjson for UTF-8 request bodies"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
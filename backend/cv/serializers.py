@@ -1,5 +1,85 @@
+import functools
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import serializers
-from .models import Education, ProfessionalExperience, Publication, Award, PersonalStatement, Biosketch
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+from .authors import clean_orcid
+from .citations import STYLES as CITATION_STYLES
+from .dois import normalize_doi
+from .models import Education, ProfessionalExperience, Publication, Award, PersonalStatement, Biosketch, OrcidSync
+
+
+# Fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.ReadOnlyField,
+    PrimaryKeyRelatedField,
+)
+
+
+def passes_through(field):
+    if type(field) is serializers.BigIntegerField:
+        return not getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING)
+    return type(field) in PASSTHROUGH_FIELDS
+
+
+class ValuesReader:
+    """
+    Read-only list representation for a ModelSerializer, built from
+    values_list() rows instead of model instances.
+
+    The column plan is worked out once per serializer class from its fields.
+    Fields that return database values as they are (PASSTHROUGH_FIELDS) are
+    copied straight across. Others, such as datetimes, still go through the
+    field's to_representation, so the output matches serializer.data.
+    Serializers with a custom to_representation mirror it with
+    values_related (extra columns to read) and finish_values_row().
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.names = []
+        self.columns = []
+        self.converters = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} has no single column to read")
+            self.names.append(name)
+            self.columns.append(field.source)
+            if not passes_through(field):
+                self.converters.append((name, field.to_representation))
+        self.related = tuple(getattr(serializer_class, 'values_related', ()))
+
+    def represent(self, queryset):
+        """List of row dicts equal to serializer_class(queryset, many=True).data"""
+        names = self.names
+        width = len(names)
+        finish = getattr(self.serializer_class, 'finish_values_row', None)
+        result = []
+        for values in queryset.values_list(*self.columns, *self.related):
+            row = dict(zip(names, values))
+            for name, convert in self.converters:
+                if row[name] is not None:
+                    row[name] = convert(row[name])
+            if finish is not None:
+                row = finish(row, values[width:])
+            result.append(row)
+        return result
+
+
+@functools.lru_cache(maxsize=None)
+def values_reader(serializer_class):
+    return ValuesReader(serializer_class)
+
+
+def values_representation(serializer_class, queryset):
+    """serializer_class(queryset, many=True).data, read through values_list()"""
+    return values_reader(serializer_class).represent(queryset)
 
 
 class EducationSerializer(serializers.ModelSerializer):
@@ -20,11 +100,51 @@ class ProfessionalExperienceSerializer(serializers.ModelSerializer):
 
 class PublicationSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
+    work = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Publication
         fields = '__all__'
 
+    def validate_doi(self, value):
+        # Indexed lookup on (user, normalized_doi) catches URL/prefix/case variants
+        normalized = normalize_doi(value)
+        request = self.context.get('request')
+        if normalized and request is not None:
+            duplicates = Publication.objects.filter(user=request.user, normalized_doi=normalized)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError("You already have a publication with this DOI.")
+        return value
+
+    def update(self, instance, validated_data):
+        # Write only the columns that changed; an update that changes nothing skips the query
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save_changed()
+        return instance
+
+    def to_representation(self, instance):
+        # Blank per-user fields show the shared Work's metadata
+        data = super().to_representation(instance)
+        if instance.work_id:
+            for field in Publication.METADATA_FIELDS:
+                if data.get(field) in ('', None):
+                    data[field] = getattr(instance.work, field)
+        return data
+
+    # The same overlay for the values_list() read path (ValuesReader)
+    values_related = tuple(f'work__{field}' for field in Publication.METADATA_FIELDS)
+
+    @staticmethod
+    def finish_values_row(row, work_values):
+        if row['work'] is not None:
+            for field, value in zip(Publication.METADATA_FIELDS, work_values):
+                if row.get(field) in ('', None):
+                    row[field] = value
+        return row
+
 
 class AwardSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -51,6 +171,33 @@ class BiosketchSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class OrcidSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrcidSync
+        fields = ['orcid', 'synced_at', 'last_result']
+        read_only_fields = fields
+
+
+class OrcidSyncRequestSerializer(serializers.Serializer):
+    orcid = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text="ORCID iD or orcid.org URL to link; omit to sync the linked iD"
+    )
+    force = serializers.BooleanField(
+        default=False,
+        help_text="Diff every work even if ORCID reports no change since the last sync"
+    )
+
+    def validate_orcid(self, value):
+        if not value:
+            return value
+        try:
+            return clean_orcid(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+
 class BiosketchRequestSerializer(serializers.Serializer):
     related_publication_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -93,6 +240,12 @@ class BiosketchRequestSerializer(serializers.Serializer):
         allow_blank=True,
         help_text="Title/degree (e.g., PhD, MD, etc.)"
     )
+    citation_style = serializers.ChoiceField(
+        choices=CITATION_STYLES,
+        required=False,
+        allow_blank=True,
+        help_text="Render publication citations in this style (apa, nih, ama) instead of the saved citation text"
+    )
 
     def validate(self, data):
         if not data.get('personal_statement_id') and not data.get('summary'):
@@ -0,0 +1,236 @@
+"""
+Guards for outbound calls to metadata services such as Crossref.
+
+Each upstream host has a shared CircuitBreaker. After UPSTREAM_BREAKER_FAILURES
+consecutive failures (connection errors, timeouts, 5xx and 429 responses) it
+opens, and calls to that host fail at once with CircuitOpen rather than
+waiting on the network. After UPSTREAM_BREAKER_RESET_SECONDS one trial call is
+let through (half-open). If it succeeds the breaker closes; if it fails the
+breaker opens again. A trial that is cancelled (a losing hedge, a client
+disconnect) gives its slot back without a verdict, so the next call retries.
+
+deadline() gives a lookup one time budget, however many requests it makes.
+Each request's timeout is cut to what is left of the budget. Once the budget
+is spent, DeadlineExceeded is raised before the next request. Deadlines nest:
+an inner deadline can shorten the budget but never extend it.
+
+counting_requests() counts the requests made in a block, including those
+made by hedging threads started with the block's context.
+
+Breaker state per host is exported as the cv_upstream_circuit_state gauge.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+
+from .metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE
+
+logger = logging.getLogger('cv.upstream')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATES = (CLOSED, HALF_OPEN, OPEN)
+
+_deadline = contextvars.ContextVar('cv_upstream_deadline', default=None)
+_request_count = contextvars.ContextVar('cv_upstream_request_count', default=None)
+
+
+class CircuitOpen(Exception):
+    """The upstream host's breaker is open; the call was not made"""
+
+
+class DeadlineExceeded(Exception):
+    """The lookup's time budget ran out before the call was made"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream host; safe to share between threads"""
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._export()
+
+    def allow(self):
+        """Whether a call may go out now. In half-open state only one trial call is allowed."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        CIRCUIT_REJECTIONS.inc(host=self.host)
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != CLOSED:
+                logger.info('Circuit for %s closed', self.host)
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning('Circuit for %s opened after %d consecutive failures', self.host, self.failures)
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self):
+        """Give back a half-open trial slot for a call that ended without an answer"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _set_state(self, state):
+        self.state = state
+        self._export()
+
+    def _export(self):
+        for state in STATES:
+            CIRCUIT_STATE.set(int(state == self.state), host=self.host, state=state)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """The shared CircuitBreaker for a URL's host"""
+    host = urlparse(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=getattr(settings, 'UPSTREAM_BREAKER_FAILURES', 5),
+                reset_timeout=getattr(settings, 'UPSTREAM_BREAKER_RESET_SECONDS', 30.0),
+            )
+        return breaker
+
+
+def reset_breakers():
+    """Forget all breaker state (for tests and settings changes)"""
+    with _breakers_lock:
+        for breaker in _breakers.values():
+            breaker.record_success()
+        _breakers.clear()
+
+
+@contextmanager
+def deadline(seconds):
+    """Share one time budget across the upstream calls made in the block"""
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_timeout(timeout):
+    """`timeout` cut to the current deadline; raises DeadlineExceeded once the budget is spent"""
+    expires = _deadline.get()
+    if expires is None:
+        return timeout
+    remaining = expires - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return min(timeout, remaining)
+
+
+class RequestCount:
+    """Number of upstream requests made under counting_requests(); safe to share between threads"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.value += 1
+
+
+@contextmanager
+def counting_requests():
+    """Count the upstream calls that go out in the block; yields a RequestCount"""
+    count = RequestCount()
+    token = _request_count.set(count)
+    try:
+        yield count
+    finally:
+        _request_count.reset(token)
+
+
+def note_request():
+    count = _request_count.get()
+    if count is not None:
+        count.add()
+
+
+def is_failure(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+def upstream_get(url, timeout=10, **kwargs):
+    """requests.get through the host's breaker and the current deadline"""
+    breaker = breaker_for(url)
+    timeout = remaining_timeout(timeout)
+    if not breaker.allow():
+        raise CircuitOpen(breaker.host)
+    note_request()
+    try:
+        response = requests.get(url, timeout=timeout, **kwargs)
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled or interrupted: no verdict on the host
+        breaker.release()
+        raise
+    if is_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+async def aupstream_get(client, url, timeout=10, **kwargs):
+    """httpx AsyncClient.get through the host's breaker and the current deadline"""
+    breaker = breaker_for(url)
+    timeout = remaining_timeout(timeout)
+    if not breaker.allow():
+        raise CircuitOpen(breaker.host)
+    note_request()
+    try:
+        response = await client.get(url, timeout=timeout, **kwargs)
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled or interrupted: no verdict on the host
+        breaker.release()
+        raise
+    if is_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -7,7 +8,8 @@ from .views import (
     AwardViewSet,
     PersonalStatementViewSet,
     BiosketchViewSet,
-    generate_biosketch
+    generate_biosketch,
+    orcid_sync
 )
 
 router = DefaultRouter()
@@ -21,5 +23,17 @@ router.register(r'biosketches', BiosketchViewSet, basename='biosketch')
 urlpatterns = [
     path('', include(router.urls)),
     path('biosketch/', generate_biosketch, name='generate-biosketch'),
+    path('orcid/sync/', orcid_sync, name='orcid-sync'),
 ]
 
+if settings.ASYNC_VIEWS:
+    # Under ASGI, the I/O-bound endpoints await Crossref and compiles instead of
+    # blocking a thread; these come first so they shadow the router's routes
+    from . import async_views
+
+    urlpatterns = [
+        path('publications/', async_views.publication_list, name='publication-list'),
+        path('publications/<int:pk>/', async_views.publication_detail, name='publication-detail'),
+        path('biosketch/', async_views.generate_biosketch, name='generate-biosketch'),
+    ] + urlpatterns
+
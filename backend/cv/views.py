@@ -1,26 +1,55 @@
 import subprocess
 import tempfile
-import requests
+import time
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
+from django.db.models import Q
 from django.http import HttpResponse
-from .models import Education, ProfessionalExperience, Publication, Award, PersonalStatement, Biosketch
+from django.utils import timezone
+from .authors import author_position_filter, parse_author_string, set_publication_authors
+from .citations import citation_for_biosketch
+from .dois import normalize_doi
+from .instrumentation import timed
+from .list_cache import CachedListMixin
+from .metrics import BIOSKETCH_DURATION, COMPILES_IN_PROGRESS, CROSSREF_BATCH_DOIS, CROSSREF_BATCHES, DOI_FETCHES
+from .profiling import ProfiledListMixin, profiled
+from .providers import crossref_metadata, resolve
+from .upstream import CircuitOpen, deadline, upstream_get
+from .models import Education, ProfessionalExperience, Publication, Work, Award, PersonalStatement, Biosketch, OrcidSync
 from .serializers import (
+    values_representation,
     EducationSerializer,
     ProfessionalExperienceSerializer,
     PublicationSerializer,
     AwardSerializer,
     PersonalStatementSerializer,
     BiosketchSerializer,
-    BiosketchRequestSerializer
+    BiosketchRequestSerializer,
+    OrcidSyncSerializer,
+    OrcidSyncRequestSerializer
 )
 
 
-class EducationViewSet(viewsets.ModelViewSet):
+class ValuesListMixin:
+    """
+    Viewset mixin answering list() from values_list() rows through the
+    serializer's ValuesReader, skipping per-instance serializer work. Detail
+    views and writes still use the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(values_representation(self.get_serializer_class(), queryset))
+
+
+class EducationViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = EducationSerializer
     permission_classes = [IsAuthenticated]
 
@@ -31,7 +60,7 @@ class EducationViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class ProfessionalExperienceViewSet(viewsets.ModelViewSet):
+class ProfessionalExperienceViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = ProfessionalExperienceSerializer
     permission_classes = [IsAuthenticated]
 
@@ -43,100 +72,218 @@ class ProfessionalExperienceViewSet(viewsets.ModelViewSet):
 
 
 def fetch_doi_metadata(doi):
-    """Fetch publication metadata from Crossref API using DOI"""
+    """
+    Fetch publication metadata for a DOI (or PMID) through the provider chain
+    in cv.providers: Crossref, DataCite and optionally PubMed. The lookup fails
+    fast while a provider's circuit is open and gets DOI_LOOKUP_DEADLINE
+    seconds in all (see cv.upstream).
+    """
     try:
-        url = f"https://api.crossref.org/works/{doi}"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            message = data.get('message', {})
-
-            title = message.get('title', [''])[0] if message.get('title') else ''
-
-            authors_list = message.get('author', [])
-            authors = ', '.join([
-                f"{author.get('given', '')} {author.get('family', '')}".strip()
-                for author in authors_list
-            ])
-
-            journal = message.get('container-title', [''])[0] if message.get('container-title') else ''
-
-            year = None
-            published_date = message.get('published-print') or message.get('published-online')
-            if published_date and published_date.get('date-parts'):
-                year = published_date['date-parts'][0][0] if published_date['date-parts'][0] else None
-
-            volume = message.get('volume', '')
-            issue = message.get('issue', '')
-            pages = message.get('page', '')
-
-            citation_url = f"https://citation.doi.org/format"
-            citation_params = {'doi': doi, 'style': 'apa', 'lang': 'en-US'}
-            citation_response = requests.get(citation_url, params=citation_params, timeout=10)
-            citation = citation_response.text.strip() if citation_response.status_code == 200 else ''
-
-            return {
-                'title': title,
-                'authors': authors,
-                'journal': journal,
-                'year': year,
-                'volume': volume,
-                'issue': issue,
-                'pages': pages,
-                'citation': citation
-            }
-        return None
+        with timed('http'), deadline(settings.DOI_LOOKUP_DEADLINE):
+            metadata, outcome = resolve(doi)
+    except Exception as e:
+        metadata, outcome = None, 'error'
+    DOI_FETCHES.inc(outcome=outcome)
+    return metadata
+
+
+def fetch_doi_batch(dois):
+    """
+    Metadata for up to CROSSREF_BATCH_SIZE DOIs from one /works?filter=doi:...
+    query. `dois` maps normalized DOI to the DOI as entered. Returns the DOIs
+    Crossref sent back; an empty dict if the query failed. The query has its
+    own DOI_LOOKUP_DEADLINE budget.
+    """
+    try:
+        with timed('http'), deadline(settings.DOI_LOOKUP_DEADLINE):
+            response = upstream_get(
+                f"{settings.CROSSREF_API_URL}/works",
+                params={'filter': ','.join(f"doi:{doi}" for doi in dois), 'rows': len(dois)},
+                timeout=10,
+            )
+        if response.status_code != 200:
+            CROSSREF_BATCHES.inc(outcome='http_error')
+            return {}
+        items = response.json().get('message', {}).get('items', [])
+    except CircuitOpen:
+        CROSSREF_BATCHES.inc(outcome='circuit_open')
+        return {}
     except Exception as e:
+        CROSSREF_BATCHES.inc(outcome='error')
+        return {}
+
+    CROSSREF_BATCHES.inc(outcome='success')
+    found = {}
+    for item in items:
+        doi = normalize_doi(item.get('DOI', ''))
+        if doi in dois and doi not in found:
+            found[doi] = crossref_metadata(item, dois[doi])
+    CROSSREF_BATCH_DOIS.inc(len(found), result='found')
+    CROSSREF_BATCH_DOIS.inc(len(dois) - len(found), result='missed')
+    return found
+
+
+def fetch_doi_metadata_batch(dois):
+    """
+    Metadata for many DOIs, keyed by normalized DOI (None where none was found).
+
+    DOIs are resolved CROSSREF_BATCH_SIZE at a time with filter queries on the
+    works endpoint. Any DOI a batch doesn't return, including every DOI of a
+    failed batch, falls back to fetch_doi_metadata. DOIs containing a comma
+    can't be expressed in a filter, so they always go through single lookups.
+    """
+    entered = {}
+    for doi in dois:
+        normalized = normalize_doi(doi)
+        if normalized and normalized not in entered:
+            entered[normalized] = doi.strip()
+
+    batchable = [doi for doi in entered if ',' not in doi]
+    size = max(getattr(settings, 'CROSSREF_BATCH_SIZE', 20), 1)
+    results = {}
+    for start in range(0, len(batchable), size):
+        results.update(fetch_doi_batch({doi: entered[doi] for doi in batchable[start:start + size]}))
+    for doi, original in entered.items():
+        if doi not in results:
+            results[doi] = fetch_doi_metadata(original)
+    return results
+
+
+def work_metadata_values(metadata):
+    """Work field values for fetched metadata, marking the Work fetched"""
+    values = {}
+    for field in Publication.METADATA_FIELDS:
+        if field in metadata:
+            value = metadata.get(field)
+            values[field] = value if value is not None or field == 'year' else ''
+    if metadata.get('author_list'):
+        values['author_data'] = metadata['author_list']
+    values['fetched_at'] = timezone.now()
+    return values
+
+
+def apply_work_metadata(work, metadata):
+    """Copy fetched metadata onto a Work and mark it fetched (does not save)"""
+    for field, value in work_metadata_values(metadata).items():
+        setattr(work, field, value)
+
+
+def work_needs_fetch(work):
+    return work is None or (work.fetched_at is None and not work.title)
+
+
+def store_fetched_work(normalized, work, metadata):
+    """
+    Save fetched metadata for a DOI in one write: the insert of a new Work,
+    or an update of just the changed fields of an unresolved one.
+    """
+    values = work_metadata_values(metadata) if metadata else {}
+    if work is None:
+        work, created = Work.objects.get_or_create(doi=normalized, defaults=values)
+        if created:
+            return work
+    for field, value in values.items():
+        setattr(work, field, value)
+    work.save_changed()
+    return work
+
+
+def get_or_fetch_work(doi):
+    """
+    Shared Work for a DOI. Metadata is fetched only when no one has resolved the
+    DOI before, so each DOI is enriched once rather than once per user copy.
+    """
+    normalized = normalize_doi(doi)
+    if not normalized:
         return None
-
-
-class PublicationViewSet(viewsets.ModelViewSet):
+    work = Work.objects.filter(doi=normalized).first()
+    if work_needs_fetch(work):
+        work = store_fetched_work(normalized, work, fetch_doi_metadata(doi))
+    return work
+
+
+def work_link_values(work):
+    """
+    Publication values that link it to a Work. When the Work has metadata it
+    replaces the user's values (a user-supplied citation is kept), matching a
+    fresh fetch.
+    """
+    if work is None:
+        return {}
+    values = {'work': work}
+    if work.title:
+        for field in Publication.METADATA_FIELDS:
+            if field != 'citation':
+                values[field] = None if field == 'year' else ''
+    return values
+
+
+def publication_update_values(publication, validated_data):
+    """
+    Work changes for an update, worked out before anything is saved. Returns
+    values to save with the update (dropping a Work link the new DOI no longer
+    matches) and whether the publication will still need a Work lookup (it has
+    a DOI but no title).
+    """
+    values = {}
+    doi = validated_data.get('doi', publication.doi)
+    work = publication.work if publication.work_id else None
+    if work is not None and work.doi != normalize_doi(doi):
+        values['work'] = work = None
+    title = validated_data.get('title', publication.title) or (work.title if work else '')
+    return values, bool(doi and not title)
+
+
+def finish_publication_create(publication, work):
+    """Index a newly saved publication's authors, from its Work or its own author string"""
+    authors = work.author_data if work else None
+    if not authors and publication.get_metadata_value('authors'):
+        authors = parse_author_string(publication.get_metadata_value('authors'))
+    if authors:
+        set_publication_authors(publication, authors)
+
+
+def finish_publication_update(publication, work, validated_data):
+    """Re-index an updated publication's authors when it was linked to a Work or its authors were edited"""
+    if work:
+        finish_publication_create(publication, work)
+    elif 'authors' in validated_data:
+        set_publication_authors(publication, parse_author_string(publication.get_metadata_value('authors')))
+
+
+class PublicationViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = PublicationSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Publication.objects.filter(user=self.request.user)
+        queryset = Publication.objects.filter(user=self.request.user).select_related('work')
 
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(title__icontains=search)
+            queryset = queryset.filter(Q(title__icontains=search) | Q(title='', work__title__icontains=search))
+
+        # e.g. ?author=Jane Smith&author_position=first (first, last or any)
+        author = self.request.query_params.get('author', None)
+        if author:
+            position = self.request.query_params.get('author_position', 'any')
+            queryset = queryset.filter(**author_position_filter(author, position)).distinct()
 
         return queryset.order_by('-id')
 
     def perform_create(self, serializer):
-        publication = serializer.save(user=self.request.user)
-        if publication.doi:
-            metadata = fetch_doi_metadata(publication.doi)
-            if metadata:
-                publication.title = metadata.get('title', '')
-                publication.authors = metadata.get('authors', '')
-                publication.journal = metadata.get('journal', '')
-                publication.year = metadata.get('year')
-                publication.volume = metadata.get('volume', '')
-                publication.issue = metadata.get('issue', '')
-                publication.pages = metadata.get('pages', '')
-                if metadata.get('citation') and not publication.citation:
-                    publication.citation = metadata.get('citation', '')
-                publication.save()
+        # Enrich first so the publication is inserted already linked to its Work
+        work = get_or_fetch_work(serializer.validated_data.get('doi'))
+        publication = serializer.save(user=self.request.user, **work_link_values(work))
+        finish_publication_create(publication, work)
 
     def perform_update(self, serializer):
-        publication = serializer.save()
-        if publication.doi and not publication.title:
-            metadata = fetch_doi_metadata(publication.doi)
-            if metadata:
-                publication.title = metadata.get('title', '')
-                publication.authors = metadata.get('authors', '')
-                publication.journal = metadata.get('journal', '')
-                publication.year = metadata.get('year')
-                publication.volume = metadata.get('volume', '')
-                publication.issue = metadata.get('issue', '')
-                publication.pages = metadata.get('pages', '')
-                if metadata.get('citation') and not publication.citation:
-                    publication.citation = metadata.get('citation', '')
-                publication.save()
-
-
-class AwardViewSet(viewsets.ModelViewSet):
+        values, needs_work = publication_update_values(serializer.instance, serializer.validated_data)
+        work = get_or_fetch_work(serializer.validated_data.get('doi', serializer.instance.doi)) if needs_work else None
+        publication = serializer.save(**{**values, **work_link_values(work)})
+        finish_publication_update(publication, work, serializer.validated_data)
+
+
+class AwardViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = AwardSerializer
     permission_classes = [IsAuthenticated]
 
@@ -147,7 +294,7 @@ class AwardViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class PersonalStatementViewSet(viewsets.ModelViewSet):
+class PersonalStatementViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = PersonalStatementSerializer
     permission_classes = [IsAuthenticated]
 
@@ -158,7 +305,7 @@ class PersonalStatementViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class BiosketchViewSet(viewsets.ModelViewSet):
+class BiosketchViewSet(ProfiledListMixin, CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = BiosketchSerializer
     permission_classes = [IsAuthenticated]
 
@@ -169,6 +316,38 @@ class BiosketchViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def orcid_sync(request):
+    """
+    GET: the user's linked ORCID iD and last sync result.
+    POST {"orcid": optional iD to link, "force": false}: import new and changed
+    works from ORCID (see cv.orcid).
+    """
+    # Imported here because cv.orcid imports this module's enrichment helpers
+    from .orcid import OrcidSyncError, sync_orcid_works
+
+    if request.method == 'GET':
+        state = OrcidSync.objects.filter(user=request.user).first()
+        if state is None:
+            return Response({'detail': 'No ORCID iD is linked.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(OrcidSyncSerializer(state).data)
+
+    serializer = OrcidSyncRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        state = sync_orcid_works(request.user, **serializer.validated_data)
+    except ValueError as e:
+        return Response({'orcid': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    except CircuitOpen:
+        return Response({'detail': 'ORCID is unavailable; try again shortly.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except OrcidSyncError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+    return Response(OrcidSyncSerializer(state).data)
+
+
+@profiled
 def escape_latex(text):
     """Escape special LaTeX characters - only escape what's necessary in text mode"""
     if text is None:
@@ -236,7 +415,8 @@ def get_template_env():
     return env
 
 
-def prepare_template_data(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title):
+@profiled
+def prepare_template_data(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style=None):
     """Prepare data structure for template rendering"""
     # Prepare education data
     edu_data = []
@@ -267,26 +447,14 @@ def prepare_template_data(related_publications, other_publications, educations,
     # Prepare publication data
     related_pub_data = []
     for pub in related_publications:
-        if pub.citation:
-            citation = pub.citation
-        elif pub.doi:
-            citation = f"DOI: {pub.doi}"
-        else:
-            citation = ""
         related_pub_data.append({
-            'citation': escape_latex(citation),
+            'citation': escape_latex(citation_for_biosketch(pub, citation_style)),
         })
 
     other_pub_data = []
     for pub in other_publications:
-        if pub.citation:
-            citation = pub.citation
-        elif pub.doi:
-            citation = f"DOI: {pub.doi}"
-        else:
-            citation = ""
         other_pub_data.append({
-            'citation': escape_latex(citation),
+            'citation': escape_latex(citation_for_biosketch(pub, citation_style)),
         })
 
     return {
@@ -302,153 +470,143 @@ def prepare_template_data(related_publications, other_publications, educations,
     }
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def generate_biosketch(request):
-    serializer = BiosketchRequestSerializer(data=request.data)
+def collect_biosketch_inputs(data, user):
+    """
+    Validate a biosketch request and load its records. Returns
+    (generator kwargs, export format, None) or (None, None, (error body, status)).
+    """
+    serializer = BiosketchRequestSerializer(data=data)
     if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return None, None, (serializer.errors, status.HTTP_400_BAD_REQUEST)
 
     related_ids = serializer.validated_data['related_publication_ids']
     other_ids = serializer.validated_data['other_publication_ids']
-    export_format = request.data.get('format', 'pdf').lower()  # pdf, latex, html
-    
+    export_format = data.get('format', 'pdf').lower()  # pdf, latex, html
+
     # Get summary from personal statement if ID provided, otherwise use summary field
     personal_statement_id = serializer.validated_data.get('personal_statement_id')
     if personal_statement_id:
         try:
             personal_statement = PersonalStatement.objects.get(
                 id=personal_statement_id,
-                user=request.user
+                user=user
             )
             summary = personal_statement.content
         except PersonalStatement.DoesNotExist:
-            return Response(
+            return None, None, (
                 {"error": "Personal statement not found or does not belong to you"},
-                status=status.HTTP_400_BAD_REQUEST
+                status.HTTP_400_BAD_REQUEST
             )
     else:
         summary = serializer.validated_data.get('summary', '')
 
     related_queryset = Publication.objects.filter(
         id__in=related_ids,
-        user=request.user
-    )
+        user=user
+    ).select_related('work')
     if related_queryset.count() != 5:
-        return Response(
+        return None, None, (
             {"error": "Must provide exactly 5 valid related publication IDs that belong to you"},
-            status=status.HTTP_400_BAD_REQUEST
+            status.HTTP_400_BAD_REQUEST
         )
 
     other_queryset = Publication.objects.filter(
         id__in=other_ids,
-        user=request.user
-    )
+        user=user
+    ).select_related('work')
     if other_queryset.count() != 5:
-        return Response(
+        return None, None, (
             {"error": "Must provide exactly 5 valid other publication IDs that belong to you"},
-            status=status.HTTP_400_BAD_REQUEST
+            status.HTTP_400_BAD_REQUEST
         )
 
     related_dict = {pub.id: pub for pub in related_queryset}
-    related_publications = [related_dict[pub_id] for pub_id in related_ids]
-
     other_dict = {pub.id: pub for pub in other_queryset}
-    other_publications = [other_dict[pub_id] for pub_id in other_ids]
 
-    educations = Education.objects.filter(user=request.user).order_by('-grad_year')
-    experiences = ProfessionalExperience.objects.filter(user=request.user).order_by('-start_year')
+    return {
+        'related_publications': [related_dict[pub_id] for pub_id in related_ids],
+        'other_publications': [other_dict[pub_id] for pub_id in other_ids],
+        'educations': list(Education.objects.filter(user=user).order_by('-grad_year')),
+        'experiences': list(ProfessionalExperience.objects.filter(user=user).order_by('-start_year')),
+        'summary': summary,
+        'first_name': serializer.validated_data.get('first_name', ''),
+        'middle_initial': serializer.validated_data.get('middle_initial', ''),
+        'last_name': serializer.validated_data.get('last_name', ''),
+        'title': serializer.validated_data.get('title', ''),
+        'citation_style': serializer.validated_data.get('citation_style') or None,
+    }, export_format, None
+
+
+def biosketch_metric_format(export_format):
+    # Anything that isn't latex or html is rendered as a PDF
+    return export_format if export_format in ('latex', 'html') else 'pdf'
+
+
+def biosketch_response(export_format, content):
+    """Download response for generated biosketch content"""
+    if export_format == 'latex':
+        response = HttpResponse(content, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="biosketch.tex"'
+    elif export_format == 'html':
+        response = HttpResponse(content, content_type='text/html; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="biosketch.html"'
+    else:  # pdf (default)
+        response = HttpResponse(content, content_type='application/pdf')
+        response['Content-Disposition'] = 'inline; filename="nih_biosketch.pdf"'
+        response['Content-Length'] = len(content)
+    return response
+
+
+def biosketch_error(error):
+    """Error body for a failed biosketch generation"""
+    if isinstance(error, subprocess.CalledProcessError):
+        return {"error": f"PDF generation failed: {str(error)}. Make sure pdflatex is installed."}
+    if isinstance(error, FileNotFoundError):
+        return {"error": "pdflatex not found. Please install a LaTeX distribution (e.g., TeX Live or MiKTeX)."}
+    return {
+        "error": f"Error generating biosketch: {str(error)}",
+        "hint": "Check that pdflatex is installed and the LaTeX template is valid."
+    }
 
-    # Get name and title fields
-    first_name = serializer.validated_data.get('first_name', '')
-    middle_initial = serializer.validated_data.get('middle_initial', '')
-    last_name = serializer.validated_data.get('last_name', '')
-    title = serializer.validated_data.get('title', '')
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@profiled
+def generate_biosketch(request):
+    inputs, export_format, error = collect_biosketch_inputs(request.data, request.user)
+    if error:
+        return Response(error[0], status=error[1])
+
+    generators = {'latex': generate_biosketch_latex, 'html': generate_biosketch_html}
+    generate = generators.get(export_format, generate_biosketch_pdf)
+    outcome = 'error'
+    started = time.perf_counter()
     try:
-        if export_format == 'latex':
-            latex_content = generate_biosketch_latex(
-                related_publications=list(related_publications),
-                other_publications=list(other_publications),
-                educations=list(educations),
-                experiences=list(experiences),
-                summary=summary,
-                first_name=first_name,
-                middle_initial=middle_initial,
-                last_name=last_name,
-                title=title,
-            )
-            response = HttpResponse(latex_content, content_type='text/plain; charset=utf-8')
-            response['Content-Disposition'] = 'attachment; filename="biosketch.tex"'
-            return response
-        
-        elif export_format == 'html':
-            html_content = generate_biosketch_html(
-                related_publications=list(related_publications),
-                other_publications=list(other_publications),
-                educations=list(educations),
-                experiences=list(experiences),
-                summary=summary,
-                first_name=first_name,
-                middle_initial=middle_initial,
-                last_name=last_name,
-                title=title,
-            )
-            response = HttpResponse(html_content, content_type='text/html; charset=utf-8')
-            response['Content-Disposition'] = 'attachment; filename="biosketch.html"'
-            return response
-        
-        else:  # pdf (default)
-            pdf_content = generate_biosketch_pdf(
-                related_publications=list(related_publications),
-                other_publications=list(other_publications),
-                educations=list(educations),
-                experiences=list(experiences),
-                summary=summary,
-                first_name=first_name,
-                middle_initial=middle_initial,
-                last_name=last_name,
-                title=title,
-            )
-            response = HttpResponse(pdf_content, content_type='application/pdf')
-            response['Content-Disposition'] = 'inline; filename="nih_biosketch.pdf"'
-            response['Content-Length'] = len(pdf_content)
-            return response
-
-    except subprocess.CalledProcessError as e:
-        return Response(
-            {"error": f"PDF generation failed: {str(e)}. Make sure pdflatex is installed."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-    except FileNotFoundError:
-        return Response(
-            {"error": "pdflatex not found. Please install a LaTeX distribution (e.g., TeX Live or MiKTeX)."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        response = biosketch_response(export_format, generate(**inputs))
+        outcome = 'ok'
+        return response
     except Exception as e:
-        error_details = str(e)
-        return Response(
-            {
-                "error": f"Error generating biosketch: {error_details}",
-                "hint": "Check that pdflatex is installed and the LaTeX template is valid."
-            },
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        return Response(biosketch_error(e), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    finally:
+        BIOSKETCH_DURATION.observe(
+            time.perf_counter() - started, format=biosketch_metric_format(export_format), outcome=outcome
         )
 
 
-def generate_biosketch_latex(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title):
+def generate_biosketch_latex(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style=None):
     """Generate raw LaTeX content from template"""
     env = get_template_env()
     template = env.get_template('nih_biosketch.tex')
-    data = prepare_template_data(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title)
-    return template.render(**data)
+    data = prepare_template_data(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style)
+    with timed('serialize'):
+        return template.render(**data)
 
 
-def generate_biosketch_html(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title):
+def generate_biosketch_html(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style=None):
     """Generate HTML content by converting LaTeX to HTML using pandoc"""
     # First generate the LaTeX content
     latex_content = generate_biosketch_latex(
-        related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title
+        related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style
     )
 
     # Convert LaTeX to HTML using pandoc
@@ -462,12 +620,13 @@ def generate_biosketch_html(related_publications, other_publications, educations
 
         # Convert using pandoc
         try:
-            result = subprocess.run(
-                ['pandoc', str(tex_file), '-f', 'latex', '-t', 'html', '-o', str(html_file)],
-                check=True,
-                capture_output=True,
-                text=True
-            )
+            with timed('subprocess'), COMPILES_IN_PROGRESS.track_inprogress(format='html'):
+                result = subprocess.run(
+                    ['pandoc', str(tex_file), '-f', 'latex', '-t', 'html', '-o', str(html_file)],
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
         except FileNotFoundError:
             raise Exception(
                 "pandoc not found. Please install pandoc to export HTML. "
@@ -486,10 +645,10 @@ def generate_biosketch_html(related_publications, other_publications, educations
         return html_content
 
 
-def generate_biosketch_pdf(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title):
+def generate_biosketch_pdf(related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style=None):
     """Generate PDF from LaTeX template"""
     latex_content = generate_biosketch_latex(
-        related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title
+        related_publications, other_publications, educations, experiences, summary, first_name, middle_initial, last_name, title, citation_style
     )
 
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -499,18 +658,19 @@ def generate_biosketch_pdf(related_publications, other_publications, educations,
         with open(tex_file, 'w', encoding='utf-8') as f:
             f.write(latex_content)
 
-        result1 = subprocess.run(
-            ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_dir, str(tex_file)],
-            check=False,
-            capture_output=True,
-            text=True
-        )
-        result2 = subprocess.run(
-            ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_dir, str(tex_file)],
-            check=False,
-            capture_output=True,
-            text=True
-        )
+        with timed('subprocess'), COMPILES_IN_PROGRESS.track_inprogress(format='pdf'):
+            result1 = subprocess.run(
+                ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_dir, str(tex_file)],
+                check=False,
+                capture_output=True,
+                text=True
+            )
+            result2 = subprocess.run(
+                ['pdflatex', '-interaction=nonstopmode', '-output-directory', temp_dir, str(tex_file)],
+                check=False,
+                capture_output=True,
+                text=True
+            )
 
         if not pdf_file.exists():
             error_output = result1.stdout + result1.stderr if result1.stdout or result1.stderr else "No output"
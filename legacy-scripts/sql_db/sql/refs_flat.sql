@@ -0,0 +1,28 @@
+-- Denormalized one-row-per-reference view of refs/authors/ref_dat for the
+-- reference browser. Running this script (re)builds it from the EAV tables;
+-- app.py keeps it current on add/delete.
+
+CREATE TABLE IF NOT EXISTS refs_flat (
+    ref_id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    authors TEXT,
+    title TEXT,
+    journal TEXT,
+    year TEXT,
+    doi TEXT
+);
+
+DELETE FROM refs_flat;
+
+INSERT INTO refs_flat (ref_id, type, authors, title, journal, year, doi)
+SELECT refs.ref_id, refs.type,
+       (SELECT GROUP_CONCAT(author_name, ', ')
+        FROM authors
+        WHERE authors.ref_id = refs.ref_id) AS authors,
+       MAX(CASE WHEN ref_dat.key = 'title' THEN ref_dat.value END) AS title,
+       MAX(CASE WHEN ref_dat.key = 'journal' THEN ref_dat.value END) AS journal,
+       MAX(CASE WHEN ref_dat.key = 'year' THEN ref_dat.value END) AS year,
+       MAX(CASE WHEN ref_dat.key = 'doi' THEN ref_dat.value END) AS doi
+FROM refs
+LEFT JOIN ref_dat ON refs.ref_id = ref_dat.ref_id
+GROUP BY refs.ref_id;
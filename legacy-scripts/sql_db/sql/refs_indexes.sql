@@ -0,0 +1,5 @@
+-- Lookup indexes, created after the bulk load so inserts don't maintain them
+
+CREATE INDEX IF NOT EXISTS idx_authors_ref_id ON authors (ref_id);
+
+CREATE INDEX IF NOT EXISTS idx_ref_dat_ref_id_key ON ref_dat (ref_id, key);
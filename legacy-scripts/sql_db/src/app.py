@@ -1,35 +1,63 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, g, render_template, request, redirect, url_for, jsonify
+import os
 import sqlite3
 from crossref.restful import Works
 
 app = Flask(__name__, template_folder="../templates")
 DB_FILE = "./mydata/refs.db"
-
-# Helper function to connect to the database
+REFS_FLAT_SQL = os.path.join(app.root_path, "../sql/refs_flat.sql")
+REFS_PER_PAGE = 100
+
+# WAL lets readers carry on while add_ref/delete_ref write; NORMAL sync is
+# durable under WAL except on power loss. Cache and mmap sizes are per connection.
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA busy_timeout = 5000;
+    PRAGMA cache_size = -16384;
+    PRAGMA mmap_size = 268435456;
+"""
+
+# Helper function to connect to the database, reused for the rest of the app context
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    if "db" not in g:
+        conn = sqlite3.connect(DB_FILE)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(CONNECTION_PRAGMAS)
+        ensure_refs_flat(conn)
+        g.db = conn
+    return g.db
+
+# Close the app context's connection, if one was opened
+@app.teardown_appcontext
+def close_db_connection(exception):
+    conn = g.pop("db", None)
+    if conn is not None:
+        conn.close()
 
-# Home route to display all references
+# Build the refs_flat table for databases created before it existed
+def ensure_refs_flat(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'refs_flat'"
+    ).fetchone()
+    if not exists:
+        with open(REFS_FLAT_SQL) as refs_flat:
+            conn.executescript(refs_flat.read())
+
+# Home route to display references, one page at a time
 @app.route("/")
 def index():
+    page = max(request.args.get("page", 1, type=int), 1)
     conn = get_db_connection()
+    total = conn.execute("SELECT COUNT(*) FROM refs_flat").fetchone()[0]
     refs = conn.execute("""
-        SELECT refs.ref_id, refs.type,
-               (SELECT GROUP_CONCAT(author_name, ', ') 
-                FROM authors 
-                WHERE authors.ref_id = refs.ref_id) AS authors,
-               MAX(CASE WHEN ref_dat.key = 'title' THEN ref_dat.value END) AS title,
-               MAX(CASE WHEN ref_dat.key = 'journal' THEN ref_dat.value END) AS journal,
-               MAX(CASE WHEN ref_dat.key = 'year' THEN ref_dat.value END) AS year,
-               MAX(CASE WHEN ref_dat.key = 'doi' THEN ref_dat.value END) AS doi
-        FROM refs
-        LEFT JOIN ref_dat ON refs.ref_id = ref_dat.ref_id
-        GROUP BY refs.ref_id
-    """).fetchall()
-    conn.close()
-    return render_template("index.html", refs=refs)
+        SELECT ref_id, type, authors, title, journal, year, doi
+        FROM refs_flat
+        ORDER BY ref_id
+        LIMIT ? OFFSET ?
+    """, (REFS_PER_PAGE, (page - 1) * REFS_PER_PAGE)).fetchall()
+    pages = max((total + REFS_PER_PAGE - 1) // REFS_PER_PAGE, 1)
+    return render_template("index.html", refs=refs, page=page, pages=pages)
 
 # Route to view details of a specific reference
 @app.route("/ref/<int:ref_id>")
@@ -38,7 +66,6 @@ def view_ref(ref_id):
     ref = conn.execute("SELECT * FROM refs WHERE ref_id = ?", (ref_id,)).fetchone()
     authors = conn.execute("SELECT author_name FROM authors WHERE ref_id = ?", (ref_id,)).fetchall()
     ref_data = conn.execute("SELECT key, value FROM ref_dat WHERE ref_id = ?", (ref_id,)).fetchall()
-    conn.close()
     return render_template("view_ref.html", ref=ref, authors=authors, ref_data=ref_data)
 
 # Route to add a new reference
@@ -59,24 +86,36 @@ def add_ref(ref_type):
         ref_id = cursor.lastrowid
 
         # Insert authors
-        for author in authors:
-            if author.strip():
-                cursor.execute("INSERT INTO authors (ref_id, author_name) VALUES (?, ?)", (ref_id, author.strip()))
-
-        # Insert cofirsts and coseniors as numeric values
-        cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, "cofirsts", cofirsts))
-        cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, "coseniors", coseniors))
-
-        # Insert corresponding author flag
-        cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, "corr", corr))
-
-        # Insert other reference details
-        for key, value in ref_data.items():
-            if value.strip():
-                cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, key.strip(), value.strip()))
+        author_names = [author.strip() for author in authors if author.strip()]
+        cursor.executemany(
+            "INSERT INTO authors (ref_id, author_name) VALUES (?, ?)",
+            [(ref_id, author) for author in author_names],
+        )
+
+        # Other reference details, skipping blank fields
+        details = {key.strip(): value.strip() for key, value in ref_data.items() if value.strip()}
+
+        # Insert cofirsts and coseniors as numeric values, the corresponding
+        # author flag, then the other reference details
+        dat_rows = [(ref_id, "cofirsts", cofirsts), (ref_id, "coseniors", coseniors), (ref_id, "corr", corr)]
+        dat_rows.extend((ref_id, key, value) for key, value in details.items())
+        cursor.executemany("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", dat_rows)
+
+        # Keep the flattened browser row in step with the new reference
+        cursor.execute(
+            "INSERT INTO refs_flat (ref_id, type, authors, title, journal, year, doi) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                ref_id,
+                ref_type,
+                ", ".join(author_names) or None,
+                details.get("title"),
+                details.get("journal"),
+                details.get("year"),
+                details.get("doi"),
+            ),
+        )
 
         conn.commit()
-        conn.close()
         return redirect(url_for("index"))
 
     return render_template("add_ref.html", ref_type=ref_type)
@@ -88,8 +127,8 @@ def delete_ref(ref_id):
     conn.execute("DELETE FROM refs WHERE ref_id = ?", (ref_id,))
     conn.execute("DELETE FROM authors WHERE ref_id = ?", (ref_id,))
     conn.execute("DELETE FROM ref_dat WHERE ref_id = ?", (ref_id,))
+    conn.execute("DELETE FROM refs_flat WHERE ref_id = ?", (ref_id,))
     conn.commit()
-    conn.close()
     return redirect(url_for("index"))
 
 # Route to fetch DOI details
@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from refs_yaml_to_sql import REF_TYPES, load_db
+
+# Benchmarks refs_yaml_to_sql against the old one-INSERT-per-row load and
+# times the per-reference lookups app.py runs, before and after indexing.
+# Usage (from legacy-scripts/): python sql_db/src/bench_refs_load.py [--refs N]
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sql")
+
+# Build a synthetic refs.yml-shaped dictionary
+def make_data(n_refs, seed=0):
+    rng = random.Random(seed)
+    names = [f"Author{i} A" for i in range(200)]
+    data = {"myname": "Author0 A"}
+    for i in range(n_refs):
+        ref = {
+            "authors": rng.sample(names, rng.randint(1, 12)),
+            "title": f"Synthetic reference {i}",
+            "journal": f"Journal {rng.randint(1, 50)}",
+            "year": rng.randint(1990, 2025),
+            "doi": f"10.1000/bench.{i}",
+        }
+        if rng.random() < 0.3:
+            ref["corr"] = "yes"
+        data.setdefault(rng.choice(REF_TYPES), []).append(ref)
+    return data
+
+# The previous loader: one INSERT per ref, author and ref_dat key
+def load_db_rowwise(data, db_file):
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    with open(os.path.join(SQL_DIR, "refs_schema.sql")) as schema:
+        cursor.executescript(schema.read())
+    cursor.execute("INSERT INTO metadata (key, value) VALUES (?, ?)", ("myname", data.get("myname", "")))
+    for reftype in REF_TYPES:
+        for ref in data.get(reftype, []):
+            cursor.execute("INSERT INTO refs (type) VALUES (?)", (reftype,))
+            ref_id = cursor.lastrowid
+            for author in ref.get("authors", []):
+                cursor.execute("INSERT INTO authors (ref_id, author_name) VALUES (?, ?)", (ref_id, author))
+            for key, value in ref.items():
+                if key != "authors":
+                    cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, key, value))
+    conn.commit()
+    conn.close()
+
+# Time the view_ref lookups from app.py for every reference
+def time_lookups(db_file):
+    conn = sqlite3.connect(db_file)
+    ref_ids = [row[0] for row in conn.execute("SELECT ref_id FROM refs")]
+    start = time.perf_counter()
+    for ref_id in ref_ids:
+        conn.execute("SELECT author_name FROM authors WHERE ref_id = ?", (ref_id,)).fetchall()
+        conn.execute("SELECT key, value FROM ref_dat WHERE ref_id = ?", (ref_id,)).fetchall()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the refs YAML to SQLite load")
+    parser.add_argument("--refs", type=int, default=5000, help="Number of synthetic references (default: 5000)")
+    args = parser.parse_args()
+
+    data = make_data(args.refs)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        rowwise_db = os.path.join(temp_dir, "rowwise.db")
+        batched_db = os.path.join(temp_dir, "batched.db")
+
+        start = time.perf_counter()
+        load_db_rowwise(data, rowwise_db)
+        rowwise_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_db(data, batched_db, sql_dir=SQL_DIR)
+        batched_load = time.perf_counter() - start
+
+        rowwise_lookup = time_lookups(rowwise_db)
+        batched_lookup = time_lookups(batched_db)
+
+    print(f"{args.refs} references")
+    print(f"  load    row-by-row: {rowwise_load:8.3f}s   batched + indexes: {batched_load:8.3f}s")
+    print(f"  lookups unindexed:  {rowwise_lookup:8.3f}s   indexed:           {batched_lookup:8.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -36,8 +36,8 @@ class CustomDumper(yaml.Dumper):
 # Remove non-ASCII characters, newline characters, and trailing spaces from data
 def remove_non_ascii(data):
     if isinstance(data, str):
-        # Remove non-ASCII characters, newline characters, and strip trailing spaces
-        return ''.join(char for char in data if ord(char) < 128).replace('\n', ' ').strip()
+        # Drop non-ASCII characters in one encode pass, then flatten newlines and strip
+        return data.encode('ascii', 'ignore').decode('ascii').replace('\n', ' ').strip()
     elif isinstance(data, list):
         # Recursively process lists
         return [remove_non_ascii(item) for item in data]
@@ -46,64 +46,82 @@ def remove_non_ascii(data):
         return {remove_non_ascii(key): remove_non_ascii(value) for key, value in data.items()}
     return data  # Return other data types as-is
 
-# Fetch data from the database
-def fetch_data(cursor):
-    # Fetch metadata
+# Refs ordered so each type is a contiguous block (types in order of first
+# appearance, refs by ref_id within a type). The authors and ref_dat queries
+# share this ordering so all three can be merged in a single pass.
+ORDERED_REFS = """
+    WITH ordered AS (
+        SELECT ref_id, type, MIN(ref_id) OVER (PARTITION BY type) AS type_rank
+        FROM refs
+    )
+"""
+
+# Fetch metadata from the database
+def fetch_metadata(cursor):
     cursor.execute("SELECT key, value FROM metadata")
-    metadata = {row[0]: row[1] for row in cursor.fetchall()}
-
-    # Fetch refs
-    cursor.execute("SELECT ref_id, type FROM refs")
-    refs = {}
-    for ref_id, ref_type in cursor.fetchall():
-        if ref_type not in refs:
-            refs[ref_type] = []
-        refs[ref_type].append({"ref_id": ref_id})
-
-    # Fetch authors and ref details
-    for ref_type, ref_list in refs.items():
-        for ref in ref_list:
-            ref_id = ref["ref_id"]
-            del ref["ref_id"]  # Remove ref_id from the dictionary
-
-            # Fetch authors
-            cursor.execute("SELECT author_name FROM authors WHERE ref_id = ?", (ref_id,))
-            ref["authors"] = [row[0] for row in cursor.fetchall()]
-
-            # Fetch other details
-            cursor.execute("SELECT key, value FROM ref_dat WHERE ref_id = ?", (ref_id,))
-            for key, value in cursor.fetchall():
-                # Handle the 'corr' key
-                if key == "corr":
-                    if value.lower() in ["1", "yes", "true"]:  # Keep only if value is 1, yes, or true
-                        ref[key] = True
-                    else:
-                        continue  # Skip adding the 'corr' key
-                else:
-                    ref[key] = value
-
-    return metadata, refs
-
-# Export data to YAML
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+# Stream (ref_type, ref) pairs using one bulk query per table
+def iter_refs(conn):
+    refs = conn.execute(ORDERED_REFS + """
+        SELECT ref_id, type FROM ordered ORDER BY type_rank, ref_id
+    """)
+    authors = conn.execute(ORDERED_REFS + """
+        SELECT authors.ref_id, authors.author_name
+        FROM authors JOIN ordered ON ordered.ref_id = authors.ref_id
+        ORDER BY ordered.type_rank, authors.ref_id, authors.id
+    """)
+    ref_dat = conn.execute(ORDERED_REFS + """
+        SELECT ref_dat.ref_id, ref_dat.key, ref_dat.value
+        FROM ref_dat JOIN ordered ON ordered.ref_id = ref_dat.ref_id
+        ORDER BY ordered.type_rank, ref_dat.ref_id, ref_dat.id
+    """)
+
+    author_row = authors.fetchone()
+    dat_row = ref_dat.fetchone()
+    for ref_id, ref_type in refs:
+        ref = {"authors": []}
+
+        # Fetch authors
+        while author_row is not None and author_row[0] == ref_id:
+            ref["authors"].append(author_row[1])
+            author_row = authors.fetchone()
+
+        # Fetch other details
+        while dat_row is not None and dat_row[0] == ref_id:
+            _, key, value = dat_row
+            dat_row = ref_dat.fetchone()
+            # Handle the 'corr' key
+            if key == "corr":
+                if value.lower() in ["1", "yes", "true"]:  # Keep only if value is 1, yes, or true
+                    ref[key] = True
+                continue  # Skip adding the 'corr' key otherwise
+            ref[key] = value
+
+        yield ref_type, ref
+
+# Dump a single YAML fragment with the custom dumper
+def dump_yaml(data, file):
+    yaml.dump(data, file, Dumper=CustomDumper, default_flow_style=False, sort_keys=False)
+
+# Export data to YAML, writing each reference as soon as it is read
 def export_to_yaml(db_file, output_file):
     # Connect to SQLite database
     conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
 
-    # Fetch data
-    metadata, refs = fetch_data(cursor)
-
-    # Structure the data for YAML
-    yaml_data = metadata
-    for ref_type, ref_list in refs.items():
-        yaml_data[ref_type] = ref_list
-
-    # Remove non-ASCII characters from the data
-    yaml_data = remove_non_ascii(yaml_data)
-
-    # Write to YAML file with custom dumper
     with open(output_file, "w") as file:
-        yaml.dump(yaml_data, file, Dumper=CustomDumper, default_flow_style=False, sort_keys=False)
+        # Metadata goes at the top level of the document
+        metadata = remove_non_ascii(fetch_metadata(conn.cursor()))
+        if metadata:
+            dump_yaml(metadata, file)
+
+        current_type = None
+        for ref_type, ref in iter_refs(conn):
+            if ref_type != current_type:
+                file.write(f"{remove_non_ascii(ref_type)}:\n")
+                current_type = ref_type
+            # A one-element list dumps as an entry of the (indentless) block sequence
+            dump_yaml([remove_non_ascii(ref)], file)
 
     print(f"Data exported to {output_file}")
 
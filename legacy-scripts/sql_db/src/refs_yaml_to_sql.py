@@ -8,61 +8,85 @@ def load_yaml(file_path):
     with open(file_path, 'r') as file:
         return yaml.safe_load(file)
 
+# Pragmas for the bulk load: the database is rebuilt from YAML on every run,
+# so durability is traded for speed until the load commits
+BULK_LOAD_PRAGMAS = """
+    PRAGMA journal_mode = MEMORY;
+    PRAGMA synchronous = OFF;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA cache_size = -65536;
+"""
+
+REF_TYPES = ["papers", "preprints", "papersNoPeer", "chapters", "letters", "scimeetings"]
+
 # Insert metadata
 def insert_metadata(cursor, metadata):
-    for key, value in metadata.items():
-        cursor.execute("INSERT INTO metadata (key, value) VALUES (?, ?)", (key, value))
+    cursor.executemany("INSERT INTO metadata (key, value) VALUES (?, ?)", metadata.items())
 
 # Insert refs and authors
 def insert_refs(cursor, refs, reftype):
-    for ref in refs:
-        # print(reftype) ## DEBUG
-        cursor.execute("INSERT INTO refs (type) VALUES (?)", (reftype,))
-        ref_id = cursor.lastrowid
-        #print(ref_id) ##DEBUG
+    # Assign ref_ids up front so refs, authors and ref_dat can each go in one executemany
+    cursor.execute("SELECT COALESCE(MAX(ref_id), 0) FROM refs")
+    next_id = cursor.fetchone()[0] + 1
+
+    ref_rows = []
+    author_rows = []
+    dat_rows = []
+    for ref_id, ref in enumerate(refs, start=next_id):
+        ref_rows.append((ref_id, reftype))
 
-        # Insert authors
+        # Authors
         for author in ref.get("authors", []):
-            cursor.execute("INSERT INTO authors (ref_id, author_name) VALUES (?, ?)", (ref_id, author))
+            author_rows.append((ref_id, author))
 
-        # Insert other ref details
+        # Other ref details
         for key, value in ref.items():
-            #print(key) ## DEBUG
-            #print(value) ## DEBUG
             if key != "authors":
-                cursor.execute("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", (ref_id, key, value))
+                dat_rows.append((ref_id, key, value))
 
-# Main function
-def main():
-    yaml_file = "./mydata/refs.yml"
-    db_file = "./mydata/refs.db"
-
-    # Load YAML data
-    data = load_yaml(yaml_file)
+    cursor.executemany("INSERT INTO refs (ref_id, type) VALUES (?, ?)", ref_rows)
+    cursor.executemany("INSERT INTO authors (ref_id, author_name) VALUES (?, ?)", author_rows)
+    cursor.executemany("INSERT INTO ref_dat (ref_id, key, value) VALUES (?, ?, ?)", dat_rows)
 
+# Rebuild the database from loaded YAML data
+def load_db(data, db_file, sql_dir="./sql_db/sql"):
     # Connect to SQLite database
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
+    cursor.executescript(BULK_LOAD_PRAGMAS)
 
     # Create tables
     cursor.execute("DROP TABLE IF EXISTS metadata")
     cursor.execute("DROP TABLE IF EXISTS refs")
     cursor.execute("DROP TABLE IF EXISTS authors")
     cursor.execute("DROP TABLE IF EXISTS ref_dat")
-    cursor.executescript(open("./sql_db/sql/refs_schema.sql").read())
+    cursor.execute("DROP TABLE IF EXISTS refs_flat")
+    with open(f"{sql_dir}/refs_schema.sql") as schema:
+        cursor.executescript(schema.read())
 
-    # Insert data
+    # Insert data in a single transaction
     insert_metadata(cursor, {"myname": data.get("myname", "")})
-    insert_refs(cursor, data.get("papers", []), "papers")
-    insert_refs(cursor, data.get("preprints", []), "preprints")
-    insert_refs(cursor, data.get("papersNoPeer", []), "papersNoPeer")
-    insert_refs(cursor, data.get("chapters", []), "chapters")
-    insert_refs(cursor, data.get("letters", []), "letters")
-    insert_refs(cursor, data.get("scimeetings",[]),"scimeetings")
-
-    # Commit and close
+    for reftype in REF_TYPES:
+        insert_refs(cursor, data.get(reftype, []), reftype)
     conn.commit()
+
+    # Build indexes and the flattened browser table once the data is in place
+    with open(f"{sql_dir}/refs_indexes.sql") as indexes:
+        cursor.executescript(indexes.read())
+    with open(f"{sql_dir}/refs_flat.sql") as refs_flat:
+        cursor.executescript(refs_flat.read())
+
     conn.close()
 
+# Main function
+def main():
+    yaml_file = "./mydata/refs.yml"
+    db_file = "./mydata/refs.db"
+
+    # Load YAML data
+    data = load_yaml(yaml_file)
+
+    load_db(data, db_file)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()